@@ -0,0 +1,342 @@
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+# The scanners build their clients at import time; the key is never sent anywhere
+os.environ.setdefault("POLYGON_API_KEY", "synthetic")
+
+from helpers.request_scheduler import PLAN_LIMITS, configure_scheduler
+from helpers.synthetic_market import SyntheticClient, rest_client
+
+SCENARIOS = ("scan", "otm", "ema", "natgas")
+
+# Requests per second of the scheduler when no --plan is given, high enough to never wait
+UNTHROTTLED = 1_000_000
+
+# Modules that hold a module-level Polygon client
+CLIENT_MODULES = (
+    "helpers.options_helpers",
+    "related_companies_scanner",
+    "otm_options_by_expiration",
+    "ema_screen",
+    "reports.natural_gas",
+)
+
+
+SCENARIO_MODULES = {
+    "scan": ("related_companies_scanner",),
+    "otm": ("otm_options_by_expiration",),
+    "ema": ("ema_screen",),
+    "natgas": ("reports.natural_gas",),
+}
+
+
+def load_scenarios(scenarios):
+    """
+    Import the modules each scenario drives, so import time stays out of the measurements.
+
+    Returns:
+        dict: Scenarios that could not be imported, with the error as value.
+    """
+    failed = {}
+    for scenario in scenarios:
+        try:
+            with redirect_stdout(io.StringIO()):
+                for name in SCENARIO_MODULES[scenario]:
+                    importlib.import_module(name)
+        except ImportError as e:
+            failed[scenario] = f"ImportError: {e}"
+    return failed
+
+
+def market_client(market, direct):
+    """
+    Returns the client the scanners use: a RESTClient served by the market, or the market itself.
+    """
+    return market if direct else rest_client(market)
+
+
+def install_client(market, direct):
+    """
+    Point every loaded scanner module at the synthetic market.
+    """
+    client = market_client(market, direct)
+    for name in CLIENT_MODULES:
+        module = sys.modules.get(name)
+        if module is not None:
+            module.client = client
+
+
+class ShardMarket:
+    """
+    Hands each scan shard its own copy of the synthetic market; called in the shard's process.
+
+    The copy is pickled with the counts the coordinator had already made, so
+    they are zeroed before the shard starts and merging it back adds only what
+    the shard served. The shard's output is discarded like the scenario's own
+    unless --verbose, since a worker process writes to the real stdout.
+
+    Args:
+        market (SyntheticClient): Market of the scenario.
+        quiet (bool): Discard the shard's output.
+        direct (bool): Hand the shard the market itself rather than a RESTClient served by it.
+    """
+
+    def __init__(self, market, quiet, direct):
+        self.market = market
+        self.quiet = quiet
+        self.direct = direct
+
+    def __call__(self):
+        if self.quiet:
+            sys.stdout = open(os.devnull, "w")
+        self.market.reset_counters()
+        return market_client(self.market, self.direct)
+
+
+def run_scan(market, args):
+    scanner = sys.modules["related_companies_scanner"]
+    scanner.configure_shards(
+        ShardMarket(market, quiet=not args.verbose, direct=args.direct),
+        lambda shard: market.merge_counters(shard.market),
+    )
+    scanner.run_scanner_on_otm_calls(
+        market.tickers[0],
+        depth=args.depth,
+        workers=args.workers,
+        use_trade_cache=not args.no_trade_cache,
+        shards=args.shards,
+        max_nodes=args.max_nodes,
+    )
+
+
+def run_otm(market, args):
+    get_metrics = sys.modules["otm_options_by_expiration"].get_trades_and_metrics_for_otm_calls
+    for ticker in market.tickers[:args.max_nodes or len(market.tickers)]:
+        for expiration in market.expirations:
+            get_metrics(ticker, expiration, market.price(ticker))
+
+
+def run_ema(market, args):
+    sys.modules["ema_screen"].find_stacked_tickers(market.tickers[0])
+
+
+def run_natgas(market, args):
+    sys.modules["reports.natural_gas"].main(market.tickers[0])
+
+
+RUNNERS = {"scan": run_scan, "otm": run_otm, "ema": run_ema, "natgas": run_natgas}
+
+
+def measure(scenario, market, args):
+    """
+    Run one scenario against a fresh synthetic market and collect its metrics.
+
+    Returns:
+        dict: Wall time, requests, injected errors, trades served, trades per
+              second and peak traced memory of the run.
+    """
+    if not args.no_memory:
+        tracemalloc.start()
+
+    error = None
+    output = None if args.verbose else io.StringIO()
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(output or sys.stdout):
+            RUNNERS[scenario](market, args)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+
+    peak = 0
+    if not args.no_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "scenario": scenario,
+        "wall_seconds": wall,
+        "requests": sum(market.requests.values()),
+        "requests_by_endpoint": dict(market.requests),
+        "injected_errors": market.errors,
+        "trades": market.trades_served,
+        "trades_per_second": market.trades_served / wall if wall else 0.0,
+        "peak_memory_mb": peak / 2**20,
+        "error": error,
+    }
+
+
+def print_results(results):
+    print(
+        f"{'scenario':<10} {'wall s':>9} {'requests':>9} {'errors':>7} "
+        f"{'trades':>10} {'trades/s':>11} {'peak MB':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['scenario']:<10} {r['wall_seconds']:>9.3f} {r['requests']:>9} {r['injected_errors']:>7} "
+            f"{r['trades']:>10} {r['trades_per_second']:>11.0f} {r['peak_memory_mb']:>8.1f}"
+        )
+        if r["error"]:
+            print(f"  failed: {r['error']}")
+
+
+def main(args):
+    """
+    Run every requested scenario against a synthetic market and report the results.
+
+    Caches (related companies, trades, prices, indicators, responses) are
+    written to a fresh temporary directory, so the first run of a scenario is
+    cold and repeats show the effect of the caches.
+
+    Unless --direct, the scanners get a real RESTClient whose network is the
+    synthetic market, so requests take the production path: the scheduler,
+    retries and response cache, JSON decoding and raw trade paging. Requests
+    are not throttled unless --plan is given.
+
+    Returns:
+        list: One result dict per scenario and run, see measure.
+    """
+    json_path = os.path.abspath(args.json) if args.json else None
+    skipped = load_scenarios(args.scenarios)
+
+    workdir = tempfile.mkdtemp(prefix="tyche-bench-")
+    os.chdir(workdir)
+    print(f"Benchmark caches in {workdir}")
+
+    from related_companies_db import initialize_db
+    from helpers.trade_cache import initialize_trade_cache
+
+    initialize_db()
+    initialize_trade_cache()
+    if args.plan:
+        configure_scheduler(args.plan)
+    else:
+        configure_scheduler(requests=UNTHROTTLED)
+
+    results = []
+    for run in range(args.repeat):
+        for scenario in args.scenarios:
+            if scenario in skipped:
+                continue
+            market = SyntheticClient(
+                universe=args.universe,
+                related=args.related,
+                expirations=args.expirations,
+                strikes=args.strikes,
+                trades_per_day=args.trades_per_day,
+                sessions=args.sessions,
+                latency=args.latency,
+                error_rate=args.error_rate,
+                seed=args.seed,
+            )
+            install_client(market, args.direct)
+            result = measure(scenario, market, args)
+            result["run"] = run
+            results.append(result)
+
+    print_results(results)
+    for scenario, error in skipped.items():
+        print(f"{scenario:<10} skipped: {error}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {json_path}")
+
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the scanners against a synthetic market.")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+        help="Scenarios to run (default: all)",
+    )
+    parser.add_argument(
+        "--universe", type=int, default=200,
+        help="Number of synthetic underlyings (default: 200)",
+    )
+    parser.add_argument(
+        "--related", type=int, default=10,
+        help="Related companies per underlying (default: 10)",
+    )
+    parser.add_argument(
+        "--expirations", type=int, default=4,
+        help="Monthly expirations per underlying (default: 4)",
+    )
+    parser.add_argument(
+        "--strikes", type=int, default=20,
+        help="Strikes per expiration and type (default: 20)",
+    )
+    parser.add_argument(
+        "--trades-per-day", type=float, default=20.0,
+        help="Mean trades per contract per session (default: 20)",
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=30,
+        help="Sessions of trade history per contract (default: 30)",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0,
+        help="Seconds added to every request (default: 0)",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0,
+        help="Probability that a request fails (default: 0)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Seed of the synthetic market (default: 0)",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=1,
+        help="Related-company depth of the scan scenario (default: 1)",
+    )
+    parser.add_argument(
+        "--max-nodes", type=int, default=20,
+        help="Underlyings scanned by scan and otm (default: 20)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8,
+        help="Worker threads of the scan scenario (default: 8)",
+    )
+    parser.add_argument(
+        "--shards", type=int, default=1,
+        help="Worker processes of the scan scenario, each with --workers threads (default: 1)",
+    )
+    parser.add_argument(
+        "--no-trade-cache", action="store_true",
+        help="Run the scan scenario without the trade cache",
+    )
+    parser.add_argument(
+        "--direct", action="store_true",
+        help="Call the synthetic market's methods directly, skipping the REST client, scheduler and response cache",
+    )
+    parser.add_argument(
+        "--plan", choices=PLAN_LIMITS, default=None,
+        help="Schedule requests under this Polygon plan's rate limit (default: unthrottled)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1,
+        help="Run every scenario this many times (default: 1)",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true",
+        help="Skip tracemalloc, which slows allocation-heavy code",
+    )
+    parser.add_argument(
+        "--json", type=str, default=None,
+        help="Also write the results to this JSON file",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show the scanners' own output")
+
+    main(parser.parse_args())
@@ -1,41 +1,106 @@
-from polygon import RESTClient
-import os
+from helpers.polygon_client import LazyClient
+from helpers.response_cache import add_cache_arguments, apply_cache_arguments
 import time
+from helpers.api_metrics import report, stage
+from helpers.contract_query import build_contract_query
+from helpers.daily_volume import aggs_window, volume_vector
+from helpers.figure_report import add_report_arguments, apply_report_arguments, show_figure, write_report
+from helpers.indicator_state import update_indicators
+from helpers.indicators import EMA_WINDOWS, align_closes, ema_matrix, stacked_mask
 from helpers.options_helpers import fetch_related_companies
-from collections import defaultdict
+from helpers.session_calendar import previous_session, sessions_between
+from helpers.spike_engine import detect_spikes, volume_matrix
+from helpers.trade_columns import fetch_trade_columns, merge_columns
+from helpers.trade_warehouse import ingest_trades
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+import numpy as np
 import plotly.graph_objects as go
 
-# Ensure the POLYGON_API_KEY is set as an environment variable
-API_KEY = os.getenv("POLYGON_API_KEY")
+# Created on first use; POLYGON_API_KEY must be set by then
+client = LazyClient()
 
-if not API_KEY:
-    raise EnvironmentError("POLYGON_API_KEY environment variable is not set.")
 
-# Initialize the RESTClient
-client = RESTClient(API_KEY)
+# Row order of the call/put flow matrix
+FLOW_TYPES = ("call", "put")
 
+# Contracts whose trades are fetched concurrently by fetch_option_volume
+FLOW_WORKERS = 16
 
-def fetch_option_volume(ticker, days=20):
+
+def fetch_contract_flow(option_ticker, start_date, sessions):
     """
-    Fetch options volume for the past N days and group by date.
+    Fetch one contract's trades since start_date as a per-session size vector.
+
+    Returns:
+        tuple: (size vector, trade columns), both empty if the fetch failed.
     """
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    option_flow = defaultdict(lambda: {"call": 0, "put": 0})
-
-    for option in client.list_options_contracts(ticker):
-        for trade in client.list_trades(
-            option.ticker, timestamp_gt=start_date.strftime("%Y-%m-%d")
-        ):
-            trade_date = datetime.utcfromtimestamp(
-                trade.sip_timestamp / 1_000_000_000
-            ).strftime("%Y-%m-%d")
-            if option.contract_type.lower() == "call":
-                option_flow[trade_date]["call"] += trade.size
-            elif option.contract_type.lower() == "put":
-                option_flow[trade_date]["put"] += trade.size
+    try:
+        columns = fetch_trade_columns(client, option_ticker, start_date, ingest=False)
+    except Exception as e:
+        print(f"Error fetching trades for {option_ticker}: {e}")
+        return np.zeros(len(sessions)), None
+    return volume_vector(columns["sip_timestamp"], columns["size"], sessions), columns
+
+
+def fetch_option_volume(ticker, days=20, workers=FLOW_WORKERS):
+    """
+    Fetch options volume for the past N days and group by date.
 
+    Contracts are fanned out over a bounded thread pool. Each worker returns a
+    call or put volume vector aligned to the sessions of the window, and the
+    vectors are summed into a 2 x sessions matrix as they complete. The
+    fetched trades are stored in the trade warehouse in one batch at the end.
+
+    The window ends at the last completed session, since the plan has no
+    same-day data, and sessions at its end without any flow are dropped, so
+    the last session returned is the latest one with trades.
+
+    Args:
+        ticker (str): Underlying stock ticker.
+        days (int): Number of calendar days to look back.
+        workers (int): Number of contracts fetched concurrently.
+
+    Returns:
+        dict: Every session in the window up to the latest with trades as keys
+              and {"call": size, "put": size} as values.
+    """
+    start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    session_list = sessions_between(start_date, previous_session())
+    sessions = np.array(session_list, dtype="datetime64[D]").astype(np.int64)
+
+    contracts = []
+    for option in client.list_options_contracts(ticker, **build_contract_query()):
+        contract_type = option.contract_type.lower()
+        if contract_type in FLOW_TYPES:
+            contracts.append((option.ticker, FLOW_TYPES.index(contract_type)))
+
+    flow = np.zeros((len(FLOW_TYPES), len(sessions)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_contract_flow, option_ticker, start_date, sessions): (option_ticker, row)
+            for option_ticker, row in contracts
+        }
+        fetched = {}
+        for future in as_completed(futures):
+            option_ticker, row = futures[future]
+            vector, columns = future.result()
+            flow[row] += vector
+            if columns is not None:
+                fetched[option_ticker] = columns
+
+    tickers = sorted(fetched)
+    ingest_trades(tickers, *merge_columns([fetched[option_ticker] for option_ticker in tickers]))
+
+    traded = np.flatnonzero(flow.sum(axis=0))
+    session_list = session_list[:traded[-1] + 1] if len(traded) else []
+
+    option_flow = {}
+    for i, session in enumerate(session_list):
+        option_flow[session] = {
+            contract_type: int(size) if size.is_integer() else size
+            for contract_type, size in zip(FLOW_TYPES, flow[:, i].tolist())
+        }
     return option_flow
 
 
@@ -43,34 +108,21 @@ def detect_flow_spikes(option_flow):
     """
     Detect significant spikes in option flows.
     """
-    dates = sorted(option_flow.keys())
-    historical_call_volumes = [option_flow[date]["call"] for date in dates[:-1]]
-    historical_put_volumes = [option_flow[date]["put"] for date in dates[:-1]]
-
-    # Calculate historical averages
-    avg_call_volume = (
-        sum(historical_call_volumes) / len(historical_call_volumes)
-        if historical_call_volumes
-        else 0
-    )
-    avg_put_volume = (
-        sum(historical_put_volumes) / len(historical_put_volumes)
-        if historical_put_volumes
-        else 0
-    )
-
-    # Check for spikes in the latest day
-    latest_date = dates[-1]
-    latest_call_volume = option_flow[latest_date]["call"]
-    latest_put_volume = option_flow[latest_date]["put"]
+    volumes, sessions = volume_matrix([
+        {date: flow[contract_type] for date, flow in option_flow.items()}
+        for contract_type in FLOW_TYPES
+    ])
+    if len(sessions) < 2:
+        print("Not enough historical data for analysis.")
+        return
 
-    print(f"Average Call Volume: {avg_call_volume:.2f}, Latest: {latest_call_volume}")
-    print(f"Average Put Volume: {avg_put_volume:.2f}, Latest: {latest_put_volume}")
+    call_stats, put_stats = detect_spikes(volumes)
+    latest_date = sessions[-1]
 
-    call_spike = latest_call_volume > 2 * avg_call_volume
-    put_spike = latest_put_volume > 2 * avg_put_volume
+    print(f"Average Call Volume: {call_stats['mean']:.2f}, Latest: {call_stats['latest']:.0f}")
+    print(f"Average Put Volume: {put_stats['mean']:.2f}, Latest: {put_stats['latest']:.0f}")
 
-    if call_spike or put_spike:
+    if call_stats["flow_spike"] or put_stats["flow_spike"]:
         print(f"Significant option flow spike detected on {latest_date}!")
     else:
         print(f"No significant spikes detected.")
@@ -95,7 +147,7 @@ def visualize_option_flows(option_flow, ticker):
         barmode="group",
         template="plotly_white",
     )
-    fig.show()
+    show_figure(fig, ticker)
 
 
 def analyze_option_flows(tickers):
@@ -104,9 +156,80 @@ def analyze_option_flows(tickers):
     """
     for ticker in tickers:
         print(f"Analyzing {ticker}...")
-        option_flow = fetch_option_volume(ticker, days=20)
-        detect_flow_spikes(option_flow)
-        visualize_option_flows(option_flow, ticker)
+        with stage("trade fetch"):
+            option_flow = fetch_option_volume(ticker, days=20)
+        with stage("analysis"):
+            detect_flow_spikes(option_flow)
+        with stage("rendering"):
+            visualize_option_flows(option_flow, ticker)
+
+
+# Daily bars requested per ticker; several times the longest EMA window so the
+# locally computed values converge to the ones Polygon reports
+EMA_LOOKBACK_DAYS = 550
+
+
+def fetch_daily_closes(ticker, days=EMA_LOOKBACK_DAYS):
+    """
+    Fetch a ticker's daily closes, oldest first.
+
+    Args:
+        ticker (str): Stock ticker.
+        days (int): Number of calendar days to look back.
+
+    Returns:
+        np.ndarray: Daily closes, empty if the request failed.
+    """
+    from_date, to_date = aggs_window(days)
+    try:
+        aggs = client.get_aggs(ticker, 1, "day", from_date, to_date, limit=50000)
+        return np.array([agg.close for agg in aggs if agg.close is not None], dtype=np.float64)
+    except Exception as e:
+        print(f"Error fetching daily bars for {ticker}: {e}")
+        return np.array([], dtype=np.float64)
+
+
+def screen_ema_stacking(tickers, ema_windows=EMA_WINDOWS, workers=8, use_state=True, rebuild=False):
+    """
+    Evaluate EMA stacking for many tickers at once.
+
+    With use_state, each ticker's persisted indicator state is advanced by the
+    bars since its last update (normally one). Otherwise one daily-bar series is
+    fetched per ticker and every EMA window is recomputed locally. Either way
+    the stacking predicate runs on a tickers x windows matrix.
+
+    Args:
+        tickers (list): Stock tickers.
+        ema_windows (tuple): EMA windows, shortest first.
+        workers (int): Number of threads fetching daily bars.
+        use_state (bool): Use the incremental indicator store (default windows only).
+        rebuild (bool): Rebuild the persisted indicator states from scratch.
+
+    Returns:
+        dict: Tickers as keys and True if their EMAs are stacked in descending order.
+    """
+    tickers = list(tickers)
+    if not tickers:
+        return {}
+
+    if use_state and tuple(ema_windows) == EMA_WINDOWS:
+
+        def latest_emas(ticker):
+            try:
+                values = update_indicators(client, ticker, rebuild=rebuild)
+            except Exception as e:
+                print(f"Error updating indicators for {ticker}: {e}")
+                return [np.nan] * len(ema_windows)
+            return [values[f"ema_{window}"] for window in ema_windows]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            emas = np.array(list(executor.map(latest_emas, tickers)), dtype=np.float64)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            closes = align_closes(list(executor.map(fetch_daily_closes, tickers)))
+        emas = ema_matrix(closes, ema_windows)
+
+    return dict(zip(tickers, stacked_mask(emas).tolist()))
 
 
 def is_ema_stacked(ticker):
@@ -119,34 +242,17 @@ def is_ema_stacked(ticker):
     Returns:
         bool: True if EMAs are stacked, False otherwise.
     """
-    ema_windows = [8, 21, 34, 55, 89]
-    ema_values = []
-
-    for window in ema_windows:
-        ema = client.get_ema(
-            ticker=ticker, timespan="day", window=window, series_type="close", limit=1
-        )
-        # Extract the most recent EMA value
-        if ema:
-            latest_ema = ema.values[0].value
-            ema_values.append(latest_ema)
-        else:
-            # If EMA data is missing, assume it's not stacked
-            return False
-
-        # Guard clause: Check if EMAs are not stacked
-        if len(ema_values) > 1 and ema_values[-2] <= ema_values[-1]:
-            return False
-
-    return True
+    return screen_ema_stacking([ticker])[ticker]
 
 
-def find_stacked_tickers(base_ticker):
+def find_stacked_tickers(base_ticker, use_state=True, rebuild=False):
     """
     Find related tickers with EMAs stacked in descending order.
 
     Args:
         base_ticker (str): The base stock ticker.
+        use_state (bool): Use the incremental indicator store.
+        rebuild (bool): Rebuild the persisted indicator states from scratch.
 
     Returns:
         list: Tickers with stacked EMAs.
@@ -154,13 +260,16 @@ def find_stacked_tickers(base_ticker):
     stacked_tickers = []
 
     # Fetch related companies
-    related_companies = fetch_related_companies(base_ticker, depth=2)
+    with stage("graph expansion"):
+        related_companies = fetch_related_companies(base_ticker, depth=2)
     # related_companies = []
     # related_companies.append(base_ticker)
 
-    for ticker in related_companies:
-        print(f"Checking EMA stacking for {ticker}...")
-        if is_ema_stacked(ticker):
+    print(f"Checking EMA stacking for {len(related_companies)} tickers...")
+    with stage("indicators"):
+        screened = screen_ema_stacking(sorted(related_companies), use_state=use_state, rebuild=rebuild)
+    for ticker, stacked in screened.items():
+        if stacked:
             print(f"{ticker} has stacked EMAs.")
             stacked_tickers.append(ticker)
         else:
@@ -169,13 +278,45 @@ def find_stacked_tickers(base_ticker):
     return stacked_tickers
 
 
-if __name__ == "__main__":
-    import argparse
-
-    parser = argparse.ArgumentParser(description="Search stocks for Ree's criteria")
+def add_arguments(parser):
+    """
+    Add the screen's command-line arguments to a parser, also used by the tyche CLI.
+    """
     parser.add_argument("symbol", type=str, help="Stock symbol (e.g., AAPL)")
+    parser.add_argument(
+        "--no-indicator-state",
+        dest="use_state",
+        action="store_false",
+        help="Recompute EMAs from full daily history instead of the persisted indicator state",
+    )
+    parser.add_argument(
+        "--rebuild-indicators",
+        action="store_true",
+        help="Rebuild the persisted indicator state of every ticker from scratch",
+    )
+    add_cache_arguments(parser)
+    add_report_arguments(parser)
+
 
-    args = parser.parse_args()
-    stacked = find_stacked_tickers(args.symbol)
+def run(args):
+    """
+    Run the screen with parsed command-line arguments and report the API cost.
+    """
+    apply_cache_arguments(args)
+    apply_report_arguments(args)
+    stacked = find_stacked_tickers(
+        args.symbol, use_state=args.use_state, rebuild=args.rebuild_indicators
+    )
     analyze_option_flows(stacked)
     print("Tickers with stacked EMAs:", stacked)
+    with stage("rendering"):
+        write_report(f"{args.symbol} stacked EMA option flows")
+    report()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search stocks for Ree's criteria")
+    add_arguments(parser)
+    run(parser.parse_args())
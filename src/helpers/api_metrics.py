@@ -0,0 +1,215 @@
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+REPORT_PATH = "api_report.json"
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Request paths -> the RESTClient method that issues them
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^/v3/reference/options/contracts/[^/]+$"), "get_options_contract"),
+    (re.compile(r"^/v3/reference/options/contracts$"), "list_options_contracts"),
+    (re.compile(r"^/v3/reference/tickers/[^/]+$"), "get_ticker_details"),
+    (re.compile(r"^/v3/trades/"), "list_trades"),
+    (re.compile(r"^/v1/related-companies/"), "get_related_companies"),
+    (re.compile(r"^/v2/aggs/grouped/"), "get_grouped_daily_aggs"),
+    (re.compile(r"^/v2/aggs/ticker/[^/]+/range/"), "get_aggs"),
+    (re.compile(r"^/v1/open-close/"), "get_daily_open_close_agg"),
+    (re.compile(r"^/v3/snapshot/options/[^/]+/[^/]+$"), "get_snapshot_option"),
+    (re.compile(r"^/v3/snapshot/options/[^/]+$"), "list_snapshot_options_chain"),
+]
+
+_lock = threading.Lock()
+_started = time.perf_counter()
+_endpoints = {}
+_stages = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+
+
+def endpoint_name(path):
+    """
+    Name the endpoint of a request path (with or without query string).
+    """
+    path = path.split("?", 1)[0]
+    for pattern, name in ENDPOINT_PATTERNS:
+        if pattern.match(path):
+            return name
+    return "/".join(path.split("/")[:4])
+
+
+def new_endpoint():
+    return {
+        "calls": 0,
+        "pages": 0,
+        "cached": 0,
+        "bytes": 0,
+        "errors": 0,
+        "retries": 0,
+        "seconds": 0.0,
+        "max_seconds": 0.0,
+        "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        "statuses": Counter(),
+    }
+
+
+def record_request(path, seconds, nbytes=0, status=None, retries=0, error=None):
+    """
+    Record one HTTP request.
+
+    Requests whose path carries a pagination cursor, and retried attempts,
+    count as further pages of a call rather than as new calls.
+
+    Args:
+        path (str): Request path, including the query string for follow-up pages.
+        seconds (float): Latency, including any transport-level retries.
+        nbytes (int): Response body size.
+        status (int): HTTP status, None if no response was received.
+        retries (int): Retries made before this response (1 for a retried attempt).
+        error (str): Exception name if the request raised.
+    """
+    name = endpoint_name(path)
+    bucket = sum(seconds * 1000 > bound for bound in LATENCY_BUCKETS_MS)
+
+    with _lock:
+        endpoint = _endpoints.get(name)
+        if endpoint is None:
+            endpoint = _endpoints[name] = new_endpoint()
+        if "cursor=" not in path and not retries:
+            endpoint["calls"] += 1
+        endpoint["pages"] += 1
+        endpoint["bytes"] += nbytes
+        endpoint["retries"] += retries
+        endpoint["seconds"] += seconds
+        endpoint["max_seconds"] = max(endpoint["max_seconds"], seconds)
+        endpoint["histogram"][bucket] += 1
+        endpoint["statuses"][str(status) if status is not None else error or "error"] += 1
+        if error is not None or (status is not None and status != 200):
+            endpoint["errors"] += 1
+
+
+def record_cache_hit(path):
+    """
+    Record a request answered from the local response cache instead of the network.
+    """
+    name = endpoint_name(path)
+    with _lock:
+        endpoint = _endpoints.get(name)
+        if endpoint is None:
+            endpoint = _endpoints[name] = new_endpoint()
+        endpoint["cached"] += 1
+
+
+def merge_endpoints(endpoints):
+    """
+    Add the endpoint counters another process recorded (its snapshot()["endpoints"]) to this process'.
+    """
+    with _lock:
+        for name, other in endpoints.items():
+            endpoint = _endpoints.get(name)
+            if endpoint is None:
+                endpoint = _endpoints[name] = new_endpoint()
+            for key in ("calls", "pages", "cached", "bytes", "errors", "retries", "seconds"):
+                endpoint[key] += other[key]
+            endpoint["max_seconds"] = max(endpoint["max_seconds"], other["max_seconds"])
+            endpoint["histogram"] = [a + b for a, b in zip(endpoint["histogram"], other["histogram"])]
+            endpoint["statuses"].update(other["statuses"])
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a stage of a run (graph expansion, contract discovery, trade fetch, analysis, rendering).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _stages[name]["calls"] += 1
+            _stages[name]["seconds"] += elapsed
+
+
+def percentile_ms(histogram, fraction):
+    """
+    Upper bound of the histogram bucket holding the given fraction of requests.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS + (float("inf"),), histogram):
+        seen += count
+        if seen >= fraction * total:
+            return bound
+    return float("inf")
+
+
+def snapshot():
+    """
+    Returns everything recorded so far as a JSON-serializable dict.
+    """
+    with _lock:
+        endpoints = {
+            name: {**endpoint, "statuses": dict(endpoint["statuses"]), "histogram": list(endpoint["histogram"])}
+            for name, endpoint in sorted(_endpoints.items())
+        }
+        stages = {name: dict(values) for name, values in _stages.items()}
+
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "wall_seconds": time.perf_counter() - _started,
+        "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+        "totals": {
+            key: sum(endpoint[key] for endpoint in endpoints.values())
+            for key in ("calls", "pages", "cached", "bytes", "errors", "retries", "seconds")
+        },
+        "endpoints": endpoints,
+        "stages": stages,
+    }
+
+
+def print_summary(data=None):
+    """
+    Print the per-endpoint and per-stage tables of a snapshot.
+    """
+    data = data or snapshot()
+
+    print(f"\n{'endpoint':<28} {'calls':>6} {'pages':>6} {'cached':>6} {'MB':>8} {'errors':>6} "
+          f"{'retries':>7} {'total s':>8} {'mean ms':>8} {'p50 ms':>7} {'p95 ms':>7}")
+    for name, e in data["endpoints"].items():
+        mean_ms = 1000 * e["seconds"] / e["pages"] if e["pages"] else 0.0
+        p50, p95 = percentile_ms(e["histogram"], 0.5), percentile_ms(e["histogram"], 0.95)
+        p50, p95 = ("-" if p is None else p for p in (p50, p95))
+        print(f"{name:<28} {e['calls']:>6} {e['pages']:>6} {e['cached']:>6} {e['bytes'] / 2**20:>8.2f} "
+              f"{e['errors']:>6} {e['retries']:>7} {e['seconds']:>8.2f} {mean_ms:>8.1f} {p50:>7} {p95:>7}")
+
+    if data["stages"]:
+        print(f"\n{'stage':<28} {'calls':>6} {'total s':>8}")
+        for name, s in data["stages"].items():
+            print(f"{name:<28} {s['calls']:>6} {s['seconds']:>8.2f}")
+
+    print(f"\nWall time: {data['wall_seconds']:.2f}s")
+
+
+def report(path=REPORT_PATH):
+    """
+    Print the summary tables and write the JSON report, if any request or stage was recorded.
+
+    Args:
+        path (str): JSON report path, None to only print.
+    """
+    data = snapshot()
+    if not data["endpoints"] and not data["stages"]:
+        return
+
+    print_summary(data)
+    if path:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        print(f"API report written to {path}")
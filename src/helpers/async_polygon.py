@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from polygon.rest.models import (
+    Agg,
+    DailyOpenCloseAgg,
+    OptionContractSnapshot,
+    OptionsContract,
+    RelatedCompany,
+    Trade,
+)
+from tenacity import AsyncRetrying, retry_if_exception_type
+
+from . import response_cache
+from .api_metrics import record_cache_hit, record_request
+from .request_scheduler import (
+    RETRY_STATUSES,
+    RetryableResponse,
+    get_scheduler,
+    lane_of,
+    retry_after_seconds,
+    retry_stop,
+    retry_wait,
+)
+
+BASE_URL = "https://api.polygon.io"
+
+
+def to_query_params(filters):
+    """
+    Convert keyword filters to Polygon query parameters.
+
+    Mirrors the naming used by RESTClient, e.g. strike_price_gt -> strike_price.gt.
+
+    Args:
+        filters (dict): Keyword filters, None values are dropped.
+
+    Returns:
+        dict: Query parameters.
+    """
+    params = {}
+    for name, value in filters.items():
+        if value is None:
+            continue
+        for ext in ("lt", "lte", "gt", "gte"):
+            if name.endswith(f"_{ext}"):
+                name = f"{name[:-len(ext) - 1]}.{ext}"
+                break
+        if isinstance(value, bool):
+            value = str(value).lower()
+        params[name] = value
+    return params
+
+
+class AsyncPolygonClient:
+    """
+    Asyncio client for the Polygon endpoints used by the scanners.
+
+    All requests share one httpx connection pool and a semaphore that bounds the
+    number of requests in flight, so thousands of coroutines can be scheduled on
+    a single event loop. Results are deserialized into the same models RESTClient
+    returns, so code written against RESTClient can consume them unchanged.
+
+    Args:
+        api_key (str): Polygon API key, defaults to POLYGON_API_KEY.
+        base_url (str): API root, override to point at a local fake server.
+        max_in_flight (int): Maximum number of concurrent requests.
+        max_connections (int): Maximum number of open HTTP connections.
+        timeout (float): Per-request timeout in seconds.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        base_url=BASE_URL,
+        max_in_flight=1000,
+        max_connections=100,
+        timeout=30.0,
+    ):
+        api_key = api_key or os.getenv("POLYGON_API_KEY")
+        if not api_key:
+            raise EnvironmentError("POLYGON_API_KEY environment variable is not set.")
+
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}", "Accept-Encoding": "gzip"},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+        )
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def _get(self, path, params=None):
+        body = response_cache.lookup(path, params)
+        if body is not None:
+            record_cache_hit(path)
+            return json.loads(body)
+
+        retrying = AsyncRetrying(
+            stop=retry_stop,
+            wait=retry_wait,
+            retry=retry_if_exception_type((RetryableResponse, httpx.TransportError)),
+            reraise=True,
+        )
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    retried = attempt.retry_state.attempt_number > 1
+                    response = await self._send(path, params, retried)
+        except RetryableResponse as e:
+            response = e.response
+
+        response.raise_for_status()
+        response_cache.store(path, params, response.content)
+        return response.json()
+
+    async def _send(self, path, params, retried):
+        """
+        Send one attempt through the shared request scheduler and record it.
+        """
+        # Cursor pages are recorded as further pages of the same call
+        label = f"{path}?cursor=" if params and "cursor" in params else path
+        scheduler = get_scheduler()
+        await scheduler.acquire_async(lane_of(path))
+
+        async with self._in_flight:
+            start = time.perf_counter()
+            try:
+                response = await self._http.get(path, params=params)
+            except Exception as e:
+                record_request(label, time.perf_counter() - start, retries=int(retried), error=type(e).__name__)
+                raise
+            record_request(
+                label, time.perf_counter() - start, len(response.content), response.status_code, int(retried)
+            )
+
+        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+        scheduler.on_response(response.status_code, retry_after)
+        if response.status_code in RETRY_STATUSES:
+            raise RetryableResponse(response, response.status_code, retry_after)
+        return response
+
+    async def _paginate(self, path, params, deserializer):
+        while True:
+            data = await self._get(path, params)
+            for result in data.get("results", []):
+                yield deserializer(result)
+
+            next_url = data.get("next_url")
+            if not next_url:
+                return
+
+            # next_url carries the cursor in its query string; keep our own base url
+            url = httpx.URL(next_url)
+            path, params = url.path, url.params
+
+    def list_options_contracts(self, underlying_ticker, **filters):
+        """
+        Iterate over the reference options contracts of an underlying.
+
+        Args:
+            underlying_ticker (str): The underlying stock ticker.
+            **filters: Extra filters, e.g. contract_type="call", strike_price_gt=10.
+
+        Returns:
+            AsyncIterator[OptionsContract]: Contracts across all pages.
+        """
+        params = to_query_params({"underlying_ticker": underlying_ticker, **filters})
+        return self._paginate(
+            "/v3/reference/options/contracts", params, OptionsContract.from_dict
+        )
+
+    def list_trades(self, ticker, **filters):
+        """
+        Iterate over the trades of a ticker.
+
+        Args:
+            ticker (str): Stock or option ticker.
+            **filters: Extra filters, e.g. timestamp_gt="2024-01-01", limit=50000.
+
+        Returns:
+            AsyncIterator[Trade]: Trades across all pages.
+        """
+        return self._paginate(f"/v3/trades/{ticker}", to_query_params(filters), Trade.from_dict)
+
+    async def get_snapshot_option(self, underlying_asset, option_contract):
+        data = await self._get(f"/v3/snapshot/options/{underlying_asset}/{option_contract}")
+        return OptionContractSnapshot.from_dict(data.get("results", {}))
+
+    async def get_daily_open_close_agg(self, ticker, date):
+        data = await self._get(f"/v1/open-close/{ticker}/{date}")
+        return DailyOpenCloseAgg.from_dict(data)
+
+    async def get_aggs(self, ticker, multiplier, timespan, from_, to, **filters):
+        path = f"/v2/aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{from_}/{to}"
+        return [agg async for agg in self._paginate(path, to_query_params(filters), Agg.from_dict)]
+
+    async def get_related_companies(self, ticker):
+        data = await self._get(f"/v1/related-companies/{ticker}")
+        return [RelatedCompany.from_dict(r) for r in data.get("results", [])]
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+# Largest page size the reference options contracts endpoint accepts
+CONTRACTS_PAGE_LIMIT = 1000
+
+
+def format_date(value):
+    """
+    Format a date, datetime or YYYY-MM-DD string as YYYY-MM-DD.
+    """
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def build_contract_query(
+    contract_type=None,
+    strike_gt=None,
+    strike_gte=None,
+    strike_lt=None,
+    strike_lte=None,
+    expiration_date=None,
+    expiration_gte=None,
+    expiration_lte=None,
+    limit=CONTRACTS_PAGE_LIMIT,
+):
+    """
+    Build list_options_contracts keyword arguments that filter on the server.
+
+    Pushing contract type, strike range and expiration range into the request
+    keeps large chains from transferring thousands of irrelevant contracts, and
+    the maximum page size keeps the number of pages down.
+
+    Args:
+        contract_type (str): "call" or "put".
+        strike_gt (float): Strikes strictly above this price.
+        strike_gte (float): Strikes at or above this price.
+        strike_lt (float): Strikes strictly below this price.
+        strike_lte (float): Strikes at or below this price.
+        expiration_date (str|date): Exact expiration date.
+        expiration_gte (str|date): Earliest expiration date.
+        expiration_lte (str|date): Latest expiration date.
+        limit (int): Page size.
+
+    Returns:
+        dict: Keyword arguments for client.list_options_contracts.
+    """
+    query = {
+        "contract_type": contract_type,
+        "strike_price_gt": strike_gt,
+        "strike_price_gte": strike_gte,
+        "strike_price_lt": strike_lt,
+        "strike_price_lte": strike_lte,
+        "expiration_date": format_date(expiration_date),
+        "expiration_date_gte": format_date(expiration_gte),
+        "expiration_date_lte": format_date(expiration_lte),
+        "limit": limit,
+    }
+    return {name: value for name, value in query.items() if value is not None}
@@ -0,0 +1,139 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+VOLUME_SOURCES = ("trades", "aggs")
+
+NEW_YORK = ZoneInfo("America/New_York")
+NANOS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def session_days(timestamps):
+    """
+    Map nanosecond UTC timestamps to their New York calendar day.
+
+    The UTC offset is looked up once per distinct UTC day (at noon UTC) rather
+    than per trade. DST changes at 2am local on Sundays, so the offset is exact
+    for every timestamp inside a trading session.
+
+    Args:
+        timestamps (np.ndarray): int64 nanoseconds since the epoch.
+
+    Returns:
+        np.ndarray: int64 days since the epoch in New York time.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    utc_days, inverse = np.unique(timestamps // NANOS_PER_DAY, return_inverse=True)
+    offsets = np.array(
+        [
+            datetime.fromtimestamp(int(day) * 86_400 + 43_200, timezone.utc)
+            .astimezone(NEW_YORK)
+            .utcoffset()
+            .total_seconds()
+            for day in utc_days
+        ],
+        dtype=np.int64,
+    ) * 1_000_000_000
+    return (timestamps + offsets[inverse.reshape(-1)]) // NANOS_PER_DAY
+
+
+def volume_by_session(timestamps, sizes):
+    """
+    Sum trade sizes per New York trading day.
+
+    Args:
+        timestamps (np.ndarray): int64 sip timestamps in nanoseconds.
+        sizes (np.ndarray): Trade sizes.
+
+    Returns:
+        defaultdict: Dates (YYYY-MM-DD) as keys and total traded size as values.
+    """
+    volume_by_day = defaultdict(int)
+    if len(timestamps) == 0:
+        return volume_by_day
+
+    days, inverse = np.unique(session_days(timestamps), return_inverse=True)
+    totals = np.bincount(inverse.reshape(-1), weights=sizes, minlength=len(days))
+
+    for date, total in zip(days.astype("datetime64[D]").astype(str).tolist(), totals.tolist()):
+        volume_by_day[date] = int(total) if total.is_integer() else total
+    return volume_by_day
+
+
+def volume_vector(timestamps, sizes, sessions):
+    """
+    Sum trade sizes into a vector aligned to a fixed list of sessions.
+
+    Vectors built against the same sessions can be merged with a plain array
+    add, which keeps per-contract results compact when many are combined.
+
+    Args:
+        timestamps (np.ndarray): int64 sip timestamps in nanoseconds.
+        sizes (np.ndarray): Trade sizes.
+        sessions (np.ndarray): Sorted int64 session days since the epoch.
+
+    Returns:
+        np.ndarray: float64 total size per session; trades outside the sessions are dropped.
+    """
+    if len(timestamps) == 0 or len(sessions) == 0:
+        return np.zeros(len(sessions))
+
+    days = session_days(timestamps)
+    i = np.minimum(np.searchsorted(sessions, days), len(sessions) - 1)
+    inside = sessions[i] == days
+    return np.bincount(i[inside], weights=sizes[inside], minlength=len(sessions))
+
+
+def aggs_to_volume_by_day(aggs):
+    """
+    Convert daily bars into a date -> volume mapping.
+
+    Daily bar timestamps are the start of the session in Eastern time, expressed
+    in UTC milliseconds, so their UTC date is the session date.
+
+    Args:
+        aggs (iterable): Agg objects with timestamp and volume.
+
+    Returns:
+        defaultdict: Dates as keys and total traded volume as values.
+    """
+    volume_by_day = defaultdict(int)
+    for agg in aggs:
+        if agg.volume:
+            session = datetime.utcfromtimestamp(agg.timestamp / 1000).strftime("%Y-%m-%d")
+            volume_by_day[session] += int(agg.volume)
+    return volume_by_day
+
+
+def aggs_window(days, end_date=None):
+    """
+    Return the (from, to) date strings for a daily-bar lookback window.
+    """
+    end_date = end_date or datetime.now()
+    start_date = end_date - timedelta(days=days)
+    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+
+def get_volume_from_aggs(client, ticker, days=20, end_date=None):
+    """
+    Fetch per-day volume for a ticker from daily bars instead of individual trades.
+
+    One request returns the whole lookback window, however many trades the
+    contract printed, so this is much cheaper than enumerating trades when only
+    daily totals are needed.
+
+    Args:
+        client (RESTClient): Polygon client.
+        ticker (str): Stock or option ticker.
+        days (int): Number of calendar days to look back.
+        end_date (datetime): Last day of the window, defaults to today.
+
+    Returns:
+        defaultdict: Dates as keys and total traded volume as values.
+    """
+    from_date, to_date = aggs_window(days, end_date)
+    return aggs_to_volume_by_day(
+        client.get_aggs(ticker, 1, "day", from_date, to_date, limit=50000)
+    )
@@ -0,0 +1,222 @@
+import html
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# Heatmaps larger than this are block-summed down before plotting
+HEATMAP_MAX_ROWS = 150
+HEATMAP_MAX_COLS = 250
+
+# Below this many figures a process pool costs more to start than it saves
+MIN_POOL_FIGURES = 8
+
+PLOTLYJS_NAME = "plotly.min.js"
+
+_lock = threading.Lock()
+_settings = {"path": None, "directory": None, "workers": None}
+# (group, figure dict) of every figure collected since the last write_report
+_figures = []
+
+
+def configure_figures(path=None, directory=None, workers=None):
+    """
+    Choose between showing figures interactively and collecting them into a headless report.
+
+    Args:
+        path (str): Write every figure of the run into this self-contained HTML file.
+        directory (str): Write one HTML file per ticker (plus an index) into this directory.
+        workers (int): Processes rendering the report, defaults to one per CPU.
+    """
+    _settings["path"] = path
+    _settings["directory"] = directory
+    _settings["workers"] = workers
+
+
+def add_report_arguments(parser):
+    """
+    Add the --report, --report-dir and --render-workers options to a command-line parser.
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Write all charts into this HTML file instead of opening them one by one"
+    )
+    group.add_argument(
+        "--report-dir",
+        type=str,
+        default=None,
+        help="Write one HTML file of charts per ticker into this directory"
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=None,
+        help="Processes rendering the report (default: one per CPU)"
+    )
+
+
+def apply_report_arguments(args):
+    """
+    Configure figure output from options added by add_report_arguments.
+    """
+    configure_figures(args.report, args.report_dir, args.render_workers)
+
+
+def is_headless():
+    return bool(_settings["path"] or _settings["directory"])
+
+
+def show_figure(fig, group):
+    """
+    Show a figure, or keep it for the report when running headless.
+
+    Args:
+        fig (go.Figure): The figure.
+        group (str): Ticker the figure belongs to; figures are grouped by it in the report.
+    """
+    if not is_headless():
+        fig.show()
+        return
+
+    with _lock:
+        _figures.append((group, fig.to_dict()))
+
+
+def downsample_heatmap(z, x, y, max_cols=HEATMAP_MAX_COLS, max_rows=HEATMAP_MAX_ROWS):
+    """
+    Sum blocks of adjacent heatmap cells so the grid fits in max_rows x max_cols.
+
+    Each block is labelled with its first row/column label, so a strike x date
+    heatmap keeps its axes readable and every trade is still counted.
+
+    Args:
+        z (list): Rows of cell values, one row per y label.
+        x (list): Column labels.
+        y (list): Row labels.
+
+    Returns:
+        tuple: (z, x, y) after downsampling.
+    """
+    z = np.asarray(z, dtype=np.float64)
+    if z.size == 0:
+        return z, list(x), list(y)
+
+    row_step = -(-len(y) // max_rows)
+    col_step = -(-len(x) // max_cols)
+    if row_step == 1 and col_step == 1:
+        return z, list(x), list(y)
+
+    rows, cols = -(-z.shape[0] // row_step), -(-z.shape[1] // col_step)
+    padded = np.zeros((rows * row_step, cols * col_step))
+    padded[:z.shape[0], :z.shape[1]] = z
+    z = padded.reshape(rows, row_step, cols, col_step).sum(axis=(1, 3))
+    return z, list(x)[::col_step], list(y)[::row_step]
+
+
+def render_figure(fig_dict):
+    """
+    Render one figure to an HTML fragment; runs in the report's worker processes.
+    """
+    import plotly.io as pio
+
+    return pio.to_html(fig_dict, include_plotlyjs=False, full_html=False, validate=False)
+
+
+def render_all(figures, workers=None):
+    """
+    Render figure dicts to HTML fragments, in a process pool when there are enough of them.
+    """
+    dicts = [fig_dict for _, fig_dict in figures]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(dicts) < MIN_POOL_FIGURES:
+        return [render_figure(fig_dict) for fig_dict in dicts]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(dicts))) as executor:
+        return list(executor.map(render_figure, dicts, chunksize=max(1, len(dicts) // (workers * 4))))
+
+
+def page(title, body, script):
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{html.escape(title)}</title>\n{script}\n"
+        "<style>body{font-family:sans-serif;margin:2em} section{margin-bottom:3em}</style>\n"
+        f"</head>\n<body>\n<h1>{html.escape(title)}</h1>\n{body}\n</body>\n</html>\n"
+    )
+
+
+def file_name(group):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", group) + ".html"
+
+
+def write_report(title=None):
+    """
+    Render every collected figure and write the report, then forget the figures.
+
+    Does nothing when figures are shown interactively or none were collected.
+
+    Args:
+        title (str): Report title, defaults to the generation time.
+
+    Returns:
+        list: Paths of the written HTML files.
+    """
+    with _lock:
+        figures = list(_figures)
+        _figures.clear()
+    if not is_headless() or not figures:
+        return []
+
+    from plotly.offline import get_plotlyjs
+
+    title = title or f"Options report {datetime.now():%Y-%m-%d %H:%M}"
+    fragments = render_all(figures, _settings["workers"])
+
+    # Keep each ticker's charts together, in the order the tickers were first seen
+    sections = {}
+    for (group, _), fragment in zip(figures, fragments):
+        sections.setdefault(group, []).append(fragment)
+
+    if _settings["path"]:
+        nav = " | ".join(
+            f'<a href="#{html.escape(file_name(group))}">{html.escape(group)}</a>' for group in sections
+        )
+        body = f"<nav>{nav}</nav>\n" + "\n".join(
+            f'<section id="{html.escape(file_name(group))}">\n<h2>{html.escape(group)}</h2>\n'
+            + "\n".join(parts) + "\n</section>"
+            for group, parts in sections.items()
+        )
+        with open(_settings["path"], "w", encoding="utf-8") as f:
+            f.write(page(title, body, f"<script>{get_plotlyjs()}</script>"))
+        paths = [_settings["path"]]
+    else:
+        directory = _settings["directory"]
+        os.makedirs(directory, exist_ok=True)
+        # One copy of plotly.js shared by every page
+        with open(os.path.join(directory, PLOTLYJS_NAME), "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+
+        script = f'<script src="{PLOTLYJS_NAME}"></script>'
+        paths = []
+        for group, parts in sections.items():
+            path = os.path.join(directory, file_name(group))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(page(f"{group} - {title}", "\n".join(parts), script))
+            paths.append(path)
+
+        links = "\n".join(
+            f'<li><a href="{html.escape(file_name(group))}">{html.escape(group)}</a> ({len(parts)} charts)</li>'
+            for group, parts in sections.items()
+        )
+        index = os.path.join(directory, "index.html")
+        with open(index, "w", encoding="utf-8") as f:
+            f.write(page(title, f"<ul>\n{links}\n</ul>", ""))
+        paths.append(index)
+
+    print(f"Report with {len(figures)} charts written to {paths[0] if len(paths) == 1 else _settings['directory']}")
+    return paths
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from .daily_volume import aggs_window
+from .indicators import indicator_values, new_indicator_state, update_indicator_state
+from .session_calendar import next_session, previous_session, sessions_between
+
+DB_PATH = "indicator_state.db"
+
+# Daily bars used for a full rebuild; several times the longest EMA window
+REBUILD_LOOKBACK_DAYS = 550
+
+# A state that has missed more sessions than this is rebuilt from scratch
+MAX_GAP_SESSIONS = 5
+
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Returns this thread's connection to the indicator store, creating the table on first use.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indicator_state (
+                    ticker TEXT PRIMARY KEY,
+                    last_date TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+        _local.conn = conn
+    return conn
+
+
+def load_state(ticker):
+    """
+    Retrieves the persisted indicator state of a ticker, or None.
+    """
+    row = get_connection().execute("""
+        SELECT state FROM indicator_state WHERE ticker = ?
+    """, (ticker,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def save_state(ticker, state):
+    """
+    Persists the indicator state of a ticker.
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO indicator_state (ticker, last_date, state, updated_at)
+            VALUES (?, ?, ?, ?)
+        """, (ticker, state["last_date"], json.dumps(state), datetime.now().isoformat()))
+
+
+def is_stale(state, last_session):
+    """
+    Returns True if a state must be rebuilt instead of advanced.
+    """
+    if state is None or state["last_date"] is None:
+        return True
+
+    defaults = new_indicator_state()
+    for key in ("ema_windows", "sma_windows", "rsi_period", "atr_period"):
+        if state[key] != defaults[key]:
+            return True
+
+    missed = sessions_between(next_session(state["last_date"]), last_session)
+    return len(missed) > MAX_GAP_SESSIONS
+
+
+def fold_bars(state, aggs):
+    """
+    Advance a state with every daily bar newer than its last date.
+    """
+    for agg in aggs:
+        bar_date = datetime.utcfromtimestamp(agg.timestamp / 1000).strftime("%Y-%m-%d")
+        if agg.close is None or (state["last_date"] and bar_date <= state["last_date"]):
+            continue
+        update_indicator_state(state, bar_date, agg.high, agg.low, agg.close)
+    return state
+
+
+def update_indicators(client, ticker, rebuild=False):
+    """
+    Bring a ticker's indicators up to the last completed session.
+
+    A ticker with a fresh state only requests the bars since its last update
+    (normally one), and each bar is folded in constant time. A missing, stale
+    or differently configured state is rebuilt from REBUILD_LOOKBACK_DAYS of bars.
+
+    Args:
+        client (RESTClient): Polygon client.
+        ticker (str): Stock ticker.
+        rebuild (bool): Ignore the persisted state and rebuild it.
+
+    Returns:
+        dict: Indicator values, see indicators.indicator_values.
+    """
+    last_session = previous_session()
+    state = None if rebuild else load_state(ticker)
+
+    if is_stale(state, last_session):
+        state = new_indicator_state()
+        from_date, _ = aggs_window(REBUILD_LOOKBACK_DAYS)
+    elif state["last_date"] >= last_session:
+        return indicator_values(state)
+    else:
+        from_date = next_session(state["last_date"])
+
+    aggs = client.get_aggs(ticker, 1, "day", from_date, last_session, limit=50000)
+    fold_bars(state, aggs)
+
+    if state["last_date"] is not None:
+        save_state(ticker, state)
+    return indicator_values(state)
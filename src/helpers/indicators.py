@@ -0,0 +1,186 @@
+import numpy as np
+
+EMA_WINDOWS = (8, 21, 34, 55, 89)
+
+
+def align_closes(close_series):
+    """
+    Stack close series of different lengths into one matrix.
+
+    Series are right-aligned on their latest bar and left-padded with NaN, so
+    column -1 is every ticker's most recent close.
+
+    Args:
+        close_series (list): One 1-D sequence of closes per ticker, oldest first.
+
+    Returns:
+        np.ndarray: float64 matrix of shape (tickers, bars).
+    """
+    length = max((len(closes) for closes in close_series), default=0)
+    matrix = np.full((len(close_series), length), np.nan)
+    for row, closes in enumerate(close_series):
+        if len(closes):
+            matrix[row, length - len(closes):] = closes
+    return matrix
+
+
+def ema_matrix(closes, windows=EMA_WINDOWS):
+    """
+    Compute the latest EMA of every ticker for every window.
+
+    The recursion runs once over the bars while each step updates all tickers
+    and windows together. Each EMA is seeded with the ticker's first close and
+    is NaN when the ticker has fewer bars than the window.
+
+    Args:
+        closes (np.ndarray): Matrix of shape (tickers, bars) from align_closes.
+        windows (tuple): EMA windows.
+
+    Returns:
+        np.ndarray: Matrix of shape (tickers, windows).
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    windows = np.asarray(windows)
+    alpha = 2.0 / (windows + 1.0)
+
+    ema = np.full((closes.shape[0], len(windows)), np.nan)
+    for t in range(closes.shape[1]):
+        x = closes[:, t:t + 1]
+        updated = np.where(np.isnan(ema), x, ema + alpha * (x - ema))
+        ema = np.where(np.isnan(x), ema, updated)
+
+    bars = np.count_nonzero(~np.isnan(closes), axis=1)
+    ema[bars[:, None] < windows[None, :]] = np.nan
+    return ema
+
+
+def stacked_mask(emas):
+    """
+    Returns True for each row whose EMAs are strictly descending (shortest window highest).
+
+    Args:
+        emas (np.ndarray): Matrix of shape (tickers, windows) ordered by ascending window.
+
+    Returns:
+        np.ndarray: Boolean array with one entry per ticker.
+    """
+    emas = np.asarray(emas)
+    return np.all(np.isfinite(emas), axis=1) & np.all(emas[:, :-1] > emas[:, 1:], axis=1)
+
+
+SMA_WINDOWS = (20, 50, 200)
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+
+
+def new_indicator_state(
+    ema_windows=EMA_WINDOWS, sma_windows=SMA_WINDOWS, rsi_period=RSI_PERIOD, atr_period=ATR_PERIOD
+):
+    """
+    Create an empty, JSON-serializable indicator state.
+
+    The state holds everything needed to advance the indicators by one bar:
+    the last EMA per window, running SMA sums with the closes that will drop
+    out of them, and Wilder-smoothed RSI gains/losses and ATR.
+    """
+    return {
+        "ema_windows": list(ema_windows),
+        "sma_windows": list(sma_windows),
+        "rsi_period": rsi_period,
+        "atr_period": atr_period,
+        "last_date": None,
+        "bars": 0,
+        "prev_close": None,
+        "ema": [None] * len(ema_windows),
+        "sma_sums": [0.0] * len(sma_windows),
+        "closes": [],
+        "rsi": {"n": 0, "gain": 0.0, "loss": 0.0},
+        "atr": {"n": 0, "value": 0.0},
+    }
+
+
+def update_indicator_state(state, bar_date, high, low, close):
+    """
+    Advance an indicator state by one daily bar in constant time.
+
+    Args:
+        state (dict): State from new_indicator_state, updated in place.
+        bar_date (str): Session date of the bar (YYYY-MM-DD).
+        high (float): Bar high.
+        low (float): Bar low.
+        close (float): Bar close.
+
+    Returns:
+        dict: The updated state.
+    """
+    prev_close = state["prev_close"]
+
+    for i, window in enumerate(state["ema_windows"]):
+        ema = state["ema"][i]
+        state["ema"][i] = close if ema is None else ema + 2.0 / (window + 1.0) * (close - ema)
+
+    closes = state["closes"]
+    closes.append(close)
+    for i, window in enumerate(state["sma_windows"]):
+        state["sma_sums"][i] += close
+        if len(closes) > window:
+            state["sma_sums"][i] -= closes[-window - 1]
+    if len(closes) > max(state["sma_windows"]):
+        del closes[0]
+
+    if prev_close is None:
+        true_range = high - low
+    else:
+        true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+        # Wilder smoothing, seeded with the simple mean of the first period
+        rsi, period = state["rsi"], state["rsi_period"]
+        change = close - prev_close
+        rsi["n"] += 1
+        if rsi["n"] <= period:
+            rsi["gain"] += max(change, 0.0) / period
+            rsi["loss"] += max(-change, 0.0) / period
+        else:
+            rsi["gain"] = (rsi["gain"] * (period - 1) + max(change, 0.0)) / period
+            rsi["loss"] = (rsi["loss"] * (period - 1) + max(-change, 0.0)) / period
+
+    atr, period = state["atr"], state["atr_period"]
+    atr["n"] += 1
+    if atr["n"] <= period:
+        atr["value"] += true_range / period
+    else:
+        atr["value"] = (atr["value"] * (period - 1) + true_range) / period
+
+    state["prev_close"] = close
+    state["bars"] += 1
+    state["last_date"] = bar_date
+    return state
+
+
+def indicator_values(state):
+    """
+    Read the current indicator values from a state.
+
+    Returns:
+        dict: ema_<window>, sma_<window>, rsi_<period> and atr_<period> values,
+              None until enough bars have been seen.
+    """
+    bars = state["bars"]
+    values = {}
+
+    for window, ema in zip(state["ema_windows"], state["ema"]):
+        values[f"ema_{window}"] = ema if bars >= window else None
+    for window, total in zip(state["sma_windows"], state["sma_sums"]):
+        values[f"sma_{window}"] = total / window if bars >= window else None
+
+    rsi, period = state["rsi"], state["rsi_period"]
+    if rsi["n"] < period:
+        values[f"rsi_{period}"] = None
+    elif rsi["loss"] == 0:
+        values[f"rsi_{period}"] = 100.0
+    else:
+        values[f"rsi_{period}"] = 100.0 - 100.0 / (1.0 + rsi["gain"] / rsi["loss"])
+
+    atr, period = state["atr"], state["atr_period"]
+    values[f"atr_{period}"] = atr["value"] if atr["n"] >= period else None
+    return values
@@ -1,7 +1,12 @@
-from polygon import RESTClient
 from datetime import datetime, timedelta
 
-client = RESTClient()  # Ensure POLYGON_API_KEY is set in your environment
+from .contract_query import build_contract_query
+from .polygon_client import LazyClient
+from .price_service import get_close
+from .related_graph import expand_related_companies
+from .session_calendar import previous_session
+
+client = LazyClient()  # Created on first use; ensure POLYGON_API_KEY is set in your environment
 
 
 def generate_option_ticker(underlying, expiration, option_type, strike_price):
@@ -13,28 +18,13 @@ def generate_option_ticker(underlying, expiration, option_type, strike_price):
     return f"O:{underlying.upper()}{expiration_formatted}{option_type.upper()}{strike_price_formatted}"
 
 
-def fetch_related_companies(ticker, depth=3, seen=None):
+def fetch_related_tickers(ticker):
     """
-    Recursively fetch related companies up to the specified depth.
-
-    Args:
-        ticker (str): Initial stock ticker (e.g., "LNG").
-        depth (int): Maximum recursion depth.
-        seen (set): Set of already-seen tickers to avoid duplicates.
-        use_db (bool): Whether to check the database for related companies.
+    Fetch the tickers directly related to one ticker from the API.
 
     Returns:
-        set: A set of related tickers.
+        list: Related tickers, empty if the lookup failed.
     """
-    if seen is None:
-        seen = set()
-
-    seen.add(ticker)
-    # Base case: Stop recursion if depth is 0
-    if depth == 0:
-        return seen
-
-    # Otherwise, hit the API (handle the case where API is down or empty response)
     try:
         related_companies = client.get_related_companies(ticker)
         related_tickers = [
@@ -44,56 +34,51 @@ def fetch_related_companies(ticker, depth=3, seen=None):
         print(
             f"Fetched {len(related_tickers)} related tickers for {ticker} from the API."
         )
-        seen.update(related_tickers)
-
-        # Recurse for each related ticker
-        for related_ticker in related_tickers:
-            if related_ticker not in seen:
-                fetch_related_companies(related_ticker, depth - 1, seen)
-
-        return seen
+        return related_tickers
 
     except Exception as e:
         print(f"Error fetching related companies for {ticker}: {e}")
-        return seen
+        return []
+
+
+def fetch_related_companies(ticker, depth=3, seen=None, max_nodes=None, workers=8):
+    """
+    Fetch related companies up to the specified depth, expanding one level at a time.
+
+    Args:
+        ticker (str): Initial stock ticker (e.g., "LNG").
+        depth (int): Maximum number of levels to expand.
+        seen (set): Set of already-seen tickers to avoid duplicates.
+        max_nodes (int): Stop once this many tickers have been collected.
+        workers (int): Maximum concurrent lookups per level.
+
+    Returns:
+        set: A set of related tickers.
+    """
+    return expand_related_companies(
+        ticker, depth, fetch_related_tickers, seen=seen, max_nodes=max_nodes, workers=workers
+    )
 
 
 def get_last_trading_day():
-    # Convert the input string to a datetime object
-    date_obj = datetime.now()
-
-    # Get the day of the week (0=Monday, ..., 6=Sunday)
-    day_of_week = date_obj.weekday()
-    target_date = date_obj
-
-    # Want the last trading day before this one.  S,S,M = F.  This is because
-    # my polygon license doesn't allow for day of data.
-    if day_of_week in [5, 6]:
-        # Calculate the number of days to subtract to reach the previous Friday
-        days_to_subtract = day_of_week - 4
-        target_date = date_obj - timedelta(days=days_to_subtract)
-    elif day_of_week == 0:
-        days_to_subtract = 3
-        target_date = date_obj - timedelta(days=days_to_subtract)
-    else:
-        days_to_subtract = 1
-        target_date = date_obj - timedelta(days=days_to_subtract)
-        # Otherwise, return the original date
-
-    return target_date.strftime("%Y-%m-%d")
+    """
+    Returns the last NYSE session before today, skipping weekends and holidays.
+    """
+    return previous_session()
 
 
 # Helper function for fetching current stock price (pseudo-code)
 def get_current_price(ticker):
     """
     Fetch the current stock price for a ticker.
-    Replace this with an actual API call or logic.
+
+    Prices come from the shared price cache, which loads every close of the
+    session with one grouped daily request.
     """
     d = get_last_trading_day()
     print(d)
-    request = client.get_daily_open_close_agg(ticker, d)
 
-    return float(request.close)
+    return get_close(client, ticker, d)
 
 
 def get_contracts_by_underlying(underlying, expiration, percentage=1.0):
@@ -101,10 +86,13 @@ def get_contracts_by_underlying(underlying, expiration, percentage=1.0):
     print(f"Current Price: {current_price}")
     otm_threshold = current_price * percentage
     options = client.list_options_contracts(
-        underlying, contract_type="call", expiration_date=expiration
+        underlying,
+        **build_contract_query(
+            contract_type="call", strike_gt=otm_threshold, expiration_date=expiration
+        ),
     )
 
-    otm_calls = [opt for opt in options if opt.strike_price > otm_threshold]
+    otm_calls = list(options)
     print(f"Options Length: {len(otm_calls)}")
 
     return otm_calls
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+
+from tenacity import Retrying, retry_if_exception_type
+
+from . import response_cache
+from .api_metrics import record_cache_hit, record_request
+from .request_scheduler import (
+    RETRY_STATUSES,
+    RetryableResponse,
+    get_scheduler,
+    lane_of,
+    retry_after_seconds,
+    retry_stop,
+    retry_wait,
+)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class CachedResponse:
+    """
+    Stands in for a urllib3 response whose body came from the response cache.
+    """
+
+    status = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.headers = {}
+
+
+class ScheduledPool:
+    """
+    Wraps the client's urllib3 PoolManager to cache, schedule, retry and record every request.
+
+    Sitting below RESTClient._get means first pages, next_url pages and raw
+    requests are all handled the same way. Each attempt waits for a token in
+    its priority lane of the shared request scheduler. Rate-limited and
+    transient failures are retried with backoff (urllib3's own retries are
+    disabled so that every attempt goes through the scheduler), and every
+    attempt is recorded in helpers.api_metrics. Reference data is answered
+    from helpers.response_cache when a fresh copy is on disk.
+    """
+
+    def __init__(self, pool, base):
+        self.pool = pool
+        self.base = base
+
+    def request(self, method, url, **kwargs):
+        from urllib3.exceptions import HTTPError
+
+        path = url[len(self.base):] if url.startswith(self.base) else url
+        fields = kwargs.get("fields")
+        if method == "GET":
+            body = response_cache.lookup(path, fields)
+            if body is not None:
+                record_cache_hit(path)
+                return CachedResponse(body)
+
+        lane = lane_of(path)
+        kwargs["retries"] = False
+
+        retrying = Retrying(
+            stop=retry_stop,
+            wait=retry_wait,
+            retry=retry_if_exception_type((RetryableResponse, HTTPError)),
+            reraise=True,
+        )
+        try:
+            for attempt in retrying:
+                with attempt:
+                    retried = attempt.retry_state.attempt_number > 1
+                    resp = self.send(method, url, path, lane, retried, kwargs)
+        except RetryableResponse as e:
+            # Out of attempts; hand the last response to RESTClient, which raises BadResponse
+            return e.response
+
+        if method == "GET" and resp.status == 200:
+            response_cache.store(path, fields, resp.data)
+        return resp
+
+    def send(self, method, url, path, lane, retried, kwargs):
+        scheduler = get_scheduler()
+        scheduler.acquire(lane)
+
+        start = time.perf_counter()
+        try:
+            resp = self.pool.request(method, url, **kwargs)
+        except Exception as e:
+            record_request(path, time.perf_counter() - start, retries=int(retried), error=type(e).__name__)
+            raise
+        record_request(path, time.perf_counter() - start, len(resp.data or b""), resp.status, int(retried))
+
+        retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+        scheduler.on_response(resp.status, retry_after)
+        if resp.status in RETRY_STATUSES:
+            raise RetryableResponse(resp, resp.status, retry_after)
+        return resp
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+
+def new_client(api_key):
+    """
+    Build a RESTClient whose HTTP requests go through the shared request scheduler and are recorded.
+
+    polygon is imported here rather than at module level, since importing it
+    takes longer than most short runs spend before their first request.
+    """
+    from polygon import RESTClient
+
+    client = RESTClient(api_key)
+    client.client = ScheduledPool(client.client, client.BASE)
+    return client
+
+
+def get_client(api_key=None):
+    """
+    Returns the process-wide Polygon client, creating it on first use.
+
+    Every module shares one client per API key, so connection pooling, rate
+    limiting and request accounting cover the whole run.
+
+    Args:
+        api_key (str): Polygon API key, defaults to POLYGON_API_KEY.
+
+    Returns:
+        RESTClient: The shared client.
+    """
+    api_key = api_key or os.getenv("POLYGON_API_KEY")
+    if not api_key:
+        raise EnvironmentError("POLYGON_API_KEY environment variable is not set.")
+
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = new_client(api_key)
+    return client
+
+
+class LazyClient:
+    """
+    Module-level stand-in for the shared client that only creates it when first used.
+
+    Lets scripts keep a module-level `client` without importing polygon or
+    requiring POLYGON_API_KEY until a request is actually made (e.g. for --help).
+
+    Args:
+        api_key (str): Polygon API key, defaults to POLYGON_API_KEY at first use.
+    """
+
+    def __init__(self, api_key=None):
+        self._api_key = api_key
+
+    def __getattr__(self, name):
+        return getattr(get_client(self._api_key), name)
+
+
+def iter_result_pages(client, path, params=None):
+    """
+    Yield the raw `results` list of every page of a paginated endpoint.
+
+    Skips RESTClient's per-record model deserialization, which dominates the
+    cost of loading large trade tapes, while still going through the client's
+    scheduler, cache and request accounting.
+
+    Args:
+        client (RESTClient): Polygon client.
+        path (str): Endpoint path, e.g. /v3/trades/O:AAPL250117C00200000.
+        params (dict): Query parameters of the first page, in Polygon's naming (timestamp.gt, ...).
+
+    Returns:
+        Iterator[list]: One list of result dicts per page.
+    """
+    while True:
+        resp = client._get(path=path, params=params, raw=True)
+        data = json.loads(resp.data.decode("utf-8"))
+        yield data.get("results", [])
+
+        next_url = data.get("next_url")
+        if not next_url:
+            return
+        path, params = next_url.replace(client.BASE, ""), {}
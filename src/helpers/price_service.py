@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+
+DB_PATH = "price_cache.db"
+
+# (session_date, ticker) -> close, shared by every thread in the process
+_closes = {}
+# Session dates whose grouped closes are already in _closes
+_loaded_dates = set()
+_load_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Returns this thread's connection to the price cache, creating the tables on first use.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_closes (
+                    session_date TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    close REAL NOT NULL,
+                    PRIMARY KEY (session_date, ticker)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS grouped_sessions (
+                    session_date TEXT PRIMARY KEY
+                )
+            """)
+        _local.conn = conn
+    return conn
+
+
+def save_closes(session_date, closes, grouped=False):
+    """
+    Saves closes for a session to memory and disk.
+
+    Args:
+        session_date (str): Session date (YYYY-MM-DD).
+        closes (dict): Tickers as keys and closing prices as values.
+        grouped (bool): Whether closes is the whole market for the session.
+    """
+    for ticker, close in closes.items():
+        _closes[(session_date, ticker)] = close
+
+    conn = get_connection()
+    with conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO daily_closes (session_date, ticker, close)
+            VALUES (?, ?, ?)
+        """, [(session_date, ticker, close) for ticker, close in closes.items()])
+        if grouped:
+            conn.execute("""
+                INSERT OR IGNORE INTO grouped_sessions (session_date) VALUES (?)
+            """, (session_date,))
+
+
+def load_session_closes(client, session_date):
+    """
+    Make every close of a session available in memory.
+
+    Reads whatever a previous run stored for the session from disk and, unless
+    the whole market was already stored, pulls every close with one grouped
+    daily request. Only the first caller for a session does the work;
+    concurrent callers wait for it.
+
+    Args:
+        client (RESTClient): Polygon client.
+        session_date (str): Session date (YYYY-MM-DD).
+    """
+    if session_date in _loaded_dates:
+        return
+
+    with _load_lock:
+        if session_date in _loaded_dates:
+            return
+
+        conn = get_connection()
+        cursor = conn.execute("""
+            SELECT ticker, close FROM daily_closes WHERE session_date = ?
+        """, (session_date,))
+        for ticker, close in cursor.fetchall():
+            _closes[(session_date, ticker)] = close
+
+        cursor = conn.execute("""
+            SELECT 1 FROM grouped_sessions WHERE session_date = ?
+        """, (session_date,))
+        if cursor.fetchone() is None:
+            try:
+                closes = {
+                    agg.ticker: float(agg.close)
+                    for agg in client.get_grouped_daily_aggs(session_date)
+                    if agg.ticker and agg.close is not None
+                }
+                if closes:
+                    save_closes(session_date, closes, grouped=True)
+                    print(f"Loaded {len(closes)} closes for {session_date}.")
+            except Exception as e:
+                print(f"Error fetching grouped daily closes for {session_date}: {e}")
+
+        _loaded_dates.add(session_date)
+
+
+def get_cached_close(ticker, session_date):
+    """
+    Returns a close already held in memory, or None.
+    """
+    return _closes.get((session_date, ticker))
+
+
+def get_close(client, ticker, session_date):
+    """
+    Fetch a ticker's closing price for a session through the cache.
+
+    The first lookup for a session loads the whole market's closes, so scanning
+    hundreds of underlyings costs one request. Tickers missing from the grouped
+    response fall back to a single daily open/close request.
+
+    Args:
+        client (RESTClient): Polygon client.
+        ticker (str): Stock ticker.
+        session_date (str): Session date (YYYY-MM-DD).
+
+    Returns:
+        float: The closing price.
+    """
+    load_session_closes(client, session_date)
+
+    close = get_cached_close(ticker, session_date)
+    if close is None:
+        close = float(client.get_daily_open_close_agg(ticker, session_date).close)
+        save_closes(session_date, {ticker: close})
+
+    return close
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def expand_related_companies(ticker, depth, fetch_related, seen=None, max_nodes=None, workers=8):
+    """
+    Expand the related-companies graph breadth-first, one level at a time.
+
+    Every ticker in a level's frontier is looked up concurrently, so a depth-N
+    expansion takes roughly N times the slowest lookup rather than one lookup
+    per node. Tickers already seen on any level are not looked up again.
+
+    Args:
+        ticker (str): Initial stock ticker (e.g., "LNG").
+        depth (int): Number of levels to expand.
+        fetch_related (callable): Returns the related tickers of one ticker;
+            expected to handle its own errors and return an empty list.
+        seen (set): Tickers already known, updated in place.
+        max_nodes (int): Stop once this many tickers have been collected.
+        workers (int): Maximum concurrent lookups per level.
+
+    Returns:
+        set: The base ticker and every related ticker found.
+    """
+    if seen is None:
+        seen = set()
+
+    seen.add(ticker)
+    frontier = [ticker]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(depth):
+            if not frontier:
+                break
+
+            next_frontier = []
+            for related_tickers in executor.map(fetch_related, frontier):
+                for related_ticker in related_tickers:
+                    if related_ticker in seen:
+                        continue
+                    if max_nodes is not None and len(seen) >= max_nodes:
+                        print(f"Reached the node budget of {max_nodes} tickers.")
+                        return seen
+
+                    seen.add(related_ticker)
+                    next_frontier.append(related_ticker)
+
+            frontier = next_frontier
+
+    return seen
@@ -0,0 +1,241 @@
+import asyncio
+import os
+import re
+import threading
+import time
+
+from tenacity import stop_after_attempt, wait_exponential_jitter
+
+from .api_metrics import endpoint_name
+
+# (requests, per seconds) allowed by each Polygon plan. Basic is capped at 5
+# calls a minute; paid plans are unlimited but Polygon asks to stay under 100/s.
+PLAN_LIMITS = {
+    "basic": (5, 60.0),
+    "starter": (100, 1.0),
+    "developer": (100, 1.0),
+    "advanced": (100, 1.0),
+}
+DEFAULT_PLAN = "starter"
+
+# Lower lanes are served first when requests are waiting for tokens
+LANES = {"prices": 0, "contracts": 1, "reference": 2, "trades": 3}
+ENDPOINT_LANES = {
+    "get_daily_open_close_agg": "prices",
+    "get_grouped_daily_aggs": "prices",
+    "get_aggs": "prices",
+    "list_options_contracts": "contracts",
+    "get_options_contract": "contracts",
+    "list_snapshot_options_chain": "contracts",
+    "get_snapshot_option": "contracts",
+    "get_related_companies": "reference",
+    "get_ticker_details": "reference",
+    "list_trades": "trades",
+}
+# Daily bars of an option contract are bulk per-contract fetches (--volume-source aggs), not price lookups
+OPTION_AGGS_PATH = re.compile(r"^/v2/aggs/ticker/O(:|%3[Aa])")
+
+# Responses worth retrying: rate limited or a transient server failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 6
+
+# Multiplicative decrease on a 429, additive increase (fraction of the plan rate) per success
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEP = 0.02
+MIN_RATE_FRACTION = 0.05
+
+# Seconds between checks while a higher-priority lane is waiting
+POLL_INTERVAL = 0.05
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def lane_of(path):
+    """
+    Returns the priority lane of a request path.
+    """
+    if OPTION_AGGS_PATH.match(path):
+        return "trades"
+    return ENDPOINT_LANES.get(endpoint_name(path), "reference")
+
+
+class RetryableResponse(Exception):
+    """
+    Raised for a response that should be retried; carries the response itself.
+    """
+
+    def __init__(self, response, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.response = response
+        self.status = status
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(value):
+    """
+    Parse a Retry-After header given in seconds, None if absent or not numeric.
+    """
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+_exponential_wait = wait_exponential_jitter(initial=0.5, max=30.0)
+
+
+def retry_wait(retry_state):
+    """
+    tenacity wait strategy: honour Retry-After, otherwise exponential backoff with jitter.
+    """
+    error = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(error, RetryableResponse) and error.retry_after is not None:
+        return error.retry_after
+    return _exponential_wait(retry_state)
+
+
+retry_stop = stop_after_attempt(MAX_ATTEMPTS)
+
+
+class RequestScheduler:
+    """
+    Token bucket shared by every request to one Polygon account.
+
+    Requests wait for a token in priority lanes: while a price or contract
+    lookup is waiting, bulk trade pages do not take tokens. The refill rate
+    halves on every 429 and creeps back toward the plan rate on success.
+
+    Args:
+        requests (float): Requests allowed per period, also the burst size (at least one).
+        period (float): Length of the period in seconds.
+    """
+
+    def __init__(self, requests, period):
+        self.max_rate = requests / period
+        self.rate = self.max_rate
+        # A request takes a whole token, so a smaller bucket could never fill up enough to send one
+        self.capacity = max(1.0, float(requests))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = [0] * len(LANES)
+        self.condition = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_take(self, priority):
+        """
+        Take a token for a lane if allowed; otherwise return the seconds to wait. Call with the lock held.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if any(self.waiting[:priority]):
+            return POLL_INTERVAL
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def acquire(self, lane):
+        """
+        Block until the lane may send one request.
+        """
+        priority = LANES[lane]
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    delay = self._try_take(priority)
+                    if not delay:
+                        return
+                    self.condition.wait(delay)
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+    async def acquire_async(self, lane):
+        """
+        Wait on the event loop until the lane may send one request.
+        """
+        priority = LANES[lane]
+        with self.condition:
+            self.waiting[priority] += 1
+        try:
+            while True:
+                with self.condition:
+                    delay = self._try_take(priority)
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
+        finally:
+            with self.condition:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+    def on_response(self, status, retry_after=None):
+        """
+        Adapt the refill rate to a response status.
+        """
+        with self.condition:
+            if status == 429:
+                self.rate = max(self.rate * BACKOFF_FACTOR, self.max_rate * MIN_RATE_FRACTION)
+                self.tokens = min(self.tokens, 0.0)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            elif status == 200 and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP)
+
+
+def plan_limits(plan=None):
+    """
+    Returns the (requests, period) limit of a plan.
+
+    An explicit plan always wins. Otherwise POLYGON_RATE_LIMIT (requests per
+    second) applies if set, then the limit of POLYGON_PLAN or DEFAULT_PLAN.
+    """
+    if plan is None:
+        rate_limit = os.getenv("POLYGON_RATE_LIMIT")
+        if rate_limit:
+            return float(rate_limit), 1.0
+
+    plan = (plan or os.getenv("POLYGON_PLAN") or DEFAULT_PLAN).lower()
+    if plan not in PLAN_LIMITS:
+        raise ValueError(f"Unknown Polygon plan {plan!r}, expected one of {', '.join(PLAN_LIMITS)}")
+    return PLAN_LIMITS[plan]
+
+
+def get_scheduler():
+    """
+    Returns the process-wide request scheduler, creating it from the configured plan on first use.
+    """
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(*plan_limits())
+    return _scheduler
+
+
+def configure_scheduler(plan=None, requests=None, period=1.0):
+    """
+    Replace the process-wide scheduler, e.g. from a --plan command-line option.
+
+    Args:
+        plan (str): Polygon plan name, see PLAN_LIMITS.
+        requests (float): Explicit requests per period, overrides the plan.
+        period (float): Period of an explicit limit, in seconds.
+
+    Returns:
+        RequestScheduler: The new scheduler.
+    """
+    global _scheduler
+
+    limits = (requests, period) if requests else plan_limits(plan)
+    with _scheduler_lock:
+        _scheduler = RequestScheduler(*limits)
+    return _scheduler
@@ -0,0 +1,232 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode
+
+from .api_metrics import endpoint_name
+from .daily_volume import NEW_YORK
+
+DB_PATH = "response_cache.db"
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Seconds a response stays fresh, per endpoint; endpoints not listed are never cached
+CACHE_TTLS = {
+    "get_related_companies": 7 * DAY,
+    "get_ticker_details": DAY,
+    "get_options_contract": DAY,
+    "list_options_contracts": 6 * HOUR,
+    # Only cached for sessions before today, whose open/close no longer changes
+    "get_daily_open_close_agg": 30 * DAY,
+}
+
+# Least recently used responses are evicted once the cache grows past this
+MAX_CACHE_BYTES = 256 * 2**20
+# Stores between checks of the cache size
+EVICT_EVERY = 50
+
+# Query parameters that never change a response
+IGNORED_PARAMS = {"apiKey"}
+
+_local = threading.local()
+_lock = threading.Lock()
+_settings = {
+    "enabled": os.getenv("POLYGON_CACHE", "on").lower() not in ("off", "0", "false"),
+    "refresh": os.getenv("POLYGON_CACHE", "").lower() == "refresh",
+    "max_bytes": MAX_CACHE_BYTES,
+}
+_stores = 0
+
+
+def get_connection():
+    """
+    Returns this thread's connection to the response cache, creating the table on first use.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    cache_key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        _local.conn = conn
+    return conn
+
+
+def configure_cache(enabled=True, refresh=False, max_bytes=None):
+    """
+    Set how the shared clients use the response cache, e.g. from --no-cache/--refresh.
+
+    Args:
+        enabled (bool): Read and write the cache at all.
+        refresh (bool): Skip cached responses but store the fresh ones.
+        max_bytes (int): Size bound of the cache, defaults to MAX_CACHE_BYTES.
+    """
+    _settings["enabled"] = enabled
+    _settings["refresh"] = refresh
+    _settings["max_bytes"] = max_bytes or MAX_CACHE_BYTES
+
+
+def cache_settings():
+    """
+    Returns the current settings as configure_cache keyword arguments, e.g. to hand to a worker process.
+    """
+    return dict(_settings)
+
+
+def add_cache_arguments(parser):
+    """
+    Add the --no-cache and --refresh options to a command-line parser.
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--no-cache",
+        dest="use_response_cache",
+        action="store_false",
+        help="Always request reference data from Polygon and don't store it"
+    )
+    group.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Request reference data from Polygon and replace the cached copies"
+    )
+
+
+def apply_cache_arguments(args):
+    """
+    Configure the response cache from options added by add_cache_arguments.
+    """
+    configure_cache(enabled=args.use_response_cache, refresh=args.refresh)
+
+
+def cache_ttl(path):
+    """
+    Returns the TTL in seconds of a request path, None if its responses are not cached.
+    """
+    endpoint = endpoint_name(path)
+    ttl = CACHE_TTLS.get(endpoint)
+    if ttl and endpoint == "get_daily_open_close_agg":
+        session_date = path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        if session_date >= datetime.now(NEW_YORK).date().isoformat():
+            return None
+    return ttl
+
+
+def cache_key(path, params=None):
+    """
+    Normalize a request path and its parameters into a cache key.
+
+    Parameters from the query string and from params are merged, sorted and
+    stringified the same way, so a request and its next_url equivalent share a key.
+    """
+    path, _, query = path.partition("?")
+    items = parse_qsl(query, keep_blank_values=True)
+    items += [(name, value) for name, value in dict(params or {}).items() if value is not None]
+    normalized = sorted(
+        (name, str(value).lower() if isinstance(value, bool) else str(value))
+        for name, value in items
+        if name not in IGNORED_PARAMS
+    )
+    return f"{path}?{urlencode(normalized)}" if normalized else path
+
+
+def lookup(path, params=None):
+    """
+    Returns the cached body of a request if it is cacheable and fresh, otherwise None.
+
+    Args:
+        path (str): Request path, possibly with a query string.
+        params (dict): Query parameters.
+
+    Returns:
+        bytes: The response body, or None.
+    """
+    if not _settings["enabled"] or _settings["refresh"] or cache_ttl(path) is None:
+        return None
+
+    key = cache_key(path, params)
+    now = time.time()
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT body FROM responses WHERE cache_key = ? AND expires_at > ?", (key, now)
+    ).fetchone()
+    if row is None:
+        return None
+
+    with conn:
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE cache_key = ?", (now, key))
+    return row[0]
+
+
+def store(path, params, body):
+    """
+    Cache the body of a successful response if its endpoint is cacheable.
+
+    Args:
+        path (str): Request path, possibly with a query string.
+        params (dict): Query parameters.
+        body (bytes): The response body.
+    """
+    global _stores
+
+    ttl = cache_ttl(path)
+    if not _settings["enabled"] or ttl is None:
+        return
+
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO responses (cache_key, endpoint, body, size, expires_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (cache_key(path, params), endpoint_name(path), body, len(body), now + ttl, now))
+
+    with _lock:
+        _stores += 1
+        due = _stores % EVICT_EVERY == 1
+    if due:
+        evict()
+
+
+def evict(max_bytes=None):
+    """
+    Drop expired responses, then the least recently used ones until the cache fits in max_bytes.
+    """
+    max_bytes = max_bytes or _settings["max_bytes"]
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= max_bytes:
+            return
+
+        excess = total - max_bytes
+        cursor = conn.execute("SELECT cache_key, size FROM responses ORDER BY accessed_at")
+        doomed = []
+        for key, size in cursor:
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE cache_key = ?", doomed)
+
+
+def clear_cache():
+    """
+    Remove every cached response.
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM responses")
@@ -0,0 +1,174 @@
+import os
+from datetime import date, datetime
+
+import numpy as np
+
+# Kept beside this module, so every working directory shares one copy
+SESSIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nyse_sessions.npy")
+
+# Range of sessions precomputed into SESSIONS_PATH
+FIRST_SESSION = "2000-01-01"
+LAST_SESSION = "2035-12-31"
+
+# Sorted int32 days since the epoch of every NYSE session, loaded on first use
+_sessions = None
+
+
+def build_sessions(start=FIRST_SESSION, end=LAST_SESSION):
+    """
+    Compute the NYSE sessions between two dates with pandas_market_calendars.
+
+    This is the only place pandas is imported, and it only runs when the
+    on-disk session array is missing.
+
+    Returns:
+        np.ndarray: Sorted int32 days since the epoch.
+    """
+    from pandas_market_calendars import get_calendar
+
+    valid_days = get_calendar("NYSE").valid_days(start_date=start, end_date=end)
+    return valid_days.tz_localize(None).values.astype("datetime64[D]").astype(np.int32)
+
+
+def get_sessions():
+    """
+    Returns the precomputed session array, building and saving it on first use.
+    """
+    global _sessions
+
+    if _sessions is None:
+        try:
+            _sessions = np.load(SESSIONS_PATH)
+        except FileNotFoundError:
+            _sessions = build_sessions()
+            try:
+                np.save(SESSIONS_PATH, _sessions)
+            except OSError as e:
+                print(f"Could not save the session calendar to {SESSIONS_PATH}: {e}")
+
+    return _sessions
+
+
+def to_day(value=None):
+    """
+    Convert a YYYY-MM-DD string, date or datetime (default: today) to days since the epoch.
+    """
+    if value is None:
+        value = date.today()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def to_date_string(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+def is_session(value=None):
+    """
+    Returns True if the date is an NYSE session.
+    """
+    sessions = get_sessions()
+    day = to_day(value)
+    i = np.searchsorted(sessions, day)
+    return bool(i < len(sessions) and sessions[i] == day)
+
+
+def in_range(day):
+    return to_day(FIRST_SESSION) <= day <= to_day(LAST_SESSION)
+
+
+def out_of_range(value):
+    return ValueError(
+        f"No NYSE session around {value or date.today()} in the precomputed range {FIRST_SESSION} to {LAST_SESSION}"
+    )
+
+
+def previous_session(value=None, inclusive=False):
+    """
+    Returns the last session before a date (default: today) as YYYY-MM-DD.
+
+    Args:
+        value (str|date|datetime): Reference date.
+        inclusive (bool): Return the date itself if it is a session.
+
+    Raises:
+        ValueError: If the date is outside the precomputed range or no session precedes it.
+    """
+    sessions = get_sessions()
+    day = to_day(value)
+    i = np.searchsorted(sessions, day, side="right" if inclusive else "left")
+    if i == 0 or not in_range(day):
+        raise out_of_range(value)
+    return to_date_string(sessions[i - 1])
+
+
+def next_session(value=None, inclusive=False):
+    """
+    Returns the first session after a date (default: today) as YYYY-MM-DD.
+
+    Args:
+        value (str|date|datetime): Reference date.
+        inclusive (bool): Return the date itself if it is a session.
+
+    Raises:
+        ValueError: If the date is outside the precomputed range or no session follows it.
+    """
+    sessions = get_sessions()
+    day = to_day(value)
+    i = np.searchsorted(sessions, day, side="left" if inclusive else "right")
+    if i == len(sessions) or not in_range(day):
+        raise out_of_range(value)
+    return to_date_string(sessions[i])
+
+
+def sessions_between(start, end=None):
+    """
+    Returns the sessions from start to end (default: today), both inclusive, as YYYY-MM-DD strings.
+    """
+    sessions = get_sessions()
+    lo = np.searchsorted(sessions, to_day(start), side="left")
+    hi = np.searchsorted(sessions, to_day(end), side="right")
+    return sessions[lo:hi].astype("datetime64[D]").astype(str).tolist()
+
+
+def session_of_timestamp(timestamps):
+    """
+    Map nanosecond UTC timestamps to the NYSE session they belong to.
+
+    Args:
+        timestamps (np.ndarray): int64 nanoseconds since the epoch.
+
+    Returns:
+        np.ndarray: datetime64[D] session dates, NaT where the New York date is not a session.
+    """
+    from .daily_volume import session_days
+
+    sessions = get_sessions()
+    days = session_days(timestamps)
+    i = np.minimum(np.searchsorted(sessions, days), len(sessions) - 1)
+    return np.where(sessions[i] == days, days, np.iinfo(np.int64).min).astype("datetime64[D]")
+
+
+def zero_fill_sessions(values_by_day, start=None, end=None, default=int):
+    """
+    Add every session without activity between start and end to a date-keyed mapping.
+
+    Args:
+        values_by_day (dict): Dates (YYYY-MM-DD) as keys.
+        start (str): First session to include, defaults to the earliest key.
+        end (str): Last session to include, defaults to the latest key.
+        default (callable): Builds the value for a session without activity.
+
+    Returns:
+        dict: Date-sorted mapping that includes every session in the range.
+    """
+    if not values_by_day and (start is None or end is None):
+        return dict(values_by_day)
+
+    start = start or min(values_by_day)
+    end = end or max(values_by_day)
+
+    filled = {session: default() for session in sessions_between(start, end)}
+    filled.update(values_by_day)
+    return dict(sorted(filled.items()))
@@ -0,0 +1,158 @@
+import numpy as np
+
+from .session_calendar import sessions_between
+
+# Latest session must exceed this multiple of the trailing mean to be a size spike
+SPIKE_RATIO = 10.0
+
+# Looser multiple used for aggregate call/put flow
+FLOW_SPIKE_RATIO = 2.0
+
+# Span of the EWMA baseline, in sessions
+EWMA_SPAN = 10
+
+# Most sessions of history a baseline averages
+LOOKBACK_SESSIONS = 20
+
+SPIKE_DTYPE = np.dtype([
+    ("history", np.int32),
+    ("mean", np.float64),
+    ("median", np.float64),
+    ("std", np.float64),
+    ("ewma", np.float64),
+    ("latest", np.float64),
+    ("zscore", np.float64),
+    ("ratio", np.float64),
+    ("spike", np.bool_),
+    ("flow_spike", np.bool_),
+])
+
+
+def volume_matrix(volumes_by_day, start=None, end=None):
+    """
+    Stack date-keyed volume mappings into one dense matrix.
+
+    The columns are every session from start to end, by default the earliest
+    and latest date seen in any mapping, so sessions without trades count as
+    zero volume. Dates outside an explicit range are ignored.
+
+    Args:
+        volumes_by_day (list): One mapping of dates (YYYY-MM-DD) to volume per contract.
+        start (str): First session of the matrix.
+        end (str): Last session of the matrix.
+
+    Returns:
+        tuple: (float64 matrix of shape (contracts, sessions), list of session dates).
+    """
+    dates = {
+        date
+        for volume_by_day in volumes_by_day
+        for date in volume_by_day
+        if (start is None or date >= start) and (end is None or date <= end)
+    }
+    if not dates and (start is None or end is None):
+        return np.zeros((len(volumes_by_day), 0)), []
+
+    start = start or min(dates)
+    end = end or max(dates)
+    sessions = sorted(set(sessions_between(start, end)) | dates)
+    column = {date: i for i, date in enumerate(sessions)}
+
+    matrix = np.zeros((len(volumes_by_day), len(sessions)))
+    for row, volume_by_day in enumerate(volumes_by_day):
+        for date, volume in volume_by_day.items():
+            if date in column:
+                matrix[row, column[date]] = volume
+    return matrix, sessions
+
+
+def masked_history(history, lookback=LOOKBACK_SESSIONS):
+    """
+    Blank out each contract's sessions before its first trade, then keep the last `lookback` sessions.
+
+    Sessions before a contract's first trade are usually before it was listed;
+    counting them as zero volume would drag its baseline toward zero.
+
+    Args:
+        history (np.ndarray): Matrix of shape (contracts, sessions), oldest session first.
+        lookback (int): Sessions kept, None for all.
+
+    Returns:
+        np.ndarray: float64 copy of the (trimmed) matrix, NaN where a session is not part of a
+                    contract's history. The valid sessions of a row are always a suffix of it.
+    """
+    history = np.array(history, dtype=np.float64, ndmin=2)
+    traded = history > 0
+    first = np.where(traded.any(axis=1), traded.argmax(axis=1), history.shape[1])
+    history[np.arange(history.shape[1]) < first[:, None]] = np.nan
+    if lookback:
+        history = history[:, -lookback:]
+    return history
+
+
+def detect_spikes(
+    volumes,
+    spike_ratio=SPIKE_RATIO,
+    flow_spike_ratio=FLOW_SPIKE_RATIO,
+    ewma_span=EWMA_SPAN,
+    lookback=LOOKBACK_SESSIONS,
+):
+    """
+    Evaluate the latest session of every contract against its trailing history.
+
+    The last column is the session under test. A contract's history is the
+    columns before it, from its first trade on and at most `lookback` of them,
+    see masked_history. Every statistic is computed for all contracts at once.
+
+    Args:
+        volumes (np.ndarray): Matrix of shape (contracts, sessions), oldest session first.
+        spike_ratio (float): Multiple of the mean that flags a size spike.
+        flow_spike_ratio (float): Multiple of the mean that flags a flow spike.
+        ewma_span (int): Span of the EWMA baseline.
+        lookback (int): Maximum history sessions per contract, None for all.
+
+    Returns:
+        np.ndarray: Structured array with one SPIKE_DTYPE record per contract; history is
+                    the number of sessions its baseline covers. Statistics are NaN and
+                    flags False when a contract has no history.
+    """
+    volumes = np.atleast_2d(np.asarray(volumes, dtype=np.float64))
+    contracts, sessions = volumes.shape
+    result = np.zeros(contracts, dtype=SPIKE_DTYPE)
+    for field in ("mean", "median", "std", "ewma", "zscore", "ratio"):
+        result[field] = np.nan
+    result["latest"] = volumes[:, -1] if sessions else np.nan
+    if sessions < 2:
+        return result
+
+    history = masked_history(volumes[:, :-1], lookback)
+    counts = (~np.isnan(history)).sum(axis=1)
+    result["history"] = counts
+
+    rows = counts > 0
+    history = history[rows]
+    counts = counts[rows]
+    latest = volumes[rows, -1]
+    mean = np.nanmean(history, axis=1)
+    std = np.nanstd(history, axis=1)
+
+    # EWMA over each row's valid suffix: the full-length weights, with the first valid
+    # session weighted as the seed of the recursion
+    alpha = 2.0 / (ewma_span + 1.0)
+    length = history.shape[1]
+    seed = history[np.arange(len(history)), length - counts]
+    ewma = np.nan_to_num(history) @ (alpha * (1.0 - alpha) ** np.arange(length - 1, -1, -1, dtype=np.float64))
+    ewma += (1.0 - alpha) ** counts * seed
+
+    result["mean"][rows] = mean
+    result["median"][rows] = np.nanmedian(history, axis=1)
+    result["std"][rows] = std
+    result["ewma"][rows] = ewma
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result["zscore"][rows] = np.where(std > 0, (latest - mean) / std, np.nan)
+        result["ratio"][rows] = np.where(mean > 0, latest / mean, np.where(latest > 0, np.inf, np.nan))
+
+    result["spike"][rows] = latest > spike_ratio * mean
+    result["flow_spike"][rows] = latest > flow_spike_ratio * mean
+    return result
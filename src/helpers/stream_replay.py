@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import websockets
+
+
+def load_recording(path):
+    """
+    Read a recording written by trade_stream.stream_trades(record_path=...), one raw message per line.
+    """
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+async def serve_replay(messages, host="localhost", port=8765, delay=0.0, stop=None):
+    """
+    Serve recorded messages over a websocket that speaks Polygon's auth handshake.
+
+    Each client gets the "connected" status and an "auth_success" reply to its
+    auth message. Once its first subscribe message arrives, every recorded
+    message is sent in order and the connection is closed normally.
+    Subscriptions are not filtered on.
+
+    Args:
+        messages (list): Raw JSON messages to replay.
+        host (str): Interface to listen on.
+        port (int): Port to listen on, 0 picks a free port.
+        delay (float): Seconds to wait between messages.
+        stop (asyncio.Future): Stop serving once this resolves; serve forever if None.
+    """
+
+    async def handler(websocket, path=None):
+        await websocket.send(json.dumps([{"ev": "status", "status": "connected"}]))
+        await websocket.recv()
+        await websocket.send(json.dumps([{"ev": "status", "status": "auth_success"}]))
+        await websocket.recv()
+
+        for message in messages:
+            await websocket.send(message)
+            if delay:
+                await asyncio.sleep(delay)
+        await websocket.close()
+
+    async with websockets.serve(handler, host, port) as server:
+        port = server.sockets[0].getsockname()[1]
+        print(f"Replaying {len(messages)} messages on ws://{host}:{port}")
+        await (stop if stop is not None else asyncio.Future())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay recorded option trade messages over a local websocket.")
+    parser.add_argument("recording", type=str, help="File written with --record-stream")
+    parser.add_argument("--host", type=str, default="localhost", help="Interface to listen on (default: localhost)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds between messages (default: 0)")
+
+    args = parser.parse_args()
+    asyncio.run(serve_replay(load_recording(args.recording), args.host, args.port, args.delay))
@@ -0,0 +1,456 @@
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+from .daily_volume import NEW_YORK
+from .session_calendar import previous_session, sessions_between
+
+NANOS_PER_SECOND = 1_000_000_000
+
+# Page sizes the real endpoints fall back to when no limit is passed
+DEFAULT_PAGE_LIMITS = {
+    "list_options_contracts": 10,
+    "list_trades": 1000,
+    "list_snapshot_options_chain": 10,
+}
+
+
+class SyntheticError(Exception):
+    """
+    Raised by SyntheticClient to simulate a failed request.
+    """
+
+
+def third_fridays(months, today=None):
+    """
+    Returns the third Friday (YYYY-MM-DD) of each of the next `months` months, starting with this one.
+    """
+    today = today or date.today()
+    expirations = []
+    for i in range(months):
+        year, month = today.year + (today.month - 1 + i) // 12, (today.month - 1 + i) % 12 + 1
+        first = date(year, month, 1)
+        expirations.append((first + timedelta(days=(4 - first.weekday()) % 7 + 14)).isoformat())
+    return expirations
+
+
+def parse_timestamp(value):
+    """
+    Convert a timestamp filter (nanoseconds or YYYY-MM-DD) to nanoseconds since the epoch.
+    """
+    if isinstance(value, str) and not value.isdigit():
+        moment = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        return int(moment.timestamp()) * NANOS_PER_SECOND
+    return int(value)
+
+
+class SyntheticClient:
+    """
+    In-process stand-in for polygon.RESTClient backed by a generated market.
+
+    Every ticker, chain and trade tape is derived from the seed and the ticker
+    name, so repeated runs see the same market without holding it in memory.
+    Each page of a paginated endpoint counts as one request, sleeps for
+    `latency` seconds and fails with probability `error_rate`.
+
+    Its methods return model-like objects directly, which skips the HTTP
+    layer. rest_client wraps the market in a real RESTClient instead, so runs
+    also go through request building, the scheduler, retries, the response
+    cache, JSON decoding and raw trade paging, like runs against Polygon.
+
+    Args:
+        universe (int): Number of underlyings (SYN000, SYN001, ...).
+        related (int): Related companies returned per underlying.
+        expirations (int): Monthly expirations listed per underlying.
+        strikes (int): Strikes per expiration and contract type.
+        trades_per_day (float): Mean trades per contract per session.
+        sessions (int): Sessions of trade history per contract.
+        latency (float): Seconds added to every request.
+        error_rate (float): Probability that a request raises SyntheticError.
+        seed (int): Seed of the generated market.
+    """
+
+    def __init__(
+        self,
+        universe=200,
+        related=10,
+        expirations=4,
+        strikes=20,
+        trades_per_day=20.0,
+        sessions=30,
+        latency=0.0,
+        error_rate=0.0,
+        seed=0,
+    ):
+        self.tickers = [f"SYN{i:03d}" for i in range(universe)]
+        self.related = min(related, universe - 1)
+        self.expirations = third_fridays(expirations)
+        self.strikes = strikes
+        self.trades_per_day = trades_per_day
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+
+        last = previous_session()
+        self.sessions = sessions_between(
+            (datetime.strptime(last, "%Y-%m-%d") - timedelta(days=sessions * 2)).date(), last
+        )[-sessions:]
+        opens = [
+            datetime.strptime(f"{session} 09:30", "%Y-%m-%d %H:%M").replace(tzinfo=NEW_YORK)
+            for session in self.sessions
+        ]
+        self.session_opens = np.array(
+            [int(moment.timestamp()) * NANOS_PER_SECOND for moment in opens], dtype=np.int64
+        )
+
+        self.requests = Counter()
+        self.trades_served = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def __getstate__(self):
+        # Copies handed to worker processes get their own lock
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset_counters(self):
+        """
+        Zero the requests, trades and errors counters.
+        """
+        with self._lock:
+            self.requests = Counter()
+            self.trades_served = 0
+            self.errors = 0
+
+    def merge_counters(self, other):
+        """
+        Add the requests, trades and errors another copy of the market served to this one's counters.
+        """
+        with self._lock:
+            self.requests.update(other.requests)
+            self.trades_served += other.trades_served
+            self.errors += other.errors
+
+    def rng(self, name):
+        return np.random.default_rng([self.seed, zlib.crc32(name.encode())])
+
+    def request(self, endpoint):
+        """
+        Account for one request (or page) and apply the configured latency and error rate.
+        """
+        with self._lock:
+            self.requests[endpoint] += 1
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise SyntheticError(f"Synthetic failure in {endpoint}")
+
+    def paginate(self, endpoint, items, limit):
+        limit = limit or DEFAULT_PAGE_LIMITS[endpoint]
+        for start in range(0, max(len(items), 1), limit):
+            self.request(endpoint)
+            page = items[start:start + limit]
+            if endpoint == "list_trades":
+                with self._lock:
+                    self.trades_served += len(page)
+            yield from page
+
+    def price(self, ticker):
+        return float(np.round(10 + 190 * self.rng(ticker).random(), 2))
+
+    def closes(self, ticker):
+        """
+        Daily closes of an underlying, one per session, ending at price(ticker).
+        """
+        steps = self.rng(ticker + ":bars").normal(0.0005, 0.02, len(self.sessions))
+        growth = np.exp(np.cumsum(steps))
+        return self.price(ticker) * growth / growth[-1]
+
+    def chain(self, ticker):
+        price = self.price(ticker)
+        strikes = np.round(price * np.linspace(0.5, 1.5, self.strikes), 1)
+        return [
+            SimpleNamespace(
+                ticker=f"O:{ticker}{expiration[2:].replace('-', '')}{kind[0].upper()}{int(strike * 1000):08d}",
+                underlying_ticker=ticker,
+                contract_type=kind,
+                expiration_date=expiration,
+                strike_price=float(strike),
+            )
+            for expiration in self.expirations
+            for kind in ("call", "put")
+            for strike in strikes
+        ]
+
+    def tape(self, option_ticker):
+        """
+        Returns (sip timestamps, sizes) of a contract's trades, oldest first.
+        """
+        rng = self.rng(option_ticker)
+        counts = rng.poisson(self.trades_per_day, len(self.sessions))
+        # A few contracts get a spike on the latest session
+        if rng.random() < 0.05:
+            counts[-1] *= 15
+        offsets = rng.integers(0, 390 * 60 * NANOS_PER_SECOND, counts.sum())
+        timestamps = np.repeat(self.session_opens, counts) + offsets
+        order = np.argsort(timestamps, kind="stable")
+        return timestamps[order], (1 + rng.poisson(5, counts.sum()))[order]
+
+    def contracts(self, underlying_ticker, filters):
+        return [c for c in self.chain(underlying_ticker) if matches_contract(c, filters)]
+
+    def trades(self, ticker, timestamp_gt=None):
+        timestamps, sizes = self.tape(ticker)
+        if timestamp_gt is not None:
+            start = np.searchsorted(timestamps, parse_timestamp(timestamp_gt), side="right")
+            timestamps, sizes = timestamps[start:], sizes[start:]
+        return [
+            SimpleNamespace(sip_timestamp=t, size=s, price=1.0)
+            for t, s in zip(timestamps.tolist(), sizes.tolist())
+        ]
+
+    def bars(self, ticker, from_, to):
+        if ticker.startswith("O:"):
+            timestamps, sizes = self.tape(ticker)
+            volumes = np.bincount(
+                np.searchsorted(self.session_opens, timestamps, side="right") - 1,
+                weights=sizes,
+                minlength=len(self.sessions),
+            )
+            closes = np.ones(len(self.sessions))
+        else:
+            volumes = np.full(len(self.sessions), 1_000_000.0)
+            closes = self.closes(ticker)
+
+        bars = []
+        for session, close, volume in zip(self.sessions, closes.tolist(), volumes.tolist()):
+            if from_ <= session <= to:
+                midnight = datetime.strptime(session, "%Y-%m-%d").replace(tzinfo=NEW_YORK)
+                bars.append(SimpleNamespace(
+                    timestamp=int(midnight.timestamp() * 1000),
+                    open=close, high=close * 1.01, low=close * 0.99, close=close, volume=volume,
+                ))
+        return bars
+
+    def snapshots(self, underlying_asset, filters):
+        snapshots = []
+        for contract in self.contracts(underlying_asset, filters):
+            rng = self.rng(contract.ticker + ":snapshot")
+            snapshots.append(SimpleNamespace(
+                details=SimpleNamespace(
+                    ticker=contract.ticker,
+                    strike_price=contract.strike_price,
+                    expiration_date=contract.expiration_date,
+                ),
+                day=SimpleNamespace(volume=int(rng.poisson(self.trades_per_day * 5))),
+                open_interest=int(rng.poisson(1000)),
+                implied_volatility=float(rng.uniform(0.2, 1.2)),
+            ))
+        return snapshots
+
+    def related_tickers(self, ticker):
+        picks = self.rng(ticker + ":related").choice(len(self.tickers), self.related + 1, replace=False)
+        return [self.tickers[i] for i in picks if self.tickers[i] != ticker][:self.related]
+
+    # RESTClient surface used by the scanners
+
+    def get_related_companies(self, ticker):
+        self.request("get_related_companies")
+        return [SimpleNamespace(ticker=related_ticker) for related_ticker in self.related_tickers(ticker)]
+
+    def list_options_contracts(self, underlying_ticker=None, limit=None, **filters):
+        return self.paginate("list_options_contracts", self.contracts(underlying_ticker, filters), limit)
+
+    def list_trades(self, ticker, timestamp_gt=None, limit=None, **filters):
+        return self.paginate("list_trades", self.trades(ticker, timestamp_gt), limit)
+
+    def get_aggs(self, ticker, multiplier, timespan, from_, to, limit=None, **kwargs):
+        self.request("get_aggs")
+        return self.bars(ticker, from_, to)
+
+    def get_grouped_daily_aggs(self, date, **kwargs):
+        self.request("get_grouped_daily_aggs")
+        return [SimpleNamespace(ticker=ticker, close=self.price(ticker)) for ticker in self.tickers]
+
+    def get_daily_open_close_agg(self, ticker, date, **kwargs):
+        self.request("get_daily_open_close_agg")
+        return SimpleNamespace(symbol=ticker, close=self.price(ticker))
+
+    def list_snapshot_options_chain(self, underlying_asset, params=None):
+        params = dict(params or {})
+        limit = params.pop("limit", None)
+        filters = {key.replace(".", "_"): value for key, value in params.items()}
+        return self.paginate("list_snapshot_options_chain", self.snapshots(underlying_asset, filters), limit)
+
+    # JSON bodies served by SyntheticPool
+
+    def page(self, endpoint, items, path, params):
+        """
+        One page of a paginated endpoint, with a next_url holding the offset of the next one.
+        """
+        offset = int(params.pop("cursor", 0))
+        limit = int(params.get("limit") or DEFAULT_PAGE_LIMITS[endpoint])
+        self.request(endpoint)
+        page = items[offset:offset + limit]
+        if endpoint == "list_trades":
+            with self._lock:
+                self.trades_served += len(page)
+        body = {"status": "OK", "results": [as_json(item) for item in page]}
+        if offset + limit < len(items):
+            body["next_url"] = f"{path}?{urlencode({**params, 'cursor': offset + limit})}"
+        return body
+
+    def respond(self, path, params):
+        """
+        Answer a GET request with the JSON body Polygon would send.
+
+        Args:
+            path (str): Request path without the host, e.g. /v3/trades/O:SYN000250117C00100000.
+            params (dict): Query parameters in Polygon's naming (timestamp.gt, strike_price.gt, ...).
+
+        Returns:
+            dict: The body, None for a path the market doesn't serve.
+        """
+        parts = path.strip("/").split("/")
+        filters = {key.replace(".", "_"): query_value(key, value) for key, value in params.items()}
+
+        if parts[:2] == ["v1", "related-companies"]:
+            self.request("get_related_companies")
+            return {"status": "OK", "results": [{"ticker": t} for t in self.related_tickers(parts[2])]}
+        if parts[:4] == ["v3", "reference", "options", "contracts"] and len(parts) == 4:
+            underlying = filters.pop("underlying_ticker")
+            return self.page("list_options_contracts", self.contracts(underlying, filters), path, params)
+        if parts[:2] == ["v3", "trades"]:
+            return self.page("list_trades", self.trades(parts[2], filters.get("timestamp_gt")), path, params)
+        if parts[:3] == ["v2", "aggs", "ticker"] and len(parts) == 9:
+            self.request("get_aggs")
+            bars = self.bars(parts[3], parts[7], parts[8])
+            return {"status": "OK", "results": [
+                {"t": b.timestamp, "o": b.open, "h": b.high, "l": b.low, "c": b.close, "v": b.volume} for b in bars
+            ]}
+        if parts[:3] == ["v2", "aggs", "grouped"]:
+            self.request("get_grouped_daily_aggs")
+            return {"status": "OK", "results": [{"T": t, "c": self.price(t)} for t in self.tickers]}
+        if parts[:2] == ["v1", "open-close"]:
+            self.request("get_daily_open_close_agg")
+            return {"status": "OK", "symbol": parts[2], "from": parts[3], "close": self.price(parts[2])}
+        if parts[:3] == ["v3", "snapshot", "options"] and len(parts) == 4:
+            return self.page("list_snapshot_options_chain", self.snapshots(parts[3], filters), path, params)
+        return None
+
+
+class SyntheticResponse:
+    """
+    The parts of a urllib3 response RESTClient and ScheduledPool read.
+    """
+
+    def __init__(self, status, body):
+        self.status = status
+        self.data = json.dumps(body).encode("utf-8")
+        self.headers = {}
+
+
+class SyntheticPool:
+    """
+    Stands in for RESTClient's urllib3 PoolManager, answering every request from a SyntheticClient.
+
+    An injected failure is answered with HTTP 503, which ScheduledPool retries
+    like a real transient error.
+
+    Args:
+        market (SyntheticClient): Market that serves the requests.
+    """
+
+    def __init__(self, market):
+        self.market = market
+
+    def request(self, method, url, fields=None, **kwargs):
+        parts = urlsplit(url)
+        params = dict(parse_qsl(parts.query))
+        params.update(fields or {})
+        try:
+            body = self.market.respond(parts.path, params)
+        except SyntheticError as e:
+            return SyntheticResponse(503, {"status": "ERROR", "error": str(e)})
+        if body is None:
+            return SyntheticResponse(404, {"status": "NOT_FOUND", "error": f"No synthetic data for {parts.path}"})
+        if "next_url" in body:
+            body["next_url"] = f"{parts.scheme}://{parts.netloc}{body['next_url']}"
+        return SyntheticResponse(200, body)
+
+
+def rest_client(market):
+    """
+    Build a RESTClient whose requests are answered by a synthetic market.
+
+    The client is the one helpers.polygon_client builds, with only the
+    network replaced, so the scheduler, retries, response cache and request
+    accounting all apply.
+
+    Args:
+        market (SyntheticClient): Market that serves the requests.
+
+    Returns:
+        RESTClient: The client; its market is client.client.pool.market.
+    """
+    from .polygon_client import new_client
+
+    client = new_client("synthetic")
+    client.client.pool = SyntheticPool(market)
+    return client
+
+
+def as_json(value):
+    if isinstance(value, SimpleNamespace):
+        return {name: as_json(field) for name, field in vars(value).items()}
+    return value
+
+
+def query_value(name, value):
+    """
+    Parse a query parameter that arrived as a string (e.g. from a next_url) back to its type.
+    """
+    if isinstance(value, str) and name.startswith("strike_price"):
+        return float(value)
+    return value
+
+
+def matches_contract(contract, filters):
+    """
+    Apply list_options_contracts style filters (contract_type, strike_price_gt, expiration_date_lte, ...).
+    """
+    for name, value in filters.items():
+        if value is None:
+            continue
+        field, _, op = name.rpartition("_")
+        if op not in ("gt", "gte", "lt", "lte"):
+            field, op = name, "eq"
+        actual = getattr(contract, field, None)
+        if actual is None:
+            continue
+        if (
+            (op == "eq" and actual != value)
+            or (op == "gt" and not actual > value)
+            or (op == "gte" and not actual >= value)
+            or (op == "lt" and not actual < value)
+            or (op == "lte" and not actual <= value)
+        ):
+            return False
+    return True
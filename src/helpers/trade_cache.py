@@ -0,0 +1,201 @@
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+
+from .daily_volume import volume_by_session
+
+DB_PATH = "trade_cache.db"
+
+# Largest page size the trades endpoint accepts
+TRADES_PAGE_LIMIT = 50000
+
+# Absolute paths of the cache files whose tables this process has created
+_initialized = set()
+
+
+def connect():
+    """
+    Opens the trade cache, creating its tables the first time this process opens the file.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    path = os.path.abspath(DB_PATH)
+    if path not in _initialized:
+        create_tables(conn)
+        _initialized.add(path)
+    return conn
+
+
+def create_tables(conn):
+    """
+    Creates the trade cache tables if they don't exist.
+
+    trade_watermarks holds, per option ticker, the last sip_timestamp merged into
+    the cache and the first date the cached totals cover (NULL for full history).
+    trade_daily_totals holds the aggregated trade size per ticker and date.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trade_watermarks (
+            option_ticker TEXT PRIMARY KEY,
+            covered_from TEXT,
+            last_sip_timestamp INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trade_daily_totals (
+            option_ticker TEXT NOT NULL,
+            trade_date TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (option_ticker, trade_date)
+        )
+    """)
+    conn.commit()
+
+
+def initialize_trade_cache():
+    """
+    Initializes the SQLite trade cache and creates its tables if they don't exist.
+
+    Optional: every function of this module creates the tables on first use.
+    """
+    conn = connect()
+    create_tables(conn)
+    conn.close()
+
+
+def get_fetch_filters(option_ticker, start_date=None):
+    """
+    Build the list_trades filters needed to bring a ticker's cache up to date.
+
+    If the cache has a watermark that covers start_date, only trades after the
+    watermark are requested. Otherwise the cached totals for the ticker are
+    dropped and the history is fetched from start_date.
+
+    Args:
+        option_ticker (str): The option ticker.
+        start_date (str): First date (YYYY-MM-DD) needed, None for full history.
+
+    Returns:
+        dict: Keyword arguments for client.list_trades.
+    """
+    filters = {"order": "asc", "sort": "timestamp", "limit": TRADES_PAGE_LIMIT}
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT covered_from, last_sip_timestamp FROM trade_watermarks
+        WHERE option_ticker = ?
+    """, (option_ticker,))
+    row = cursor.fetchone()
+
+    if row is not None:
+        covered_from, last_sip_timestamp = row
+        if covered_from is None or (start_date is not None and covered_from <= start_date):
+            conn.close()
+            filters["timestamp_gt"] = last_sip_timestamp
+            return filters
+
+        # The cache starts later than what is being asked for, so rebuild it
+        cursor.execute("DELETE FROM trade_watermarks WHERE option_ticker = ?", (option_ticker,))
+        cursor.execute("DELETE FROM trade_daily_totals WHERE option_ticker = ?", (option_ticker,))
+        conn.commit()
+
+    conn.close()
+
+    if start_date is not None:
+        filters["timestamp_gt"] = start_date
+    return filters
+
+
+def merge_trades(option_ticker, trades_by_day, last_sip_timestamp, start_date=None):
+    """
+    Add newly fetched daily totals to the cache and advance the watermark.
+
+    Args:
+        option_ticker (str): The option ticker.
+        trades_by_day (dict): Dates as keys and trade sizes newer than the old watermark as values.
+        last_sip_timestamp (int): sip_timestamp of the newest trade in trades_by_day.
+        start_date (str): First date the fetch covered, used only for a new cache entry.
+    """
+    if last_sip_timestamp is None:
+        return
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO trade_daily_totals (option_ticker, trade_date, size)
+        VALUES (?, ?, ?)
+        ON CONFLICT (option_ticker, trade_date) DO UPDATE SET size = size + excluded.size
+    """, [(option_ticker, date, int(size)) for date, size in trades_by_day.items()])
+    cursor.execute("""
+        INSERT INTO trade_watermarks (option_ticker, covered_from, last_sip_timestamp, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (option_ticker) DO UPDATE SET
+            last_sip_timestamp = excluded.last_sip_timestamp,
+            updated_at = excluded.updated_at
+    """, (option_ticker, start_date, int(last_sip_timestamp), datetime.now().isoformat()))
+    conn.commit()
+    conn.close()
+
+
+def get_cached_trades(option_ticker, start_date=None):
+    """
+    Retrieves the cached daily trade totals for an option ticker.
+
+    Args:
+        option_ticker (str): The option ticker.
+        start_date (str): Only return dates on or after this date (YYYY-MM-DD).
+
+    Returns:
+        defaultdict: Dates as keys and total trade size as values.
+    """
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT trade_date, size FROM trade_daily_totals
+        WHERE option_ticker = ? AND trade_date >= ?
+    """, (option_ticker, start_date or ""))
+    rows = cursor.fetchall()
+    conn.close()
+
+    trades_by_day = defaultdict(int)
+    trades_by_day.update(rows)
+    return trades_by_day
+
+
+def fetch_trades_incremental(client, option_ticker, start_date=None):
+    """
+    Fetch only the trades newer than the cached watermark and return the merged daily totals.
+
+    The new trades are also stored in the trade warehouse. If the fetch fails,
+    the error is printed and nothing is merged or stored, so the next run
+    retries from the same watermark and neither store ends up with a gap.
+
+    Args:
+        client (RESTClient): Polygon client.
+        option_ticker (str): The option ticker.
+        start_date (str): First date (YYYY-MM-DD) needed, None for full history.
+
+    Returns:
+        defaultdict: Dates as keys and total trade size as values.
+    """
+    # trade_columns imports this module for its page size
+    from .trade_columns import fetch_trade_columns
+
+    filters = get_fetch_filters(option_ticker, start_date)
+    try:
+        columns = fetch_trade_columns(client, option_ticker, filters.get("timestamp_gt"))
+    except Exception as e:
+        print(f"Error fetching trades for {option_ticker}: {e}")
+        return get_cached_trades(option_ticker, start_date)
+
+    timestamps = columns["sip_timestamp"]
+    merge_trades(
+        option_ticker,
+        volume_by_session(timestamps, columns["size"]),
+        int(timestamps[-1]) if len(timestamps) else None,
+        start_date,
+    )
+    return get_cached_trades(option_ticker, start_date)
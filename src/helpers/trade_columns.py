@@ -0,0 +1,153 @@
+from collections import defaultdict
+from itertools import islice
+
+import numpy as np
+
+from .daily_volume import volume_by_session
+from .polygon_client import iter_result_pages
+from .trade_cache import TRADES_PAGE_LIMIT
+from .trade_warehouse import ingest_trades
+
+# Column name -> dtype of a trade tape held in memory
+TRADE_COLUMNS = {
+    "sip_timestamp": np.int64,
+    "price": np.float32,
+    "size": np.int32,
+}
+
+# Rows allocated before the first page arrives; buffers double when full
+INITIAL_CAPACITY = 4096
+
+
+class TradeColumns:
+    """
+    Preallocated typed column buffers that trade pages are copied into.
+
+    Each page is converted column by column with np.fromiter, so no per-trade
+    Python objects outlive the page, and the buffers only grow by doubling.
+
+    Args:
+        capacity (int): Rows allocated up front.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.length = 0
+        self.buffers = {name: np.empty(capacity, dtype=dtype) for name, dtype in TRADE_COLUMNS.items()}
+
+    def reserve(self, rows):
+        capacity = len(self.buffers["sip_timestamp"])
+        if self.length + rows <= capacity:
+            return
+        capacity = max(2 * capacity, self.length + rows)
+        for name, buffer in self.buffers.items():
+            grown = np.empty(capacity, dtype=buffer.dtype)
+            grown[:self.length] = buffer[:self.length]
+            self.buffers[name] = grown
+
+    def extend(self, page, get):
+        """
+        Append a page of trades.
+
+        Args:
+            page (list): Trade records.
+            get (callable): get(record, field) returning a field of a record.
+        """
+        rows = len(page)
+        if not rows:
+            return
+        self.reserve(rows)
+        end = self.length + rows
+        for name, buffer in self.buffers.items():
+            buffer[self.length:end] = np.fromiter((get(t, name) for t in page), buffer.dtype, count=rows)
+        self.length = end
+
+    def columns(self):
+        """
+        Returns the filled part of every buffer (views, not copies).
+        """
+        return {name: buffer[:self.length] for name, buffer in self.buffers.items()}
+
+
+def trade_filters(start_date=None):
+    filters = {"order": "asc", "sort": "timestamp", "limit": TRADES_PAGE_LIMIT}
+    if start_date is not None:
+        filters["timestamp_gt"] = start_date
+    return filters
+
+
+def fetch_trade_columns(client, option_ticker, start_date=None, ingest=True):
+    """
+    Load a contract's trades into typed columns.
+
+    Pages are decoded straight from JSON when the client supports raw requests
+    and fall back to the client's trade objects otherwise (e.g. the synthetic
+    market). An error while paging propagates, so a partial tape is never
+    returned (or stored) as if it were complete.
+
+    Args:
+        client (RESTClient): Polygon client.
+        option_ticker (str): The option ticker.
+        start_date (str): Only trades after this date (YYYY-MM-DD), None for full history.
+        ingest (bool): Also store the trades in the local trade warehouse, see helpers.trade_warehouse.
+
+    Returns:
+        dict: int64 sip_timestamp, float32 price and int32 size arrays, oldest first.
+    """
+    filters = trade_filters(start_date)
+    buffers = TradeColumns()
+    if hasattr(client, "_get"):
+        params = dict(filters)
+        if "timestamp_gt" in params:
+            params["timestamp.gt"] = params.pop("timestamp_gt")
+        for page in iter_result_pages(client, f"/v3/trades/{option_ticker}", params):
+            buffers.extend(page, lambda t, name: t.get(name, 0))
+    else:
+        trades = iter(client.list_trades(option_ticker, **filters))
+        while page := list(islice(trades, TRADES_PAGE_LIMIT)):
+            buffers.extend(page, lambda t, name: getattr(t, name, 0))
+
+    columns = buffers.columns()
+    if ingest:
+        ingest_trades([option_ticker], columns)
+    return columns
+
+
+def fetch_volume_by_day(client, option_ticker, start_date=None):
+    """
+    Fetch a contract's trades, store them in the trade warehouse and sum their sizes per session.
+
+    A failed fetch is printed and gives an empty result, so one contract can't
+    stop a scan; nothing is stored for it.
+
+    Args:
+        client (RESTClient): Polygon client.
+        option_ticker (str): The option ticker.
+        start_date (str): Only trades after this date (YYYY-MM-DD), None for full history.
+
+    Returns:
+        defaultdict: Dates (YYYY-MM-DD) as keys and total traded size as values.
+    """
+    try:
+        columns = fetch_trade_columns(client, option_ticker, start_date)
+    except Exception as e:
+        print(f"Error fetching trades for {option_ticker}: {e}")
+        return defaultdict(int)
+    return volume_by_session(columns["sip_timestamp"], columns["size"])
+
+
+def merge_columns(per_contract):
+    """
+    Concatenate the trade columns of several contracts into one set of arrays.
+
+    Args:
+        per_contract (list): fetch_trade_columns results, one per contract.
+
+    Returns:
+        tuple: (merged columns, int32 index into per_contract of each trade's contract).
+    """
+    lengths = np.array([len(columns["sip_timestamp"]) for columns in per_contract], dtype=np.int64)
+    merged = {
+        name: np.concatenate([columns[name] for columns in per_contract]) if per_contract else np.empty(0, dtype)
+        for name, dtype in TRADE_COLUMNS.items()
+    }
+    return merged, np.repeat(np.arange(len(per_contract), dtype=np.int32), lengths)
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .contract_query import build_contract_query
+from .daily_volume import session_days
+from .trade_columns import fetch_trade_columns, merge_columns
+from .trade_warehouse import ingest_trades
+
+CHAIN_WORKERS = 16
+
+
+def categorical(codes, categories):
+    """
+    Wrap integer codes and their categories in a Categorical without copying the codes.
+    """
+    return pd.Categorical.from_codes(codes, categories=categories, validate=False)
+
+
+def smallest_code_dtype(categories):
+    return np.int8 if len(categories) < 2**7 else np.int16 if len(categories) < 2**15 else np.int32
+
+
+def trades_frame(columns, tickers, strikes, contract_codes=None, contract_types=None):
+    """
+    Build a trade DataFrame on top of typed columns.
+
+    The timestamp, price and size arrays become the frame's columns without
+    being copied. Ticker, strike, contract type and session are categoricals
+    over small integer codes, so a trade takes about 20 bytes.
+
+    Args:
+        columns (dict): sip_timestamp, price and size arrays.
+        tickers (list): Option ticker of each contract.
+        strikes (list): Strike of each contract.
+        contract_codes (np.ndarray): Index into tickers/strikes of each trade, None if all trades are one contract's.
+        contract_types (list): "call"/"put" of each contract, None to leave the column out.
+
+    Returns:
+        pd.DataFrame: One row per trade.
+    """
+    timestamps = columns["sip_timestamp"]
+    if contract_codes is None:
+        contract_codes = np.zeros(len(timestamps), dtype=smallest_code_dtype(tickers))
+
+    sessions, session_codes = np.unique(session_days(timestamps), return_inverse=True)
+    strike_categories, strike_of_contract = np.unique(np.asarray(strikes, dtype=np.float64), return_inverse=True)
+    strike_of_contract = strike_of_contract.astype(smallest_code_dtype(strike_categories))
+
+    frame = {
+        "sip_timestamp": timestamps,
+        "trade_date": categorical(
+            session_codes.reshape(-1).astype(smallest_code_dtype(sessions)),
+            pd.DatetimeIndex(sessions.astype("datetime64[D]").astype("datetime64[ns]")),
+        ),
+        "price": columns["price"],
+        "size": columns["size"],
+        "ticker": categorical(contract_codes, list(tickers)),
+        "strike_price": categorical(strike_of_contract[contract_codes], strike_categories),
+    }
+    if contract_types is not None:
+        type_categories = sorted(set(contract_types))
+        type_of_contract = np.array([type_categories.index(t) for t in contract_types], dtype=np.int8)
+        frame["contract_type"] = categorical(type_of_contract[contract_codes], type_categories)
+
+    return pd.DataFrame(frame, copy=False)
+
+
+def start_date_for(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def get_trades_frame(client, option_ticker, strike, days=20):
+    """
+    Fetch a contract's trades for the past N days as a compact DataFrame.
+
+    Args:
+        client (RESTClient): Polygon client.
+        option_ticker (str): The option ticker.
+        strike (float): The contract's strike.
+        days (int): Number of days to look back.
+
+    Returns:
+        pd.DataFrame: See trades_frame.
+    """
+    columns = fetch_trade_columns(client, option_ticker, start_date_for(days))
+    return trades_frame(columns, [option_ticker], [strike])
+
+
+def get_chain_trades_frame(client, underlying, expiration, contract_type=None, days=20, workers=CHAIN_WORKERS):
+    """
+    Fetch the trades of every contract of an expiration as one compact DataFrame.
+
+    Contracts are fetched in parallel, then their columns are copied once into
+    arrays sized for the whole chain, which is stored in the trade warehouse in one go.
+    If any contract's fetch fails, its error is raised instead of building an
+    incomplete chain.
+
+    Args:
+        client (RESTClient): Polygon client.
+        underlying (str): Underlying stock ticker.
+        expiration (str): Expiration date (YYYY-MM-DD).
+        contract_type (str): "call" or "put", None for both.
+        days (int): Number of days to look back.
+        workers (int): Contracts fetched concurrently.
+
+    Returns:
+        pd.DataFrame: See trades_frame, with a contract_type column.
+    """
+    contracts = list(client.list_options_contracts(
+        underlying, **build_contract_query(contract_type=contract_type, expiration_date=expiration)
+    ))
+    start_date = start_date_for(days)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        per_contract = list(executor.map(
+            lambda contract: fetch_trade_columns(client, contract.ticker, start_date, ingest=False), contracts
+        ))
+
+    merged, contract_codes = merge_columns(per_contract)
+    tickers = [contract.ticker for contract in contracts]
+    ingest_trades(tickers, merged, contract_codes)
+    contract_codes = contract_codes.astype(smallest_code_dtype(tickers))
+
+    return trades_frame(
+        merged,
+        tickers,
+        [contract.strike_price for contract in contracts],
+        contract_codes,
+        [contract.contract_type for contract in contracts],
+    )
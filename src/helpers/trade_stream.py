@@ -0,0 +1,200 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import websockets
+
+from .daily_volume import session_days
+from .session_calendar import next_session, previous_session
+from .spike_engine import LOOKBACK_SESSIONS, SPIKE_RATIO, masked_history, volume_matrix
+
+STREAM_URL = "wss://socket.polygon.io/options"
+
+# Contracts per subscribe message, keeping each frame well under the server's size limit
+SUBSCRIBE_CHUNK = 500
+
+# Seconds to wait before reconnecting after the connection drops
+RECONNECT_DELAY = 5.0
+
+
+def build_baselines(contract_trades, session=None, lookback_sessions=LOOKBACK_SESSIONS):
+    """
+    Compute each contract's average session volume before the streamed session.
+
+    The baseline is the same trailing mean the REST scanners use: zero-filled
+    from the contract's own first trade on, over at most lookback_sessions
+    sessions, taken from trade history that is already in memory or in the
+    trade cache. Contracts without history, or without any volume in it, get
+    no baseline, so their first streamed trade is not taken for a spike.
+
+    Args:
+        contract_trades (list): (option_ticker, trades_by_day) pairs.
+        session (str): Session being streamed, defaults to today or the next session.
+        lookback_sessions (int): Only average the most recent N sessions, None for all.
+
+    Returns:
+        dict: Option tickers as keys and average volume per session as values.
+    """
+    session = session or next_session(inclusive=True)
+    volumes, sessions = volume_matrix(
+        [trades_by_day for _, trades_by_day in contract_trades], end=previous_session(session)
+    )
+    if not sessions:
+        return {}
+
+    history = masked_history(volumes, lookback_sessions)
+    counts = (~np.isnan(history)).sum(axis=1)
+    totals = np.nansum(history, axis=1)
+    return {
+        option_ticker: total / count
+        for (option_ticker, _), total, count in zip(contract_trades, totals.tolist(), counts.tolist())
+        if count and total > 0
+    }
+
+
+class SpikeMonitor:
+    """
+    Rolling per-contract session totals checked against a fixed baseline.
+
+    Only the current session's total is kept per contract; a trade from a new
+    session starts the total over. Each contract alerts at most once per session.
+    """
+
+    def __init__(self, baselines, spike_ratio=SPIKE_RATIO):
+        self.baselines = dict(baselines)
+        self.spike_ratio = spike_ratio
+        self.totals = {}
+        self.alerted = set()
+
+    def on_trades(self, events):
+        """
+        Fold a batch of trade events ("T" messages) into the session totals.
+
+        Args:
+            events (list): Trade events with sym, s (size) and t (SIP timestamp in ms).
+
+        Returns:
+            list: Alert dicts for contracts that crossed the spike threshold.
+        """
+        if not events:
+            return []
+
+        timestamps = np.array([event["t"] for event in events], dtype=np.int64) * 1_000_000
+        sessions = session_days(timestamps).astype("datetime64[D]").astype(str).tolist()
+
+        alerts = []
+        for event, session in zip(events, sessions):
+            option_ticker = event["sym"]
+            current, total = self.totals.get(option_ticker, (session, 0))
+            if current != session:
+                total = 0
+            total += event["s"]
+            self.totals[option_ticker] = (session, total)
+
+            baseline = self.baselines.get(option_ticker)
+            if baseline is None or (option_ticker, session) in self.alerted:
+                continue
+            if total > self.spike_ratio * baseline:
+                self.alerted.add((option_ticker, session))
+                alerts.append({
+                    "option_ticker": option_ticker,
+                    "session": session,
+                    "total": total,
+                    "baseline": baseline,
+                    "timestamp": event["t"],
+                })
+                print(
+                    f"Spike detected! {option_ticker} traded {total:g} on {session}, "
+                    f"more than {self.spike_ratio:g}x its {baseline:.2f} average."
+                )
+
+        return alerts
+
+
+async def authenticate(websocket, api_key):
+    """
+    Send the auth message and wait for the server to accept it.
+    """
+    await websocket.send(json.dumps({"action": "auth", "params": api_key}))
+    async for raw in websocket:
+        for event in json.loads(raw):
+            if event.get("ev") != "status":
+                continue
+            if event.get("status") == "auth_success":
+                return
+            if event.get("status") == "auth_failed":
+                raise PermissionError(event.get("message", "Websocket authentication failed"))
+    raise ConnectionError("Websocket closed before authentication completed")
+
+
+async def subscribe(websocket, option_tickers):
+    """
+    Subscribe to the trade channel of every contract, in chunks.
+    """
+    for i in range(0, len(option_tickers), SUBSCRIBE_CHUNK):
+        chunk = option_tickers[i:i + SUBSCRIBE_CHUNK]
+        params = ",".join(f"T.{option_ticker}" for option_ticker in chunk)
+        await websocket.send(json.dumps({"action": "subscribe", "params": params}))
+
+
+async def stream_trades(option_tickers, on_trades, url=STREAM_URL, api_key=None, record_path=None):
+    """
+    Stream option trades for a set of contracts until the server closes the connection.
+
+    Dropped connections are re-established and re-subscribed. A normal close
+    (for example a replay server reaching the end of its recording) ends the stream.
+
+    Args:
+        option_tickers (list): Option tickers (O:...) to subscribe to.
+        on_trades (callable): Called with each non-empty batch of trade events.
+        url (str): Websocket endpoint, e.g. a local replay server.
+        api_key (str): Polygon API key, defaults to POLYGON_API_KEY.
+        record_path (str): Append every raw message to this file for later replay.
+    """
+    api_key = api_key or os.getenv("POLYGON_API_KEY")
+    option_tickers = sorted(option_tickers)
+    record = open(record_path, "a") if record_path else None
+
+    try:
+        while True:
+            try:
+                async with websockets.connect(url, max_size=None) as websocket:
+                    await authenticate(websocket, api_key)
+                    await subscribe(websocket, option_tickers)
+                    print(f"Streaming trades for {len(option_tickers)} contracts from {url}...")
+
+                    async for raw in websocket:
+                        if record:
+                            record.write(raw + "\n")
+                        trades = [event for event in json.loads(raw) if event.get("ev") == "T"]
+                        if trades:
+                            on_trades(trades)
+                return
+            except websockets.ConnectionClosedOK:
+                return
+            except (websockets.ConnectionClosedError, OSError) as e:
+                print(f"Stream disconnected ({e}), reconnecting in {RECONNECT_DELAY:g}s...")
+                await asyncio.sleep(RECONNECT_DELAY)
+    finally:
+        if record:
+            record.close()
+
+
+def monitor_spikes(contract_trades, url=STREAM_URL, api_key=None, record_path=None):
+    """
+    Stream trades for the scanned contracts and flag spikes as they happen.
+
+    Args:
+        contract_trades (list): (option_ticker, trades_by_day) pairs from a scan.
+        url (str): Websocket endpoint.
+        api_key (str): Polygon API key, defaults to POLYGON_API_KEY.
+        record_path (str): Append every raw message to this file for later replay.
+
+    Returns:
+        SpikeMonitor: The monitor, holding the final session totals.
+    """
+    monitor = SpikeMonitor(build_baselines(contract_trades, lookback_sessions=LOOKBACK_SESSIONS))
+    option_tickers = [option_ticker for option_ticker, _ in contract_trades]
+    asyncio.run(stream_trades(option_tickers, monitor.on_trades, url, api_key, record_path))
+    return monitor
@@ -0,0 +1,473 @@
+import os
+import re
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import numpy as np
+
+from .daily_volume import session_days
+
+WAREHOUSE_PATH = "trade_warehouse"
+
+# Hive-style partition directories, outermost first; each session directory holds one file
+PARTITIONS = ("underlying", "expiration", "session")
+PARTITION_FILE = "trades.parquet"
+ROW_GROUP_SIZE = 64 * 1024
+
+# Trades a batch holds before it is written early, which bounds its memory (16 bytes a trade)
+BATCH_TRADES = 4_000_000
+
+OPTION_TICKER = re.compile(r"^O:(?P<underlying>[A-Z0-9.]+?)(?P<expiration>\d{6})(?P<type>[CP])(?P<strike>\d{8})$")
+
+_settings = {
+    "enabled": os.getenv("POLYGON_WAREHOUSE", "on").lower() not in ("off", "0", "false"),
+    "path": WAREHOUSE_PATH,
+}
+_warned = threading.Event()
+_locks = defaultdict(threading.Lock)
+_locks_lock = threading.Lock()
+# Trades held back by batched_ingest: option ticker -> columns, and the depth of nested blocks
+_batch = {"depth": 0, "contracts": {}, "trades": 0}
+_batch_lock = threading.Lock()
+
+
+def configure_warehouse(enabled=True, path=None):
+    """
+    Set whether fetched trades are stored in the warehouse, and where it lives.
+
+    Args:
+        enabled (bool): Store trades as they are fetched.
+        path (str): Warehouse root directory, defaults to WAREHOUSE_PATH.
+    """
+    _settings["enabled"] = enabled
+    _settings["path"] = path or WAREHOUSE_PATH
+
+
+def add_warehouse_arguments(parser, offline=True):
+    """
+    Add the --offline and --no-warehouse options to a command-line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend.
+        offline (bool): Also add --offline, for commands that can answer from the warehouse alone.
+    """
+    group = parser.add_mutually_exclusive_group()
+    if offline:
+        group.add_argument(
+            "--offline",
+            action="store_true",
+            help="Read trades from the local warehouse instead of requesting them from Polygon"
+        )
+    group.add_argument(
+        "--no-warehouse",
+        dest="use_warehouse",
+        action="store_false",
+        help="Don't store fetched trades in the local warehouse"
+    )
+
+
+def apply_warehouse_arguments(args):
+    """
+    Configure the warehouse from options added by add_warehouse_arguments.
+    """
+    configure_warehouse(enabled=args.use_warehouse)
+
+
+def warehouse_settings():
+    """
+    Returns the current settings as configure_warehouse keyword arguments, e.g. to hand to a worker process.
+    """
+    return dict(_settings)
+
+
+def parse_option_ticker(option_ticker):
+    """
+    Split an option ticker (O:AAPL250117C00200000) into its underlying, expiration, type and strike.
+
+    Returns:
+        SimpleNamespace: underlying, expiration_date (YYYY-MM-DD), contract_type and strike_price,
+                         or None if the ticker is not an option ticker.
+    """
+    match = OPTION_TICKER.match(option_ticker)
+    if match is None:
+        return None
+    expiration = match["expiration"]
+    return SimpleNamespace(
+        ticker=option_ticker,
+        underlying=match["underlying"],
+        expiration_date=f"20{expiration[:2]}-{expiration[2:4]}-{expiration[4:]}",
+        contract_type="call" if match["type"] == "C" else "put",
+        strike_price=int(match["strike"]) / 1000,
+    )
+
+
+def partition_file(root, underlying, expiration, session):
+    return os.path.join(
+        root, f"underlying={underlying}", f"expiration={expiration}", f"session={session}", PARTITION_FILE
+    )
+
+
+def partition_lock(path):
+    with _locks_lock:
+        return _locks[path]
+
+
+def merge_stored(path, table, first_by_ticker):
+    """
+    Combine newly fetched trades of a partition with the ones already stored there.
+
+    A fetch covers everything after its start, so stored trades of a fetched
+    contract from its first new timestamp on are replaced; everything else is kept.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    stored = pq.read_table(path, partitioning=None)
+    fetched = pa.array(list(first_by_ticker))
+    index = pc.index_in(stored["ticker"].cast(pa.string()), value_set=fetched)
+    firsts = pa.array(list(first_by_ticker.values()), pa.int64())
+    threshold = pc.take(firsts, index)
+    keep = pc.or_kleene(pc.is_null(index), pc.less(stored["sip_timestamp"], threshold))
+    return pa.concat_tables([stored.filter(pc.fill_null(keep, True)), table.cast(stored.schema)])
+
+
+def hold_trades(tickers, columns, contract_codes):
+    """
+    Add trades to the current batch, keyed by contract.
+
+    A contract fetched again within the batch replaces its held trades from its
+    first new timestamp on, the same way merge_stored treats stored ones.
+    Call with _batch_lock held.
+    """
+    timestamps = columns["sip_timestamp"]
+    if contract_codes is None:
+        per_contract = {tickers[0]: columns}
+    else:
+        order = np.argsort(contract_codes, kind="stable")
+        bounds = np.searchsorted(contract_codes[order], np.arange(len(tickers) + 1))
+        per_contract = {
+            ticker: {name: column[order[bounds[i]:bounds[i + 1]]] for name, column in columns.items()}
+            for i, ticker in enumerate(tickers)
+            if bounds[i] < bounds[i + 1]
+        }
+
+    held = _batch["contracts"]
+    for ticker, fetched in per_contract.items():
+        previous = held.get(ticker)
+        if previous is not None:
+            keep = previous["sip_timestamp"] < fetched["sip_timestamp"][0]
+            _batch["trades"] -= len(previous["sip_timestamp"]) - int(keep.sum())
+            fetched = {name: np.concatenate([previous[name][keep], fetched[name]]) for name in fetched}
+        held[ticker] = fetched
+    _batch["trades"] += len(timestamps)
+
+
+def take_batch():
+    """
+    Remove and return the held trades as (tickers, columns, contract_codes), or None if there are none.
+    Call with _batch_lock held.
+    """
+    held, _batch["contracts"], _batch["trades"] = _batch["contracts"], {}, 0
+    if not held:
+        return None
+    tickers = list(held)
+    lengths = [len(columns["sip_timestamp"]) for columns in held.values()]
+    names = next(iter(held.values()))
+    columns = {name: np.concatenate([columns[name] for columns in held.values()]) for name in names}
+    return tickers, columns, np.repeat(np.arange(len(tickers), dtype=np.int32), lengths)
+
+
+@contextmanager
+def batched_ingest():
+    """
+    Hold back the ingest_trades calls made inside the block and store them together when it ends.
+
+    Every ingest_trades call rewrites the partitions it touches, so a scan that
+    stores contract by contract would rewrite each session file once per
+    contract; a batch writes each one once. Nested blocks are written by the
+    outermost one, and a batch that grows past BATCH_TRADES is written early.
+    """
+    with _batch_lock:
+        _batch["depth"] += 1
+    try:
+        yield
+    finally:
+        with _batch_lock:
+            _batch["depth"] -= 1
+            batch = take_batch() if _batch["depth"] == 0 else None
+        if batch is not None:
+            write_trades(*batch)
+
+
+def ingest_trades(tickers, columns, contract_codes=None):
+    """
+    Store fetched trades, one Parquet file per underlying, expiration and session.
+
+    Rows are sorted by strike, so the row group statistics let strike filters
+    skip data inside a file too. Re-ingesting the same window is idempotent,
+    see merge_stored. Every call rewrites the partitions it touches, so a whole
+    chain should be ingested in one call, and contract-by-contract fetches
+    inside a batched_ingest block.
+
+    Does nothing when the warehouse is disabled or pyarrow is missing; trades
+    of tickers that are not option tickers are skipped.
+
+    Args:
+        tickers (list): Option ticker of each contract.
+        columns (dict): sip_timestamp, price and size arrays, oldest first per contract.
+        contract_codes (np.ndarray): Index into tickers of each trade, None if all trades are tickers[0]'s.
+
+    Returns:
+        int: Number of trades written, 0 while they are held in a batch.
+    """
+    if not _settings["enabled"] or not len(columns["sip_timestamp"]):
+        return 0
+
+    with _batch_lock:
+        if _batch["depth"] == 0:
+            batch = (tickers, columns, contract_codes)
+        else:
+            hold_trades(tickers, columns, contract_codes)
+            batch = take_batch() if _batch["trades"] >= BATCH_TRADES else None
+    return write_trades(*batch) if batch is not None else 0
+
+
+def write_trades(tickers, columns, contract_codes=None):
+    """
+    Write trades to their partitions, see ingest_trades.
+    """
+    timestamps = columns["sip_timestamp"]
+
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError:
+        if not _warned.is_set():
+            _warned.set()
+            print("pyarrow is not installed; fetched trades are not stored in the warehouse.")
+        return 0
+
+    if contract_codes is None:
+        contract_codes = np.zeros(len(timestamps), dtype=np.int32)
+    contracts = [parse_option_ticker(ticker) for ticker in tickers]
+    strikes = np.array([c.strike_price if c else np.nan for c in contracts])
+    is_call = np.array([c is not None and c.contract_type == "call" for c in contracts])
+
+    # Partition of every trade: (underlying, expiration) of its contract, then its session
+    chains = sorted({(c.underlying, c.expiration_date) for c in contracts if c})
+    chain_of_contract = np.array(
+        [chains.index((c.underlying, c.expiration_date)) if c else -1 for c in contracts], dtype=np.int64
+    )
+    chain_codes = chain_of_contract[contract_codes]
+    days = session_days(timestamps)
+
+    written = 0
+    for chain, (underlying, expiration) in enumerate(chains):
+        in_chain = chain_codes == chain
+        for day in np.unique(days[in_chain]):
+            rows = np.flatnonzero(in_chain & (days == day))
+            codes = contract_codes[rows]
+            rows = rows[np.lexsort((timestamps[rows], ~is_call[codes], strikes[codes]))]
+            codes = contract_codes[rows].astype(np.int32)
+
+            table = pa.table({
+                "sip_timestamp": pa.array(timestamps[rows], pa.int64()),
+                "price": pa.array(columns["price"][rows], pa.float32()),
+                "size": pa.array(columns["size"][rows], pa.int32()),
+                "ticker": pa.DictionaryArray.from_arrays(codes, list(tickers)),
+                "strike_price": pa.array(strikes[codes]),
+                "contract_type": pa.DictionaryArray.from_arrays(
+                    np.where(is_call[codes], 0, 1).astype(np.int32), ["call", "put"]
+                ),
+            })
+
+            session = str(np.datetime64(int(day), "D"))
+            path = partition_file(_settings["path"], underlying, expiration, session)
+            with partition_lock(path):
+                if os.path.exists(path):
+                    first_by_ticker = {}
+                    for code, timestamp in zip(codes.tolist(), timestamps[rows].tolist()):
+                        first = first_by_ticker.get(tickers[code])
+                        if first is None or timestamp < first:
+                            first_by_ticker[tickers[code]] = timestamp
+                    table = merge_stored(path, table, first_by_ticker)
+                    table = table.take(pc.sort_indices(
+                        table, [("strike_price", "ascending"), ("sip_timestamp", "ascending")]
+                    ))
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                # Write beside the target and rename, so readers never see a partial file;
+                # the leading dot keeps dataset scans from picking it up meanwhile
+                partial = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.tmp")
+                table = table.unify_dictionaries().combine_chunks()
+                pq.write_table(table, partial, row_group_size=ROW_GROUP_SIZE)
+                os.replace(partial, path)
+            written += len(rows)
+
+    return written
+
+
+def open_dataset(underlying=None, expiration=None):
+    """
+    Open the warehouse as a memory-mapped Arrow dataset.
+
+    Only the directories under the given underlying/expiration are listed, so
+    partition pruning starts before any file is discovered.
+
+    Returns:
+        pyarrow.dataset.Dataset: The dataset, or None if nothing is stored there.
+    """
+    import pyarrow.dataset as ds
+    from pyarrow.fs import LocalFileSystem
+
+    root = _settings["path"]
+    base = root
+    if underlying is not None:
+        base = os.path.join(base, f"underlying={underlying}")
+        if expiration is not None:
+            base = os.path.join(base, f"expiration={expiration}")
+    if not os.path.isdir(base):
+        return None
+
+    return ds.dataset(
+        base,
+        format="parquet",
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+        partition_base_dir=root,
+        filesystem=LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=False,
+        ignore_prefixes=[".", "_"],
+    )
+
+
+def query_trades(
+    underlying=None,
+    expiration=None,
+    tickers=None,
+    contract_type=None,
+    strike_gt=None,
+    start=None,
+    end=None,
+    columns=None,
+):
+    """
+    Read stored trades with partition and column pruning.
+
+    Args:
+        underlying (str): Underlying stock ticker.
+        expiration (str): Expiration date (YYYY-MM-DD).
+        tickers (list): Option tickers to keep.
+        contract_type (str): "call" or "put".
+        strike_gt (float): Strikes strictly above this price.
+        start (str): First session (YYYY-MM-DD).
+        end (str): Last session (YYYY-MM-DD).
+        columns (list): Columns to read, e.g. ["session", "size"]; None for all.
+
+    Returns:
+        pyarrow.Table: The matching trades; dictionary-encoded columns become pandas categoricals.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = open_dataset(underlying, expiration)
+    if dataset is None:
+        return pa.table({})
+
+    conditions = []
+    for name, value in (("underlying", underlying), ("expiration", expiration), ("contract_type", contract_type)):
+        if value is not None:
+            conditions.append(ds.field(name) == value)
+    if start is not None:
+        conditions.append(ds.field("session") >= start)
+    if end is not None:
+        conditions.append(ds.field("session") <= end)
+    if strike_gt is not None:
+        conditions.append(ds.field("strike_price") > strike_gt)
+    if tickers is not None:
+        conditions.append(ds.field("ticker").isin(list(tickers)))
+
+    condition = None
+    for term in conditions:
+        condition = term if condition is None else condition & term
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def query_trades_frame(**filters):
+    """
+    Same as query_trades, as a pandas DataFrame with a datetime trade_date column.
+    """
+    import pandas as pd
+
+    frame = query_trades(**filters).to_pandas()
+    if "session" in frame:
+        frame["trade_date"] = frame.pop("session").cat.rename_categories(pd.to_datetime)
+    return frame
+
+
+def list_contracts(underlying, expiration, contract_type=None, strike_gt=None):
+    """
+    List the stored contracts of an expiration, shaped like list_options_contracts results.
+
+    Returns:
+        list: SimpleNamespaces with ticker, strike_price, contract_type and expiration_date, by strike.
+    """
+    table = query_trades(
+        underlying, expiration, contract_type=contract_type, strike_gt=strike_gt,
+        columns=["ticker", "strike_price", "contract_type"],
+    )
+    if not table.num_rows:
+        return []
+
+    table = table.unify_dictionaries()
+    distinct = table.group_by(["ticker", "strike_price", "contract_type"]).aggregate([]).to_pylist()
+    return sorted(
+        (SimpleNamespace(expiration_date=expiration, **row) for row in distinct),
+        key=lambda contract: (contract.strike_price, contract.contract_type),
+    )
+
+
+def volume_by_day(option_ticker, start=None):
+    """
+    Daily traded size of one stored contract, like daily_volume.volume_by_session on a fresh fetch.
+
+    Returns:
+        defaultdict: Dates (YYYY-MM-DD) as keys and total traded size as values.
+    """
+    contract = parse_option_ticker(option_ticker)
+    volumes = defaultdict(int)
+    if contract is None:
+        return volumes
+
+    table = query_trades(
+        contract.underlying, contract.expiration_date, tickers=[option_ticker], start=start,
+        columns=["session", "size"],
+    )
+    if table.num_rows:
+        for row in table.unify_dictionaries().group_by("session").aggregate([("size", "sum")]).to_pylist():
+            volumes[row["session"]] = row["size_sum"]
+    return volumes
+
+
+def volume_by_strike(underlying, expiration, contract_type="call", strike_gt=None, start=None):
+    """
+    Daily traded size per strike of an expiration, the input of the strike x date heatmaps.
+
+    Returns:
+        dict: Strikes as keys and {date: size} dicts as values.
+    """
+    table = query_trades(
+        underlying, expiration, contract_type=contract_type, strike_gt=strike_gt, start=start,
+        columns=["strike_price", "session", "size"],
+    )
+    by_strike = defaultdict(dict)
+    if table.num_rows:
+        sums = table.unify_dictionaries().group_by(["strike_price", "session"]).aggregate([("size", "sum")])
+        for row in sums.to_pylist():
+            by_strike[row["strike_price"]][row["session"]] = row["size_sum"]
+    return dict(by_strike)
@@ -1,10 +1,23 @@
-from collections import defaultdict
 from datetime import datetime, timedelta
-from polygon import RESTClient
 import plotly.graph_objects as go
+from helpers.api_metrics import report, stage
 from helpers.options_helpers import get_current_price 
-
-client = RESTClient()  # POLYGON_API_KEY environment variable is used
+from helpers.contract_query import build_contract_query
+from helpers.daily_volume import VOLUME_SOURCES, get_volume_from_aggs
+from helpers.figure_report import add_report_arguments, apply_report_arguments, show_figure, write_report
+from helpers.polygon_client import LazyClient
+from helpers.response_cache import add_cache_arguments, apply_cache_arguments
+from helpers.spike_engine import SPIKE_RATIO, detect_spikes, volume_matrix
+from helpers.trade_cache import fetch_trades_incremental, initialize_trade_cache
+from helpers.trade_columns import fetch_volume_by_day
+from helpers.trade_warehouse import (
+    add_warehouse_arguments,
+    apply_warehouse_arguments,
+    batched_ingest,
+    volume_by_strike,
+)
+
+client = LazyClient()  # Created on first use; ensure POLYGON_API_KEY is set in your environment
 
 
 def visualize_trade_flows(ticker, trades_by_day):
@@ -32,8 +45,8 @@ def visualize_trade_flows(ticker, trades_by_day):
         template="plotly_white"
     )
 
-    # Display the chart
-    fig.show()
+    # Display the chart, or keep it for the report when running headless
+    show_figure(fig, ticker)
 
 
 def generate_option_ticker(underlying, expiration, option_type, strike_price):
@@ -45,30 +58,26 @@ def generate_option_ticker(underlying, expiration, option_type, strike_price):
     return f"O:{underlying.upper()}{expiration_formatted}{option_type.upper()}{strike_price_formatted}"
 
 
-def get_trades(ticker, days=20):
+def get_trades(ticker, days=20, use_cache=False):
     """
     Fetch trades for the past N days and aggregate their sizes by date.
 
     Args:
         ticker (str): The option ticker.
         days (int): Number of days to look back.
+        use_cache (bool): Only fetch trades newer than the local trade cache's watermark.
 
     Returns:
         dict: A dictionary with dates as keys and total trade size as values.
     """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
-    trades_by_day = defaultdict(int)
 
-    # Fetch trades from Polygon
-    for t in client.list_trades(ticker, timestamp_gt=start_date.strftime("%Y-%m-%d")):
-        # Convert SIP timestamp to a date
-        trade_date = datetime.utcfromtimestamp(
-            t.sip_timestamp / 1_000_000_000
-        ).strftime("%Y-%m-%d")
-        trades_by_day[trade_date] += t.size  # Aggregate trade size
+    if use_cache:
+        return fetch_trades_incremental(client, ticker, start_date.strftime("%Y-%m-%d"))
 
-    return trades_by_day
+    # Fetch trades from Polygon (storing them in the warehouse) and bucket them by trading session
+    return fetch_volume_by_day(client, ticker, start_date.strftime("%Y-%m-%d"))
 
 
 def analyze_size_spikes(ticker, trades_by_day):
@@ -81,30 +90,24 @@ def analyze_size_spikes(ticker, trades_by_day):
     Returns:
         None
     """
-    # Sort dates
-    sorted_dates = sorted(trades_by_day.keys())
-
-    # Calculate average volume (excluding the latest day)
-    historical_sizes = [trades_by_day[date] for date in sorted_dates[:-1]]
-    if not historical_sizes:
+    # Sessions without trades count as zero volume
+    volumes, sessions = volume_matrix([trades_by_day])
+    if len(sessions) < 2:
         print("Not enough historical data for analysis.")
         return
 
-    average_size = sum(historical_sizes) / len(historical_sizes)
-
-    # Get the latest day's size
-    latest_day = sorted_dates[-1]
-    latest_size = trades_by_day[latest_day]
+    stats = detect_spikes(volumes)[0]
+    latest_day = sessions[-1]
 
     print(
-        f"Average daily traded size (last {len(historical_sizes)} days): {average_size:.2f}"
+        f"Average daily traded size (last {stats['history']} days): {stats['mean']:.2f}"
     )
-    print(f"Total traded size for {latest_day}: {latest_size}")
+    print(f"Total traded size for {latest_day}: {stats['latest']:.0f}")
 
     # Check for spikes
-    if latest_size > 10 * average_size:
+    if stats["spike"]:
         print(
-            f"Spike detected! Total size on {latest_day} is more than 10x the average."
+            f"Spike detected! Total size on {latest_day} is more than {SPIKE_RATIO:g}x the average."
         )
     else:
         print(f"No significant spike detected.")
@@ -143,37 +146,101 @@ def visualize_trade_flows_v2(ticker, trades_by_day_by_strike):
         template="plotly_white"
     )
 
-    # Display the chart
-    fig.show()
+    # Display the chart, or keep it for the report when running headless
+    show_figure(fig, ticker)
+
+def main(underlying, expiration, use_trade_cache=True, volume_source="trades", offline=False):
+    if offline:
+        # The warehouse only holds contracts an earlier run fetched, i.e. the OTM calls of that day,
+        # and one grouped query sums the same 20-day window of all of them
+        start = (datetime.now() - timedelta(days=20)).strftime("%Y-%m-%d")
+        with stage("trade fetch"):
+            metrics = volume_by_strike(underlying, expiration, contract_type="call", start=start)
+        print(f"Options Length: {len(metrics)} (offline)")
+        if not metrics:
+            print(f"No trades stored for {underlying} {expiration} since {start}; run without --offline first.")
+            return
+        with stage("rendering"):
+            visualize_trade_flows_v2(underlying, metrics)
+        return
 
-def main(underlying, expiration):
     #ticker = generate_option_ticker(underlying, expiration, option_type, strike_price)
     current_price = get_current_price(underlying)   
     print(f"Current Price: {current_price}")
     otm_threshold = current_price * 1.10
-    options = client.list_options_contracts(
-        underlying, contract_type="call", expiration_date=expiration
-    )
+    with stage("contract discovery"):
+        options = client.list_options_contracts(
+            underlying,
+            **build_contract_query(
+                contract_type="call", strike_gt=otm_threshold, expiration_date=expiration
+            ),
+        )
 
-    otm_calls = [opt for opt in options if opt.strike_price > otm_threshold]
+        otm_calls = list(options)
     print(f"Options Length: {len(otm_calls)}")
     metrics = {}
 
-    for option in otm_calls:
-      print(option.ticker)
-      trades_by_day = get_trades(option.ticker, days=20)
-      metrics[option.strike_price] = trades_by_day
+    # The contracts' trades are stored together once they are all fetched
+    with stage("trade fetch"), batched_ingest():
+      for option in otm_calls:
+        print(option.ticker)
+        if volume_source == "aggs":
+          trades_by_day = get_volume_from_aggs(client, option.ticker, days=20)
+        else:
+          trades_by_day = get_trades(option.ticker, days=20, use_cache=use_trade_cache)
+        metrics[option.strike_price] = trades_by_day
     
-    visualize_trade_flows_v2(underlying, metrics)
+    with stage("rendering"):
+      visualize_trade_flows_v2(underlying, metrics)
     #analyze_size_spikes(ticker, trades_by_day)
 
 
+def add_arguments(parser):
+    """
+    Add the analysis' command-line arguments to a parser, also used by the tyche CLI.
+    """
+    parser.add_argument("symbol", type=str, help="Stock symbol (e.g., AAPL)")
+    parser.add_argument("expiration", type=str, help="Expiration date (YYYY-MM-DD)")
+    parser.add_argument(
+        "--no-trade-cache",
+        dest="use_trade_cache",
+        action="store_false",
+        help="Re-download the trade history instead of using the local trade cache",
+    )
+    parser.add_argument(
+        "--volume-source",
+        choices=VOLUME_SOURCES,
+        default="trades",
+        help="Sum individual trades or read daily bars for per-day volume (default: trades)",
+    )
+    add_cache_arguments(parser)
+    add_report_arguments(parser)
+    add_warehouse_arguments(parser)
+
+
+def run(args):
+    """
+    Run the analysis with parsed command-line arguments and report the API cost.
+    """
+    apply_cache_arguments(args)
+    apply_report_arguments(args)
+    apply_warehouse_arguments(args)
+    initialize_trade_cache()
+    main(
+        args.symbol,
+        args.expiration,
+        use_trade_cache=args.use_trade_cache,
+        volume_source=args.volume_source,
+        offline=args.offline,
+    )
+    with stage("rendering"):
+        write_report(f"{args.symbol} {args.expiration} trade flows")
+    report()
+
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Analyze options trade size spikes.")
-    parser.add_argument("symbol", type=str, help="Stock symbol (e.g., AAPL)")
-    parser.add_argument("expiration", type=str, help="Expiration date (YYYY-MM-DD)")
-
-    args = parser.parse_args()
-    main(args.symbol, args.expiration)
+    add_arguments(parser)
+    run(parser.parse_args())
@@ -1,10 +1,22 @@
 from collections import defaultdict
 from datetime import datetime, timedelta
-from polygon import RESTClient
 import plotly.graph_objects as go
-from helpers.options_helpers import get_last_trading_day, get_current_price 
-
-client = RESTClient()  # POLYGON_API_KEY environment variable is used
+from helpers.api_metrics import report, stage
+from helpers.figure_report import (
+    add_report_arguments,
+    apply_report_arguments,
+    downsample_heatmap,
+    show_figure,
+    write_report,
+)
+from helpers.options_helpers import get_current_price 
+from helpers.polygon_client import LazyClient
+from helpers.response_cache import add_cache_arguments, apply_cache_arguments
+from helpers.session_calendar import previous_session
+from helpers.spike_engine import SPIKE_RATIO, detect_spikes, volume_matrix
+from helpers.trade_warehouse import add_warehouse_arguments, apply_warehouse_arguments, volume_by_strike
+
+client = LazyClient()  # Created on first use; ensure POLYGON_API_KEY is set in your environment
 
 
 def visualize_trade_flows(ticker, trades_by_day):
@@ -26,7 +38,7 @@ def visualize_trade_flows(ticker, trades_by_day):
         template="plotly_white"
     )
 
-    fig.show()
+    show_figure(fig, ticker)
 
 def visualize_volume_by_strike(symbol, metrics_by_strike, expiration):
     """
@@ -46,7 +58,7 @@ def visualize_volume_by_strike(symbol, metrics_by_strike, expiration):
         yaxis_title="Volume",
         template="plotly_white"
     )
-    fig.show()
+    show_figure(fig, symbol)
 
 def visualize_trade_flows_by_strike(symbol, trades_by_strike):
     """
@@ -76,7 +88,7 @@ def visualize_trade_flows_by_strike(symbol, trades_by_strike):
         xaxis=dict(tickangle=-45),
         template="plotly_white"
     )
-    fig.show()
+    show_figure(fig, symbol)
 
 
 def visualize_heatmap(symbol, trades_by_strike):
@@ -91,6 +103,8 @@ def visualize_heatmap(symbol, trades_by_strike):
     strikes = sorted(trades_by_strike.keys())
     dates = sorted({date for strike_data in trades_by_strike.values() for date in strike_data})
     z_data = [[trades_by_strike[strike].get(date, 0) for date in dates] for strike in strikes]
+    # Wide chains are binned so the heatmap stays light enough to render and ship
+    z_data, dates, strikes = downsample_heatmap(z_data, dates, strikes)
     
     # Create the heatmap
     fig = go.Figure(
@@ -108,48 +122,34 @@ def visualize_heatmap(symbol, trades_by_strike):
         yaxis_title="Strike Price",
         template="plotly_white"
     )
-    fig.show()
+    show_figure(fig, symbol)
 
 
 def get_friday_or_date():
     """
-    Returns the nearest previous Friday if the given date is a Friday, Saturday, or Sunday.
-    Otherwise, returns the given date.
+    Returns the last NYSE session before today.
 
-    Args:
-        input_date (str): The input date in "YYYY-MM-DD" format.
+    My polygon license doesn't allow for day of data, so today is never returned,
+    and weekends and exchange holidays are skipped.
 
     Returns:
         str: The resulting date in "YYYY-MM-DD" format.
     """
-    # Convert the input string to a datetime object
-    date_obj = datetime.now()
-
-    # Get the day of the week (0=Monday, ..., 6=Sunday)
-    day_of_week = date_obj.weekday()
-    target_date = date_obj
-
-    # Want the last trading day before this one.  S,S,M = F.  This is because
-    # my polygon license doesn't allow for day of data.
-    if day_of_week in [5,6]:
-        # Calculate the number of days to subtract to reach the previous Friday
-        days_to_subtract = day_of_week - 4
-        target_date = date_obj - timedelta(days=days_to_subtract)
-    elif day_of_week == 0:
-        days_to_subtract = 3
-        target_date = date_obj - timedelta(days=days_to_subtract)
-    else:
-      days_to_subtract = 1
-      target_date = date_obj - timedelta(days=days_to_subtract)
-      # Otherwise, return the original date
-    
-    return target_date.strftime("%Y-%m-%d")
+    return previous_session()
+
+
+# Largest page size the options chain snapshot endpoint accepts
+SNAPSHOT_PAGE_LIMIT = 250
 
 
 def get_trades_and_metrics_for_otm_calls(symbol, expiration, current_price, days=20):
     """
     Fetch trades and metrics (Volume, Open Interest, IV) for all OTM call options.
 
+    The whole chain for the expiration is pulled with one paginated options chain
+    snapshot request, filtered server-side to calls struck above the threshold,
+    instead of one snapshot request per contract.
+
     Args:
         symbol (str): Stock ticker.
         expiration (str): Expiration date.
@@ -162,26 +162,27 @@ def get_trades_and_metrics_for_otm_calls(symbol, expiration, current_price, days
     otm_threshold = current_price #* 1.10
     metrics_by_strike = defaultdict(lambda: {"volume": 0, "open_interest": 0, "iv": 0.0})
 
-    # Fetch options chains for the given expiration
-    options = client.list_options_contracts(
-        symbol, contract_type="call", expiration_date=expiration
+    snapshots = client.list_snapshot_options_chain(
+        symbol,
+        params={
+            "contract_type": "call",
+            "expiration_date": expiration,
+            "strike_price.gt": otm_threshold,
+            "limit": SNAPSHOT_PAGE_LIMIT,
+        },
     )
 
-    otm_calls = [opt for opt in options if opt.strike_price > otm_threshold]
-
-    for option in otm_calls:
+    for snapshot in snapshots:
         try:
-            # Fetch additional metrics for the option
-            metrics = client.get_snapshot_option(symbol, option.ticker)  # Adjust API call if needed
-            strike_data = metrics_by_strike[option.strike_price]
+            strike_data = metrics_by_strike[snapshot.details.strike_price]
 
             # Aggregate volume and open interest
-            strike_data["volume"] += metrics.day.volume
-            strike_data["open_interest"] += metrics.open_interest
-            strike_data["iv"] = metrics.implied_volatility
+            strike_data["volume"] += (snapshot.day.volume if snapshot.day else 0) or 0
+            strike_data["open_interest"] += snapshot.open_interest or 0
+            strike_data["iv"] = snapshot.implied_volatility
 
         except Exception as e:
-            print(f"Error fetching metrics for {option.ticker}: {e}")
+            print(f"Error reading metrics for {symbol} {expiration} snapshot: {e}")
 
     return metrics_by_strike
 
@@ -231,61 +232,98 @@ def visualize_v_oi_ratios(symbol, metrics_by_strike, expiration):
         yaxis_title="V/OI Ratio",
         template="plotly_white"
     )
-    fig.show()
+    show_figure(fig, symbol)
 
 def analyze_size_spikes(symbol, expiration, trades_by_day):
     """
     Analyze trade sizes to detect spikes and visualize flows.
     """
-    sorted_dates = sorted(trades_by_day.keys())
-
-    historical_sizes = [trades_by_day[date] for date in sorted_dates[:-1]]
-    if not historical_sizes:
+    volumes, sessions = volume_matrix([trades_by_day])
+    if len(sessions) < 2:
         print("Not enough historical data for analysis.")
         return
 
-    average_size = sum(historical_sizes) / len(historical_sizes)
-
-    latest_day = sorted_dates[-1]
-    latest_size = trades_by_day[latest_day]
+    stats = detect_spikes(volumes)[0]
+    latest_day = sessions[-1]
 
-    print(f"Average daily traded size (last {len(historical_sizes)} days): {average_size:.2f}")
-    print(f"Total traded size for {latest_day}: {latest_size}")
+    print(f"Average daily traded size (last {stats['history']} days): {stats['mean']:.2f}")
+    print(f"Total traded size for {latest_day}: {stats['latest']:.0f}")
 
-    if latest_size > 10 * average_size:
-        print(f"Spike detected! Total size on {latest_day} is more than 10x the average.")
+    if stats["spike"]:
+        print(f"Spike detected! Total size on {latest_day} is more than {SPIKE_RATIO:g}x the average.")
     else:
         print("No significant spike detected.")
 
+    trades_by_day = dict(zip(sessions, volumes[0].tolist()))
     visualize_trade_flows(symbol, trades_by_day)
 
 
-def main(symbol, expiration):
+def main(symbol, expiration, offline=False):
     """
     Main function to analyze option-specific metrics for OTM calls.
+
+    Offline, the strike x date heatmap of the last 20 days of calls stored in
+    the trade warehouse is drawn instead, without any request to Polygon.
     """
+    if offline:
+        start = (datetime.now() - timedelta(days=20)).strftime("%Y-%m-%d")
+        with stage("analysis"):
+            trades_by_strike = volume_by_strike(symbol, expiration, contract_type="call", start=start)
+        print(f"{len(trades_by_strike)} stored call strikes for {symbol} {expiration} since {start}")
+        if not trades_by_strike:
+            # otm itself only reads snapshots; trades, scan and ema store the trades they fetch
+            print(f"No trades stored; run python tyche.py trades {symbol} {expiration} first.")
+            return
+        with stage("rendering"):
+            visualize_heatmap(symbol, trades_by_strike)
+        return
+
     current_price = get_current_price(symbol)
     print(f"Current price for {symbol}: {current_price:.2f}")
 
-    metrics_by_strike = get_trades_and_metrics_for_otm_calls(symbol, expiration, current_price, days=20)
+    with stage("contract discovery"):
+        metrics_by_strike = get_trades_and_metrics_for_otm_calls(symbol, expiration, current_price, days=20)
 
     # Analyze metrics
-    anomalies = analyze_option_metrics(metrics_by_strike)
+    with stage("analysis"):
+        anomalies = analyze_option_metrics(metrics_by_strike)
 
     print("\nAnomalies Detected:")
     for strike, v_oi_ratio, iv in anomalies:
         print(f"Strike {strike}: V/OI Ratio={v_oi_ratio:.2f}, IV={iv:.2f}")
 
     # Visualize metrics
-    visualize_v_oi_ratios(symbol, metrics_by_strike, expiration)
-    visualize_volume_by_strike(symbol, metrics_by_strike, expiration)
+    with stage("rendering"):
+        visualize_v_oi_ratios(symbol, metrics_by_strike, expiration)
+        visualize_volume_by_strike(symbol, metrics_by_strike, expiration)
+
+def add_arguments(parser):
+    """
+    Add the analysis' command-line arguments to a parser, also used by the tyche CLI.
+    """
+    parser.add_argument("symbol", type=str, help="Stock symbol (e.g., AAPL)")
+    parser.add_argument("expiration", type=str, help="Expiration date (YYYY-MM-DD)")
+    add_cache_arguments(parser)
+    add_report_arguments(parser)
+    add_warehouse_arguments(parser)
+
+
+def run(args):
+    """
+    Run the analysis with parsed command-line arguments and report the API cost.
+    """
+    apply_cache_arguments(args)
+    apply_report_arguments(args)
+    apply_warehouse_arguments(args)
+    main(args.symbol, args.expiration, offline=args.offline)
+    with stage("rendering"):
+        write_report(f"{args.symbol} {args.expiration} OTM calls")
+    report()
+
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Analyze 10%+ OTM call options trade size spikes.")
-    parser.add_argument("symbol", type=str, help="Stock symbol (e.g., AAPL)")
-    parser.add_argument("expiration", type=str, help="Expiration date (YYYY-MM-DD)")
-
-    args = parser.parse_args()
-    main(args.symbol, args.expiration)
+    add_arguments(parser)
+    run(parser.parse_args())
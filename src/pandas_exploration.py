@@ -1,18 +1,12 @@
-from polygon import RESTClient
+from helpers.polygon_client import LazyClient
 import pandas as pd
-import os
-from datetime import datetime, timedelta
 import plotly.express as px
+from helpers.trade_frames import get_chain_trades_frame, get_trades_frame
+from helpers.trade_warehouse import query_trades_frame
 from helpers.options_helpers import generate_option_ticker
 
-# Ensure the POLYGON_API_KEY is set as an environment variable
-API_KEY = os.getenv("POLYGON_API_KEY")
-
-if not API_KEY:
-    raise EnvironmentError("POLYGON_API_KEY environment variable is not set.")
-
-# Initialize the RESTClient
-client = RESTClient(API_KEY)
+# Created on first use, so offline runs need no POLYGON_API_KEY
+client = LazyClient()
 
 def get_trades_as_dataframe(ticker, strike, days=20):
     """
@@ -25,22 +19,42 @@ def get_trades_as_dataframe(ticker, strike, days=20):
     Returns:
         pd.DataFrame: A DataFrame containing all trade data.
     """
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-
-    # Fetch trades from Polygon
-    trades = []
-    for t in client.list_trades(ticker, timestamp_gt=start_date.strftime("%Y-%m-%d")):
-        trades.append({
-            "trade_date": datetime.utcfromtimestamp(t.sip_timestamp / 1_000_000_000).strftime("%Y-%m-%d"),
-            "price": t.price,
-            "size": t.size,
-            "strike_price": strike 
-        })
-
-    # Convert to DataFrame
-    df_trades = pd.DataFrame(trades)
-    return df_trades
+    # Typed columns with categorical ticker/strike/session, about 20 bytes per trade
+    return get_trades_frame(client, ticker, strike, days)
+
+
+def get_chain_trades_as_dataframe(underlying, expiration, contract_type=None, days=20):
+    """
+    Fetch the past N days of trades of every contract of an expiration as one DataFrame.
+
+    Args:
+        underlying (str): Underlying stock ticker.
+        expiration (str): Expiration date (YYYY-MM-DD).
+        contract_type (str): "call" or "put", None for both.
+        days (int): Number of days to look back.
+
+    Returns:
+        pd.DataFrame: One row per trade, with ticker, strike_price and contract_type columns.
+    """
+    return get_chain_trades_frame(client, underlying, expiration, contract_type, days)
+
+
+def get_stored_trades_as_dataframe(underlying, expiration, tickers=None, contract_type=None):
+    """
+    Read trades stored in the local trade warehouse by earlier fetches, without calling Polygon.
+
+    Args:
+        underlying (str): Underlying stock ticker.
+        expiration (str): Expiration date (YYYY-MM-DD).
+        tickers (list): Option tickers to keep, None for the whole chain.
+        contract_type (str): "call" or "put", None for both.
+
+    Returns:
+        pd.DataFrame: One row per trade, like get_chain_trades_as_dataframe.
+    """
+    return query_trades_frame(
+        underlying=underlying, expiration=expiration, tickers=tickers, contract_type=contract_type
+    )
 
 def visualize_trades(df):
     """
@@ -74,9 +88,12 @@ def visualize_trades(df):
     )
     fig.show()
 
-def main(underlying, expiration, option_type, strike_price):
+def main(underlying, expiration, option_type, strike_price, offline=False):
     ticker = generate_option_ticker(underlying, expiration, option_type, strike_price)
-    trades_by_day = get_trades_as_dataframe(ticker, strike_price, days=20)
+    if offline:
+        trades_by_day = get_stored_trades_as_dataframe(underlying, expiration, tickers=[ticker])
+    else:
+        trades_by_day = get_trades_as_dataframe(ticker, strike_price, days=20)
     print(trades_by_day)
 
     # Visualize trades
@@ -90,6 +107,11 @@ if __name__ == "__main__":
     parser.add_argument("option_type", type=str, help="Option type (call, put)")
     parser.add_argument("expiration", type=str, help="Expiration date (YYYY-MM-DD)")
     parser.add_argument("strike", type=float, help="Strike price")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Read the trades from the local warehouse instead of requesting them from Polygon"
+    )
 
     args = parser.parse_args()
-    main(args.symbol, args.expiration, args.option_type, args.strike)
+    main(args.symbol, args.expiration, args.option_type, args.strike, offline=args.offline)
@@ -1,18 +1,12 @@
-from polygon import RESTClient
-import os
+from helpers.polygon_client import LazyClient
 from datetime import datetime, timedelta
 from collections import defaultdict
 import plotly.graph_objects as g
 import pandas as pd
+from helpers.trade_columns import fetch_volume_by_day
+from helpers.trade_frames import get_chain_trades_frame, get_trades_frame
 
-# Ensure the POLYGON_API_KEY is set as an environment variable
-API_KEY = os.getenv("POLYGON_API_KEY")
-
-if not API_KEY:
-    raise EnvironmentError("POLYGON_API_KEY environment variable is not set.")
-
-# Initialize the RESTClient
-client = RESTClient(API_KEY)
+client = LazyClient()  # Created on first use; ensure POLYGON_API_KEY is set in your environment
 
 def generate_option_ticker(underlying, expiration, option_type, strike_price):
     """
@@ -35,17 +29,8 @@ def get_trades(ticker, days=20):
     """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
-    trades_by_day = defaultdict(int)
-
-    # Fetch trades from Polygon
-    for t in client.list_trades(ticker, timestamp_gt=start_date.strftime("%Y-%m-%d")):
-        # Convert SIP timestamp to a date
-        trade_date = datetime.utcfromtimestamp(
-            t.sip_timestamp / 1_000_000_000
-        ).strftime("%Y-%m-%d")
-        trades_by_day[trade_date] += t.size  # Aggregate trade size
-
-    return trades_by_day
+    # Fetch trades from Polygon (storing them in the warehouse) and bucket them by trading session
+    return fetch_volume_by_day(client, ticker, start_date.strftime("%Y-%m-%d"))
 
 # Utility Functions
 def get_ticker_details(ticker):
@@ -138,22 +123,24 @@ def get_trades_as_dataframe(ticker, strike, days=20):
     Returns:
         pd.DataFrame: A DataFrame containing all trade data.
     """
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
+    # Typed columns with categorical ticker/strike/session, about 20 bytes per trade
+    return get_trades_frame(client, ticker, strike, days)
 
-    # Fetch trades from Polygon
-    trades = []
-    for t in client.list_trades(ticker, timestamp_gt=start_date.strftime("%Y-%m-%d")):
-        trades.append({
-            "trade_date": datetime.utcfromtimestamp(t.sip_timestamp / 1_000_000_000).strftime("%Y-%m-%d"),
-            "price": t.price,
-            "size": t.size,
-            "strike_price": strike 
-        })
 
-    # Convert to DataFrame
-    df_trades = pd.DataFrame(trades)
-    return df_trades
+def get_chain_trades_as_dataframe(underlying, expiration, contract_type=None, days=20):
+    """
+    Fetch the past N days of trades of every contract of an expiration as one DataFrame.
+
+    Args:
+        underlying (str): Underlying stock ticker.
+        expiration (str): Expiration date (YYYY-MM-DD).
+        contract_type (str): "call" or "put", None for both.
+        days (int): Number of days to look back.
+
+    Returns:
+        pd.DataFrame: One row per trade, with ticker, strike_price and contract_type columns.
+    """
+    return get_chain_trades_frame(client, underlying, expiration, contract_type, days)
 
 
 # Display a welcome message
@@ -177,5 +164,6 @@ Example:
     )
 
 
-# Display the welcome message when the script is loaded
-welcome_message()
+# Display the welcome message when the script is run (python -i polygon_explorer.py), not on import
+if __name__ == "__main__":
+    welcome_message()
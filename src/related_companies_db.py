@@ -1,63 +1,119 @@
 import sqlite3
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 
 DB_PATH = "related_companies.db"
 
+# Related companies older than this are treated as missing and re-fetched
+DEFAULT_TTL = timedelta(days=30)
+
+# One long-lived connection per thread; WAL lets them read while another writes
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Returns this thread's connection to the database, opening it on first use.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    return conn
+
+
+def close_db():
+    """
+    Closes this thread's connection, if it has one.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
 def initialize_db():
     """
     Initializes the SQLite database and creates the related_companies table if it doesn't exist.
+
+    Databases created before (base_ticker, related_ticker) was unique are
+    deduplicated once, keeping the most recent row of each pair, when the
+    unique index is added. The unique index also serves lookups by base_ticker.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS related_companies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            base_ticker TEXT NOT NULL,
-            related_ticker TEXT NOT NULL,
-            timestamp TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS related_companies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                base_ticker TEXT NOT NULL,
+                related_ticker TEXT NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """)
+        indexed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_related_companies_pair'"
+        ).fetchone()
+        if indexed:
+            return
+
+        conn.execute("""
+            DELETE FROM related_companies
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM related_companies
+                GROUP BY base_ticker, related_ticker
+            )
+        """)
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_related_companies_pair
+            ON related_companies (base_ticker, related_ticker)
+        """)
+
 
 def save_related_companies(base_ticker, related_tickers):
     """
     Saves related companies to the database.
 
+    Existing pairs have their timestamp refreshed, new pairs are inserted and
+    pairs the API no longer returns are removed, all in one transaction.
+
     Args:
         base_ticker (str): The ticker for which related companies were fetched.
         related_tickers (list): A list of related tickers.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = get_connection()
     timestamp = datetime.now().isoformat()
 
-    for related_ticker in related_tickers:
-        cursor.execute("""
+    with conn:
+        conn.executemany("""
             INSERT INTO related_companies (base_ticker, related_ticker, timestamp)
             VALUES (?, ?, ?)
-        """, (base_ticker, related_ticker, timestamp))
+            ON CONFLICT (base_ticker, related_ticker) DO UPDATE SET timestamp = excluded.timestamp
+        """, [(base_ticker, related_ticker, timestamp) for related_ticker in related_tickers])
+        conn.execute("""
+            DELETE FROM related_companies
+            WHERE base_ticker = ? AND timestamp < ?
+        """, (base_ticker, timestamp))
 
-    conn.commit()
-    conn.close()
 
-def get_related_companies_from_db(base_ticker):
+def get_related_companies_from_db(base_ticker, max_age=DEFAULT_TTL):
     """
     Retrieves related companies for a given ticker from the database.
 
     Args:
         base_ticker (str): The ticker to search for.
+        max_age (timedelta): Ignore rows saved longer ago than this; None keeps every row.
 
     Returns:
         list: A list of related tickers.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+    oldest = (datetime.now() - max_age).isoformat() if max_age is not None else ""
+
+    cursor = get_connection().execute("""
         SELECT related_ticker FROM related_companies
-        WHERE base_ticker = ?
-    """, (base_ticker,))
-    rows = cursor.fetchall()
-    conn.close()
+        WHERE base_ticker = ? AND timestamp >= ?
+        ORDER BY id
+    """, (base_ticker, oldest))
 
-    return [row[0] for row in rows]
+    return [row[0] for row in cursor.fetchall()]
@@ -1,11 +1,56 @@
+import asyncio
+import multiprocessing
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from polygon import RESTClient
-import time
-
+from functools import partial
+import numpy as np
+
+from helpers.api_metrics import merge_endpoints, report, snapshot, stage
+from helpers.contract_query import build_contract_query
+from helpers.daily_volume import (
+    VOLUME_SOURCES,
+    aggs_to_volume_by_day,
+    aggs_window,
+    get_volume_from_aggs,
+    volume_by_session,
+)
+from helpers.polygon_client import LazyClient
+from helpers.price_service import get_cached_close, get_close, load_session_closes, save_closes
+from helpers.related_graph import expand_related_companies
+from helpers.request_scheduler import PLAN_LIMITS, configure_scheduler, get_scheduler
+from helpers.response_cache import add_cache_arguments, apply_cache_arguments, cache_settings, configure_cache
+from helpers.session_calendar import previous_session
+from helpers.spike_engine import SPIKE_RATIO, detect_spikes, volume_matrix
+from helpers.trade_cache import (
+    fetch_trades_incremental,
+    get_cached_trades,
+    get_fetch_filters,
+    initialize_trade_cache,
+    merge_trades,
+)
+from helpers.trade_columns import fetch_volume_by_day
+from helpers.trade_stream import STREAM_URL, monitor_spikes
+from helpers.trade_warehouse import (
+    add_warehouse_arguments,
+    apply_warehouse_arguments,
+    batched_ingest,
+    configure_warehouse,
+    ingest_trades,
+    warehouse_settings,
+)
 from related_companies_db import initialize_db, save_related_companies, get_related_companies_from_db
 
-client = RESTClient()  # Ensure POLYGON_API_KEY is set in your environment
+client = LazyClient()  # Created on first use; ensure POLYGON_API_KEY is set in your environment
+
+# How far back daily bars are requested when the volume source is "aggs"
+AGGS_LOOKBACK_DAYS = 365
+
+# Contracts listed after a scan, highest ratio first
+TOP_RESULTS = 20
+
+# How scan_sharded's worker processes get their client, see configure_shards
+_shard_settings = {"client_factory": None, "on_shard_done": None}
 
 
 def generate_option_ticker(underlying, expiration, option_type, strike_price):
@@ -17,34 +62,23 @@ def generate_option_ticker(underlying, expiration, option_type, strike_price):
     return f"O:{underlying.upper()}{expiration_formatted}{option_type.upper()}{strike_price_formatted}"
 
 
-def fetch_related_companies(ticker, depth=3, seen=None, use_db=False):
+def fetch_related_tickers(ticker, use_db=False):
     """
-    Recursively fetch related companies up to the specified depth.
+    Fetch the tickers directly related to one ticker, from the database or the API.
 
     Args:
-        ticker (str): Initial stock ticker (e.g., "LNG").
-        depth (int): Maximum recursion depth.
-        seen (set): Set of already-seen tickers to avoid duplicates.
-        use_db (bool): Whether to check the database for related companies.
+        ticker (str): Stock ticker.
+        use_db (bool): Whether to check the database for related companies first.
 
     Returns:
-        set: A set of related tickers.
+        list: Related tickers, empty if the lookup failed.
     """
-    if seen is None:
-        seen = set()
-
-    seen.add(ticker)
-    # Base case: Stop recursion if depth is 0
-    if depth == 0:
-        return seen
-
     if use_db:
         # Check the database first
         related_tickers = get_related_companies_from_db(ticker)
         if related_tickers:
             print(f"Found {len(related_tickers)} related tickers for {ticker} in the database.")
-            seen.update(related_tickers)
-            return seen
+            return related_tickers
 
     # Otherwise, hit the API (handle the case where API is down or empty response)
     try:
@@ -53,110 +87,257 @@ def fetch_related_companies(ticker, depth=3, seen=None, use_db=False):
 
         print(f"Fetched {len(related_tickers)} related tickers for {ticker} from the API.")
         save_related_companies(ticker, related_tickers)  # Save to the database
-        seen.update(related_tickers)
-
-        # Recurse for each related ticker
-        for related_ticker in related_tickers:
-            if related_ticker not in seen:
-                fetch_related_companies(related_ticker, depth - 1, seen, use_db)
-
-        return seen
+        return related_tickers
 
     except Exception as e:
         print(f"Error fetching related companies for {ticker}: {e}")
-        return seen
+        return []
+
+
+def fetch_related_companies(ticker, depth=3, seen=None, use_db=False, max_nodes=None, workers=8):
+    """
+    Fetch related companies up to the specified depth, expanding one level at a time.
+
+    Args:
+        ticker (str): Initial stock ticker (e.g., "LNG").
+        depth (int): Maximum number of levels to expand.
+        seen (set): Set of already-seen tickers to avoid duplicates.
+        use_db (bool): Whether to check the database for related companies.
+        max_nodes (int): Stop once this many tickers have been collected.
+        workers (int): Maximum concurrent lookups per level.
 
-def get_trades(option_ticker):
+    Returns:
+        set: A set of related tickers.
+    """
+    return expand_related_companies(
+        ticker,
+        depth,
+        partial(fetch_related_tickers, use_db=use_db),
+        seen=seen,
+        max_nodes=max_nodes,
+        workers=workers,
+    )
+
+def get_trades(option_ticker, use_cache=False):
     """
     Fetch trades for a single option ticker and aggregate by date.
+
+    With use_cache, only trades newer than the locally cached watermark are
+    requested and merged into the cached daily totals. Fetched trades are also
+    stored in the trade warehouse.
+    """
+    if use_cache:
+        return fetch_trades_incremental(client, option_ticker)
+
+    return fetch_volume_by_day(client, option_ticker)
+
+
+def get_daily_volume(option_ticker, volume_source="trades", use_cache=False):
+    """
+    Fetch the traded size per day of an option ticker from the selected source.
+
+    Args:
+        option_ticker (str): The option ticker.
+        volume_source (str): "trades" to sum individual trades, "aggs" to read daily bars.
+        use_cache (bool): Use the local trade cache (trades source only).
+
+    Returns:
+        dict: Dates as keys and total traded size as values.
     """
-    trades_by_day = defaultdict(int)
+    if volume_source == "trades":
+        return get_trades(option_ticker, use_cache)
+
     try:
-        # Fetch trades from Polygon
-        for t in client.list_trades(option_ticker):
-            trade_date = datetime.utcfromtimestamp(
-                t.sip_timestamp / 1_000_000_000
-            ).strftime("%Y-%m-%d")
-            trades_by_day[trade_date] += t.size
+        return get_volume_from_aggs(client, option_ticker, AGGS_LOOKBACK_DAYS)
     except Exception as e:
-        print(f"Error fetching trades for {option_ticker}: {e}")
+        print(f"Error fetching daily bars for {option_ticker}: {e}")
+        return defaultdict(int)
+
 
-    return trades_by_day
+def report_size_spike(stats, latest_day):
+    """
+    Print a spike-engine record if it flags a size spike.
+    """
+    if stats["spike"]:
+        print(f"Average daily traded size (last {stats['history']} days): {stats['mean']:.2f}")
+        print(f"Total traded size for {latest_day}: {stats['latest']:.0f}")
+        print(
+            f"Spike detected! Total size on {latest_day} is more than {SPIKE_RATIO:g}x the average."
+        )
 
 
 def analyze_size_spikes(trades_by_day):
     """
     Analyze the aggregated trade sizes to detect spikes.
+
+    Sessions without trades count as zero volume in the average.
     """
-    # Sort dates
-    sorted_dates = sorted(trades_by_day.keys())
+    volumes, sessions = volume_matrix([trades_by_day])
 
-    if len(sorted_dates) < 2:
+    if len(sessions) < 2:
         print("Not enough historical data for analysis.")
         return
 
-    # Calculate average volume (excluding the latest day)
-    historical_sizes = [trades_by_day[date] for date in sorted_dates[:-1]]
-    average_size = sum(historical_sizes) / len(historical_sizes)
+    report_size_spike(detect_spikes(volumes)[0], sessions[-1])
 
-    # Get the latest day's size
-    latest_day = sorted_dates[-1]
-    latest_size = trades_by_day[latest_day]
 
-    # Check for spikes
-    if latest_size > 10 * average_size:
-        print(
-            f"Average daily traded size (last {len(historical_sizes)} days): {average_size:.2f}"
+def contract_result(ticker, option_ticker, stats, latest_day):
+    """
+    Flatten a contract's spike-engine record into a plain dict, cheap to pickle and serialize.
+
+    Args:
+        ticker (str): Underlying stock ticker.
+        option_ticker (str): The option ticker.
+        stats (np.void): The contract's spike_engine.SPIKE_DTYPE record.
+        latest_day (str): Session the record evaluates, None if there were no trades.
+
+    Returns:
+        dict: ticker, contract, session, history, baseline (trailing mean size), latest size,
+              ratio, zscore and the spike/flow_spike flags.
+    """
+    return {
+        "ticker": ticker,
+        "contract": option_ticker,
+        "session": latest_day,
+        "history": int(stats["history"]),
+        "baseline": float(stats["mean"]),
+        "latest": float(stats["latest"]),
+        "ratio": float(stats["ratio"]),
+        "zscore": float(stats["zscore"]),
+        "spike": bool(stats["spike"]),
+        "flow_spike": bool(stats["flow_spike"]),
+    }
+
+
+def analyze_contract_spikes(contract_trades, ticker=None):
+    """
+    Analyze every contract of a ticker in one spike-engine pass.
+
+    All contracts are tested on the same latest session, each against its own
+    history from its first trade on (see spike_engine.masked_history). A
+    contract whose daily volumes can't be read is reported and left out
+    without affecting the others.
+
+    Args:
+        contract_trades (list): (option_ticker, trades_by_day) pairs.
+        ticker (str): Underlying of the contracts, copied into the results.
+
+    Returns:
+        list: One contract_result dict per analyzed contract.
+    """
+    readable = []
+    for option_ticker, trades_by_day in contract_trades:
+        try:
+            readable.append((option_ticker, {str(date): float(size) for date, size in trades_by_day.items()}))
+        except Exception as e:
+            print(f"Error processing {option_ticker}: {e}")
+
+    volumes, sessions = volume_matrix([trades_by_day for _, trades_by_day in readable])
+    latest_day = sessions[-1] if sessions else None
+
+    results = []
+    for (option_ticker, _), stats in zip(readable, detect_spikes(volumes)):
+        print(f"Running scanner for OTM call option: {option_ticker}")
+        try:
+            if stats["history"] == 0:
+                print("Not enough historical data for analysis.")
+            else:
+                report_size_spike(stats, latest_day)
+            results.append(contract_result(ticker, option_ticker, stats, latest_day))
+        except Exception as e:
+            print(f"Error processing {option_ticker}: {e}")
+
+    return results
+
+
+def analyze_scanned(scanned):
+    """
+    Run the spike analysis over scan output and collect the per-contract results.
+
+    Args:
+        scanned (list): (ticker, contract_trades, error) tuples, see scan_related_tickers.
+
+    Returns:
+        list: contract_result dicts of every ticker scanned without error.
+    """
+    results = []
+    for ticker, contract_trades, error in scanned:
+        if error is not None:
+            print(f"Error processing {ticker}: {error}")
+            continue
+
+        print(f"\nScanned OTM calls for {ticker}...")
+        try:
+            results.extend(analyze_contract_spikes(contract_trades, ticker))
+        except Exception as e:
+            print(f"Error processing {ticker}: {e}")
+    return results
+
+
+def rank_results(results):
+    """
+    Order contract results by ratio of latest size to baseline, highest first.
+
+    Contracts without a ratio (no volume at all) come last; ties go to the
+    larger latest size, then to the contract ticker so the order is stable.
+
+    Returns:
+        dict: Option tickers as keys and their result, with a 1-based rank added, as values.
+    """
+    def key(result):
+        ratio = result["ratio"]
+        latest = result["latest"]
+        return (
+            -ratio if ratio == ratio else float("inf"),
+            -latest if latest == latest else 0.0,
+            result["contract"],
         )
-        print(f"Total traded size for {latest_day}: {latest_size}")
+
+    return {
+        result["contract"]: {**result, "rank": rank}
+        for rank, result in enumerate(sorted(results, key=key), start=1)
+    }
+
+
+def print_results(results, limit=TOP_RESULTS):
+    """
+    Print the top ranked contracts of rank_results output.
+    """
+    if not results:
+        print("No contracts scanned.")
+        return
+
+    print(
+        f"{'rank':>4}  {'ticker':<8} {'contract':<24} {'session':<10} "
+        f"{'baseline':>10} {'latest':>10} {'ratio':>8}  flags"
+    )
+    for result in list(results.values())[:limit]:
+        flags = ",".join(flag for flag in ("spike", "flow_spike") if result[flag])
         print(
-            f"Spike detected! Total size on {latest_day} is more than 10x the average."
+            f"{result['rank']:>4}  {result['ticker'] or '':<8} {result['contract']:<24} {result['session'] or '-':<10} "
+            f"{result['baseline']:>10.1f} {result['latest']:>10.0f} {result['ratio']:>8.2f}  {flags}"
         )
 
+
 def get_friday_or_date():
     """
-    Returns the nearest previous Friday if the given date is a Friday, Saturday, or Sunday.
-    Otherwise, returns the given date.
+    Returns the last NYSE session before today.
 
-    Args:
-        input_date (str): The input date in "YYYY-MM-DD" format.
+    My polygon license doesn't allow for day of data, so today is never returned,
+    and weekends and exchange holidays are skipped.
 
     Returns:
         str: The resulting date in "YYYY-MM-DD" format.
     """
-    # Convert the input string to a datetime object
-    date_obj = datetime.now()
-
-    # Get the day of the week (0=Monday, ..., 6=Sunday)
-    day_of_week = date_obj.weekday()
-    target_date = date_obj
-
-    # Want the last trading day before this one.  S,S,M = F.  This is because
-    # my polygon license doesn't allow for day of data.
-    if day_of_week in [5,6]:
-        # Calculate the number of days to subtract to reach the previous Friday
-        days_to_subtract = day_of_week - 4
-        target_date = date_obj - timedelta(days=days_to_subtract)
-    elif day_of_week == 0:
-        days_to_subtract = 3
-        target_date = date_obj - timedelta(days=days_to_subtract)
-    else:
-      days_to_subtract = 1
-      target_date = date_obj - timedelta(days=days_to_subtract)
-      # Otherwise, return the original date
-    
-    return target_date.strftime("%Y-%m-%d")
+    return previous_session()
 
 
 # Helper function for fetching current stock price (pseudo-code)
 def get_current_price(ticker):
     """
-    Fetch the current stock price for a ticker.
-    Replace this with an actual API call or logic.
+    Fetch the current stock price for a ticker from the shared price cache.
     """
-    request = client.get_daily_open_close_agg(ticker, get_friday_or_date())
-
-    return float(request.close)
+    return get_close(client, ticker, get_friday_or_date())
 
 
 def get_otm_calls(ticker, expiration_limit_days=180):
@@ -177,20 +358,17 @@ def get_otm_calls(ticker, expiration_limit_days=180):
         current_price = get_current_price(ticker)
         print(f"Current price for {ticker}: {current_price}")
 
-        # Fetch the options chain for the ticker
-        options = client.list_options_contracts(ticker)
-
-        otm_calls = []
+        # Fetch only OTM calls within the expiration limit; the filters are applied server-side
+        options = client.list_options_contracts(
+            ticker,
+            **build_contract_query(
+                contract_type="call",
+                strike_gt=current_price,
+                expiration_lte=expiration_limit_date,
+            ),
+        )
 
-        # Filter for OTM call options within the expiration limit
-        for option in options:
-            option_expiration_date = datetime.strptime(option.expiration_date, "%Y-%m-%d")
-            if (
-                option.contract_type == "call"
-                and option.strike_price > current_price
-                and option_expiration_date <= expiration_limit_date
-            ):
-                otm_calls.append(option.ticker)  # Use the full option ticker
+        otm_calls = [option.ticker for option in options]  # Use the full option ticker
 
         print(f"Found {len(otm_calls)} OTM calls for {ticker} within {expiration_limit_days} days.")
         return otm_calls
@@ -200,46 +378,365 @@ def get_otm_calls(ticker, expiration_limit_days=180):
         return []
 
 
-def run_scanner_on_otm_calls(base_ticker, depth=3, expiration_limit_days=180):
+def scan_related_tickers(
+    related_tickers, expiration_limit_days=180, workers=1, use_cache=False, volume_source="trades"
+):
+    """
+    Fetch OTM call trades for every related ticker, optionally with a bounded worker pool.
+
+    Contract discovery is fanned out across underlyings first, then trade fetches
+    are fanned out across every contract found, both on the same pool. The
+    fetched trades are stored in the trade warehouse in one batch at the end.
+
+    Args:
+        related_tickers (iterable): Tickers to scan.
+        expiration_limit_days (int): The maximum number of days from today for expiration.
+        workers (int): Number of worker threads (1 scans serially).
+        use_cache (bool): Fetch trades incrementally through the local trade cache.
+        volume_source (str): "trades" or "aggs", see get_daily_volume.
+
+    Returns:
+        list: (ticker, contract_trades, error) tuples sorted by ticker, where
+              contract_trades is a list of (option_ticker, trades_by_day) tuples.
+    """
+    tickers = sorted(related_tickers)
+    fetch_trades = partial(get_daily_volume, volume_source=volume_source, use_cache=use_cache)
+
+    def discover(ticker):
+        try:
+            return get_otm_calls(ticker, expiration_limit_days), None
+        except Exception as e:
+            return [], e
+
+    if workers <= 1:
+        with stage("contract discovery"):
+            discovered = [discover(ticker) for ticker in tickers]
+        with stage("trade fetch"), batched_ingest():
+            return [
+                (ticker, [(option_ticker, fetch_trades(option_ticker)) for option_ticker in otm_calls], error)
+                for ticker, (otm_calls, error) in zip(tickers, discovered)
+            ]
+
+    # map() yields results in submission order, so the output stays deterministic
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        with stage("contract discovery"):
+            discovered = list(executor.map(discover, tickers))
+        option_tickers = [option_ticker for otm_calls, _ in discovered for option_ticker in otm_calls]
+        with stage("trade fetch"), batched_ingest():
+            trades = iter(list(executor.map(fetch_trades, option_tickers)))
+
+        return [
+            (ticker, [(option_ticker, next(trades)) for option_ticker in otm_calls], error)
+            for ticker, (otm_calls, error) in zip(tickers, discovered)
+        ]
+
+
+async def scan_related_tickers_async(
+    related_tickers,
+    expiration_limit_days=180,
+    max_in_flight=1000,
+    use_cache=False,
+    volume_source="trades",
+):
+    """
+    Async counterpart of scan_related_tickers driven by a single event loop.
+
+    Every underlying and every contract is scheduled at once; the client's
+    semaphore bounds how many requests are actually in flight. The fetched
+    trades are stored in the trade warehouse in one batch at the end.
+
+    Args:
+        related_tickers (iterable): Tickers to scan.
+        expiration_limit_days (int): The maximum number of days from today for expiration.
+        max_in_flight (int): Maximum number of concurrent requests.
+        use_cache (bool): Fetch trades incrementally through the local trade cache.
+        volume_source (str): "trades" or "aggs", see get_daily_volume.
+
+    Returns:
+        list: Same shape as scan_related_tickers.
+    """
+    tickers = sorted(related_tickers)
+    expiration_limit_date = (datetime.now() + timedelta(days=expiration_limit_days)).strftime("%Y-%m-%d")
+    price_date = get_friday_or_date()
+    load_session_closes(client, price_date)
+
+    # httpx is only imported by runs that use the async client
+    from helpers.async_polygon import AsyncPolygonClient
+
+    async with AsyncPolygonClient(max_in_flight=max_in_flight) as aclient:
+
+        async def fetch_trades(option_ticker):
+            if volume_source == "aggs":
+                try:
+                    aggs = await aclient.get_aggs(option_ticker, 1, "day", *aggs_window(AGGS_LOOKBACK_DAYS))
+                    return option_ticker, aggs_to_volume_by_day(aggs)
+                except Exception as e:
+                    print(f"Error fetching daily bars for {option_ticker}: {e}")
+                    return option_ticker, defaultdict(int)
+
+            # Like fetch_trades_incremental: a failed fetch is neither merged nor stored
+            filters = get_fetch_filters(option_ticker) if use_cache else {}
+            timestamps, prices, sizes = [], [], []
+            try:
+                async for t in aclient.list_trades(option_ticker, **filters):
+                    timestamps.append(t.sip_timestamp)
+                    prices.append(t.price or 0.0)
+                    sizes.append(t.size)
+            except Exception as e:
+                print(f"Error fetching trades for {option_ticker}: {e}")
+                return option_ticker, get_cached_trades(option_ticker) if use_cache else defaultdict(int)
+
+            columns = {
+                "sip_timestamp": np.array(timestamps, dtype=np.int64),
+                "price": np.array(prices, dtype=np.float32),
+                "size": np.array(sizes, dtype=np.int32),
+            }
+            # Held for the batch, but a batch past BATCH_TRADES is written here and would block the event loop
+            await asyncio.to_thread(ingest_trades, [option_ticker], columns)
+            trades_by_day = volume_by_session(columns["sip_timestamp"], columns["size"])
+            if use_cache:
+                merge_trades(option_ticker, trades_by_day, timestamps[-1] if timestamps else None)
+                trades_by_day = get_cached_trades(option_ticker)
+            return option_ticker, trades_by_day
+
+        async def scan(ticker):
+            try:
+                current_price = get_cached_close(ticker, price_date)
+                if current_price is None:
+                    current_price = float((await aclient.get_daily_open_close_agg(ticker, price_date)).close)
+                    save_closes(price_date, {ticker: current_price})
+                print(f"Current price for {ticker}: {current_price}")
+
+                query = build_contract_query(
+                    contract_type="call",
+                    strike_gt=current_price,
+                    expiration_lte=expiration_limit_date,
+                )
+                otm_calls = [
+                    option.ticker async for option in aclient.list_options_contracts(ticker, **query)
+                ]
+                print(f"Found {len(otm_calls)} OTM calls for {ticker} within {expiration_limit_days} days.")
+
+                contract_trades = await asyncio.gather(*(fetch_trades(o) for o in otm_calls))
+                return ticker, list(contract_trades), None
+            except Exception as e:
+                return ticker, [], e
+
+        with batched_ingest():
+            return list(await asyncio.gather(*(scan(ticker) for ticker in tickers)))
+
+
+def configure_shards(client_factory=None, on_shard_done=None):
+    """
+    Set how scan_sharded's worker processes get their client, e.g. to scan a test market.
+
+    Args:
+        client_factory (callable): Picklable callable run in each worker to build its client,
+                                   None to create one from POLYGON_API_KEY.
+        on_shard_done (callable): Called in the coordinator with every completed shard's copy of
+                                  client_factory, e.g. to collect state its client accumulated;
+                                  only used with client_factory.
+    """
+    _shard_settings["client_factory"] = client_factory
+    _shard_settings["on_shard_done"] = on_shard_done
+
+
+def scan_shard(tickers, expiration_limit_days, workers, use_cache, volume_source, settings):
+    """
+    Scan one shard of the universe and analyze it; runs in a worker process of scan_sharded.
+
+    The worker uses its own client, caches and scheduler, configured from the
+    coordinator's settings.
+
+    Args:
+        tickers (list): Tickers of the shard.
+        expiration_limit_days (int): The maximum number of days from today for expiration.
+        workers (int): Number of worker threads within the process.
+        use_cache (bool): Fetch trades incrementally through the local trade cache.
+        volume_source (str): "trades" or "aggs", see get_daily_volume.
+        settings (dict): client_factory (see configure_shards), cache (configure_cache
+                         arguments), warehouse (configure_warehouse arguments) and rate
+                         ((requests, period) of this shard).
+
+    Returns:
+        tuple: (scanned, results, endpoints, client_factory): scan_related_tickers output with
+               errors as strings, contract_result dicts, the API metrics of the shard, and the
+               shard's copy of client_factory.
+    """
+    global client
+
+    client_factory = settings["client_factory"]
+    if client_factory is not None:
+        client = client_factory()
+    configure_cache(**settings["cache"])
+    configure_warehouse(**settings["warehouse"])
+    requests, period = settings["rate"]
+    configure_scheduler(requests=requests, period=period)
+
+    scanned = scan_related_tickers(tickers, expiration_limit_days, workers, use_cache, volume_source)
+    results = analyze_scanned(scanned)
+
+    # Exceptions don't all pickle, so only their message crosses back to the coordinator
+    scanned = [
+        (ticker, contract_trades, None if error is None else f"{type(error).__name__}: {error}")
+        for ticker, contract_trades, error in scanned
+    ]
+    return scanned, results, snapshot()["endpoints"], client_factory
+
+
+def scan_sharded(
+    related_tickers, shards, expiration_limit_days=180, workers=1, use_cache=False, volume_source="trades"
+):
+    """
+    Scan the universe in worker processes, one shard of the tickers each.
+
+    Each process discovers, fetches and analyzes its own shard, so parsing and
+    aggregation run on as many cores as there are shards. The plan's rate
+    is split evenly between the processes, and the session's closes are
+    loaded once up front so every shard reads them from the price cache.
+    Shard results are merged as they complete. configure_shards sets where the
+    workers' client comes from.
+
+    Args:
+        related_tickers (iterable): Tickers to scan.
+        shards (int): Number of worker processes.
+        expiration_limit_days (int): The maximum number of days from today for expiration.
+        workers (int): Number of worker threads per process.
+        use_cache (bool): Fetch trades incrementally through the local trade cache.
+        volume_source (str): "trades" or "aggs", see get_daily_volume.
+
+    Returns:
+        tuple: (scanned, results): scan_related_tickers output sorted by ticker
+               (errors as strings) and the contract_result dicts of every shard.
+    """
+    tickers = sorted(related_tickers)
+    # Round-robin keeps the shards the same size
+    parts = [part for part in (tickers[i::shards] for i in range(shards)) if part]
+    if not parts:
+        return [], []
+
+    load_session_closes(client, get_friday_or_date())
+    # Each shard refills at its share of the plan rate, but its burst can't drop below one request
+    scheduler = get_scheduler()
+    shard_rate = scheduler.max_rate / len(parts)
+    shard_burst = max(1.0, scheduler.capacity / len(parts))
+    settings = {
+        "client_factory": _shard_settings["client_factory"],
+        "cache": cache_settings(),
+        "warehouse": warehouse_settings(),
+        "rate": (shard_burst, shard_burst / shard_rate),
+    }
+
+    scanned, results = [], []
+    # Spawned rather than forked, so no worker inherits this process' sqlite connections or threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(parts), mp_context=context) as executor:
+        futures = {
+            executor.submit(
+                scan_shard, part, expiration_limit_days, workers, use_cache, volume_source, settings
+            ): part
+            for part in parts
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            part = futures[future]
+            try:
+                shard_scanned, shard_results, endpoints, shard_factory = future.result()
+            except Exception as e:
+                print(f"Error scanning shard {part[0]}..{part[-1]}: {e}")
+                scanned.extend((ticker, [], str(e)) for ticker in part)
+                continue
+
+            merge_endpoints(endpoints)
+            if shard_factory is not None and _shard_settings["on_shard_done"] is not None:
+                _shard_settings["on_shard_done"](shard_factory)
+            scanned.extend(shard_scanned)
+            results.extend(shard_results)
+            print(f"Shard {done}/{len(parts)} done: {len(part)} tickers, {len(shard_results)} contracts.")
+
+    scanned.sort(key=lambda row: row[0])
+    return scanned, results
+
+
+def run_scanner_on_otm_calls(
+    base_ticker,
+    depth=3,
+    expiration_limit_days=180,
+    workers=1,
+    use_async=False,
+    use_trade_cache=True,
+    volume_source="trades",
+    max_nodes=None,
+    shards=1,
+    stream=False,
+    stream_url=STREAM_URL,
+    record_path=None,
+):
     """
     Run the scanner on OTM call options for related tickers.
 
     Args:
         base_ticker (str): The initial stock ticker.
-        expiration (str): The expiration date.
-        option_type (str): The option type ("C" for Call).
         depth (int): The depth for fetching related tickers.
+        expiration_limit_days (int): The maximum number of days from today for expiration.
+        workers (int): Number of worker threads for fetching contracts and trades.
+        use_async (bool): Drive all requests from one asyncio event loop instead of threads.
+        use_trade_cache (bool): Only fetch trades newer than the local trade cache's watermarks.
+        volume_source (str): "trades" to sum individual trades, "aggs" to read daily bars.
+        max_nodes (int): Maximum number of related tickers to collect.
+        shards (int): Split the tickers across this many worker processes, see scan_sharded.
+        stream (bool): After the scan, stream live trades for the scanned contracts and flag spikes.
+        stream_url (str): Websocket endpoint to stream from.
+        record_path (str): Append every streamed message to this file for later replay.
 
     Returns:
-        dict: Scanner results for all OTM call options.
+        dict: Result of every scanned OTM call option by option ticker, ranked, see rank_results.
     """
     print(f"Fetching related tickers for {base_ticker} up to {depth} levels deep...")
-    related_tickers = fetch_related_companies(base_ticker, depth, use_db=True)
+    with stage("graph expansion"):
+        related_tickers = fetch_related_companies(base_ticker, depth, use_db=True, max_nodes=max_nodes)
     print(f"Found {len(related_tickers)} related tickers: {related_tickers}")
 
-    all_results = {}
-
-    for ticker in related_tickers:
-        try:
-            print(f"\nFetching OTM calls for {ticker}...")
-            otm_calls = get_otm_calls(ticker, expiration_limit_days)
+    sharded = shards > 1 and not use_async
+    if use_async:
+        # Discovery and trade fetches interleave on the event loop, so they share one stage
+        with stage("async scan"):
+            scanned = asyncio.run(
+                scan_related_tickers_async(
+                    related_tickers,
+                    expiration_limit_days,
+                    use_cache=use_trade_cache,
+                    volume_source=volume_source,
+                )
+            )
+    elif sharded:
+        # Each shard analyzes what it fetched, so discovery, fetches and analysis share one stage
+        with stage("sharded scan"):
+            scanned, results = scan_sharded(
+                related_tickers, shards, expiration_limit_days, workers, use_trade_cache, volume_source
+            )
+    else:
+        scanned = scan_related_tickers(
+            related_tickers, expiration_limit_days, workers, use_trade_cache, volume_source
+        )
 
-            for option_ticker in otm_calls:
-              print(f"Running scanner for OTM call option: {option_ticker}")
-              trades_by_day = get_trades(option_ticker)  # Isolated trade data for this ticker
-              analyze_size_spikes(trades_by_day)
+    with stage("analysis"):
+        if not sharded:
+            results = analyze_scanned(scanned)
+        all_results = rank_results(results)
 
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
+    if stream:
+        # The scan's per-day volumes are the baseline; no further REST calls are made
+        contract_trades = [pair for _, pairs, error in scanned if error is None for pair in pairs]
+        with stage("streaming"):
+            monitor_spikes(contract_trades, stream_url, record_path=record_path)
 
     return all_results
 
-if __name__ == "__main__":
-    import argparse
-
-    initialize_db()
 
-    parser = argparse.ArgumentParser(description="Scan OTM call options for related tickers.")
+def add_arguments(parser):
+    """
+    Add the scanner's command-line arguments to a parser, also used by the tyche CLI.
+    """
     parser.add_argument("base_ticker", type=str, help="Base stock ticker (e.g., KMI)")
     parser.add_argument("--depth", type=int, default=1, help="Recursion depth for related tickers (default: 3)")
     parser.add_argument(
@@ -248,12 +745,106 @@ if __name__ == "__main__":
         default=180,
         help="Max days until expiration (default: 180)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker threads for fetching contracts and trades (default: 1)"
+    )
+    concurrency = parser.add_mutually_exclusive_group()
+    concurrency.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Fetch contracts and trades concurrently on a single asyncio event loop"
+    )
+    concurrency.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split the related tickers across this many worker processes, each with --workers threads (default: 1)"
+    )
+    parser.add_argument(
+        "--no-trade-cache",
+        dest="use_trade_cache",
+        action="store_false",
+        help="Re-download the full trade history instead of using the local trade cache"
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        default=None,
+        help="Stop expanding related tickers once this many have been collected"
+    )
+    parser.add_argument(
+        "--volume-source",
+        choices=VOLUME_SOURCES,
+        default="trades",
+        help="Sum individual trades or read daily bars for per-day volume (default: trades)"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="After the scan, stream live trades for the scanned contracts and flag spikes as they arrive"
+    )
+    parser.add_argument(
+        "--stream-url",
+        type=str,
+        default=STREAM_URL,
+        help=f"Websocket endpoint to stream from, e.g. a local replay server (default: {STREAM_URL})"
+    )
+    parser.add_argument(
+        "--record-stream",
+        type=str,
+        default=None,
+        help="Append every streamed message to this file for later replay"
+    )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--plan",
+        choices=PLAN_LIMITS,
+        default=None,
+        help="Polygon plan whose rate limit requests are scheduled under (default: POLYGON_PLAN or starter)"
+    )
+    add_cache_arguments(parser)
+    add_warehouse_arguments(parser, offline=False)
+
+
+def run(args):
+    """
+    Run the scanner with parsed command-line arguments and report the API cost.
+    """
+    initialize_db()
+    initialize_trade_cache()
+    apply_cache_arguments(args)
+    apply_warehouse_arguments(args)
+    if args.plan:
+        configure_scheduler(args.plan)
 
     results = run_scanner_on_otm_calls(
         args.base_ticker,
         depth=args.depth,
-        expiration_limit_days=args.expiration_limit_days
+        expiration_limit_days=args.expiration_limit_days,
+        workers=args.workers,
+        use_async=args.use_async,
+        use_trade_cache=args.use_trade_cache,
+        volume_source=args.volume_source,
+        max_nodes=args.max_nodes,
+        shards=args.shards,
+        stream=args.stream,
+        stream_url=args.stream_url,
+        record_path=args.record_stream
     )
     print("Scanner Results:")
+    print_results(results)
+    report()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scan OTM call options for related tickers.")
+    add_arguments(parser)
+    run(parser.parse_args())
@@ -1,7 +1,7 @@
-from polygon import RESTClient
-import os
 import time
-from src.helpers.options_helpers import (
+from helpers.api_metrics import report, stage
+from helpers.polygon_client import LazyClient
+from helpers.options_helpers import (
     get_contracts_by_underlying,
     get_monthly_expirations,
 )
@@ -12,33 +12,40 @@ from dotenv import load_dotenv
 
 load_dotenv()  # take environment variables
 
-# Ensure the POLYGON_API_KEY is set as an environment variable
-API_KEY = os.getenv("POLYGON_API_KEY")
-
-if not API_KEY:
-    raise EnvironmentError("POLYGON_API_KEY environment variable is not set.")
-
-# Initialize the RESTClient
-client = RESTClient(API_KEY)
+# Created on first use; POLYGON_API_KEY must be set by then
+client = LazyClient()
 
 
 def main(underlying):
     monthly = get_monthly_expirations()
     contracts = []
 
-    for expiration in monthly:
-        contracts.extend(get_contracts_by_underlying(underlying, expiration))
+    with stage("contract discovery"):
+        for expiration in monthly:
+            contracts.extend(get_contracts_by_underlying(underlying, expiration))
 
     print(contracts)
 
 
+def add_arguments(parser):
+    """
+    Add the report's command-line arguments to a parser, also used by the tyche CLI.
+    """
+    parser.add_argument("symbol", type=str, help="Stock symbol (e.g., AR)")
+
+
+def run(args):
+    """
+    Run the report with parsed command-line arguments and report the API cost.
+    """
+    main(args.symbol)
+    report()
+
+
 if __name__ == "__main__":
     import argparse
 
     print("Hello")
     parser = argparse.ArgumentParser(description="Daily Natual Gas Report")
-    parser.add_argument("symbol", type=str, help="Stock symbol (e.g., AR)")
-
-    args = parser.parse_args()
-
-    main(args.symbol)
+    add_arguments(parser)
+    run(parser.parse_args())
@@ -1,7 +1,6 @@
 import sys
 from datetime import datetime
-import pandas as pd
-from pandas_market_calendars import get_calendar
+from helpers.session_calendar import sessions_between
 
 def calculate_trading_days(start_date_str):
     try:
@@ -13,11 +12,8 @@ def calculate_trading_days(start_date_str):
             print("The start date cannot be in the future.")
             return
 
-        # Get the NYSE trading calendar
-        nyse = get_calendar('NYSE')
-
-        # Get the valid trading sessions
-        trading_days = nyse.valid_days(start_date=start_date, end_date=today)
+        # Get the valid NYSE trading sessions from the precomputed calendar
+        trading_days = sessions_between(start_date, today)
 
         # Count the trading days
         num_trading_days = len(trading_days)
@@ -25,6 +21,16 @@ def calculate_trading_days(start_date_str):
     except ValueError:
         print("Invalid date format. Please use YYYY-MM-DD.")
 
+def add_arguments(parser):
+    """
+    Add the calculator's command-line arguments to a parser, used by the tyche CLI.
+    """
+    parser.add_argument("start_date", type=str, help="First date to count from (YYYY-MM-DD)")
+
+
+def run(args):
+    calculate_trading_days(args.start_date)
+
 if __name__ == "__main__":
     if len(sys.argv) != 2:
         print("Usage: python trading_days_calculator.py <start_date>")
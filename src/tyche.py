@@ -0,0 +1,52 @@
+import argparse
+import importlib
+import sys
+
+# Subcommand -> (module implementing add_arguments/run, help)
+COMMANDS = {
+    "scan": ("related_companies_scanner", "Scan OTM call options for related tickers."),
+    "otm": ("otm_options_by_expiration", "Analyze 10%+ OTM call options trade size spikes."),
+    "trades": ("option_trades", "Analyze options trade size spikes."),
+    "ema": ("ema_screen", "Screen related tickers for stacked EMAs and their option flow."),
+    "natgas": ("reports.natural_gas", "Daily natural gas report."),
+    "trading-days": ("trading_days", "Count NYSE trading days since a date."),
+}
+
+
+def build_parser(command=None):
+    """
+    Build the tyche argument parser.
+
+    Every subcommand is listed, but only the module of `command` is imported
+    to add its arguments, so `tyche scan ...` never loads the EMA screen,
+    plotting code or the clients other subcommands use.
+
+    Args:
+        command (str): Subcommand being run, None to only list them.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(prog="tyche", description="Options flow scanners on Polygon data.")
+    subparsers = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    for name, (module_name, help_text) in COMMANDS.items():
+        # help strings are %-formatted by argparse, descriptions are not
+        subparser = subparsers.add_parser(name, help=help_text.replace("%", "%%"), description=help_text)
+        if name == command:
+            module = importlib.import_module(module_name)
+            module.add_arguments(subparser)
+            subparser.set_defaults(run=module.run)
+
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv and argv[0] in COMMANDS else None
+    args = build_parser(command).parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()